@@ -0,0 +1,91 @@
+# aggregation.py - aggregation engines used by ActivityServer
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+AGGREGATION_MODES = ('fedavg', 'median', 'trimmed_mean')
+
+class StreamingFedAvg:
+    """Weighted mean kept as a running sum: add() one client at a time.
+
+    Memory is one float64 copy of the model no matter how many clients
+    report, since each update can be dropped as soon as it is added.
+    """
+    def __init__(self):
+        self.sums = None
+        self.dtypes = None
+        self.total_examples = 0
+
+    def add(self, weights, num_examples):
+        if num_examples <= 0:
+            return
+        if self.sums is None:
+            self.dtypes = [np.asarray(w).dtype for w in weights]
+            self.sums = [np.zeros(np.shape(w), dtype=np.float64) for w in weights]
+        for acc, w in zip(self.sums, weights):
+            acc += np.asarray(w, dtype=np.float64) * num_examples
+        self.total_examples += num_examples
+
+    def result(self):
+        if self.sums is None:
+            return None
+        return [(acc / self.total_examples).astype(dtype) for acc, dtype in zip(self.sums, self.dtypes)]
+
+class _StackedAggregator(ABC):
+    """Collects client updates into preallocated [clients, *shape] stacks.
+
+    Robust statistics need every value of a coordinate at once, so memory is
+    O(clients x model) here; the stacks are filled in place rather than
+    built from per-client lists and copied by np.stack.
+    """
+    def __init__(self, num_clients):
+        self.num_clients = num_clients
+        self.stacks = None
+        self.dtypes = None
+        self.count = 0
+
+    def add(self, weights, num_examples):
+        if num_examples <= 0:
+            return
+        if self.stacks is None:
+            self.dtypes = [np.asarray(w).dtype for w in weights]
+            self.stacks = [np.empty((self.num_clients,) + np.shape(w), dtype=np.result_type(d, np.float32))
+                           for w, d in zip(weights, self.dtypes)]
+        for stack, w in zip(self.stacks, weights):
+            stack[self.count] = w
+        self.count += 1
+
+    @abstractmethod
+    def _reduce(self, stack):
+        """Combine a [clients, *shape] stack into one tensor"""
+
+    def result(self):
+        if not self.count:
+            return None
+        return [self._reduce(stack[:self.count]).astype(dtype) for stack, dtype in zip(self.stacks, self.dtypes)]
+
+class CoordinateMedian(_StackedAggregator):
+    """Coordinate-wise median of client weights (ignores example counts)"""
+    def _reduce(self, stack):
+        return np.median(stack, axis=0)
+
+class TrimmedMean(_StackedAggregator):
+    """Coordinate-wise mean after dropping the trim_fraction largest and smallest values"""
+    def __init__(self, num_clients, trim_fraction=0.1):
+        super().__init__(num_clients)
+        self.trim_fraction = trim_fraction
+
+    def _reduce(self, stack):
+        trim = int(self.trim_fraction * len(stack))
+        if trim == 0 or len(stack) - 2 * trim <= 0:
+            return stack.mean(axis=0)
+        return np.sort(stack, axis=0)[trim:len(stack) - trim].mean(axis=0)
+
+def make_aggregator(mode, num_clients, trim_fraction=0.1):
+    if mode == 'fedavg':
+        return StreamingFedAvg()
+    if mode == 'median':
+        return CoordinateMedian(num_clients)
+    if mode == 'trimmed_mean':
+        return TrimmedMean(num_clients, trim_fraction)
+    raise ValueError(f"unknown aggregation mode {mode!r}, expected one of {AGGREGATION_MODES}")
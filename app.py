@@ -1,18 +1,54 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, abort
+from flask import (Flask, render_template, request, redirect, url_for, flash, jsonify, abort, Response,
+                   g, has_request_context, make_response, stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta, timezone  # ✅ FIXED: Added timezone
 from collections import defaultdict
 from functools import wraps
-from sqlalchemy import func
+from sqlalchemy import case, event, func, insert, literal, select, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import atexit
+import csv
+import io
+import json
+import logging
+import math
 import os
+import time
+import zlib
+
+import metrics
+from classifier import classifier, UNPRODUCTIVE, PRODUCTIVE
+from dashboard_cache import DashboardCache
+from live_stats import SlidingWindowStore, UsageRow
+from scoring import ActivityScorer
+from write_behind import WriteBehindWriter
+
+metrics.configure_logging()
+log = logging.getLogger(__name__)
 
 # ---------------- APP CONFIG ----------------
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'fedclassroom-secret-2026'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///users.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# In-memory 24h totals per user (single-process deployments only, see live_stats.py)
+app.config['LIVE_STATS'] = os.environ.get('LIVE_STATS') == '1'
+app.config['LIVE_STATS_CHECK'] = os.environ.get('LIVE_STATS_CHECK') == '1'  # compare with SQL on every read
+# Global federated model used to score activities at ingest (see scoring.py)
+app.config['MODEL_PATH'] = os.environ.get('MODEL_PATH', os.path.join(app.root_path, 'global_model.pth'))
+# Computed dashboard contexts, invalidated when the user's activity changes (see dashboard_cache.py)
+app.config['DASHBOARD_CACHE_TTL'] = float(os.environ.get('DASHBOARD_CACHE_TTL', 60))
+app.config['DASHBOARD_CACHE_SIZE'] = int(os.environ.get('DASHBOARD_CACHE_SIZE', 1024))
+# Group-commit ingestion: handlers validate and enqueue, one writer thread commits (see write_behind.py)
+app.config['WRITE_BEHIND'] = os.environ.get('WRITE_BEHIND') == '1'
+app.config['WRITE_BEHIND_INTERVAL_MS'] = int(os.environ.get('WRITE_BEHIND_INTERVAL_MS', 50))
+app.config['WRITE_BEHIND_MAX_ROWS'] = int(os.environ.get('WRITE_BEHIND_MAX_ROWS', 500))
+# Observability (see metrics.py): /metrics is open unless METRICS_TOKEN is set
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['SQL_QUERY_WARN'] = int(os.environ.get('SQL_QUERY_WARN', 25))  # per request; catches N+1 loops
+app.config['PROFILE_SLOW_MS'] = float(os.environ.get('PROFILE_SLOW_MS', 0))  # 0 = sampling profiler off
 
 db = SQLAlchemy(app)
 
@@ -25,17 +61,103 @@ class User(db.Model, UserMixin):
     role = db.Column(db.String(20), default='student')
 
 class Activity(db.Model):
+    __table_args__ = (
+        # Every dashboard filters one user's rows by start time
+        db.Index('ix_activity_user_start', 'user_id', 'timestamp_start'),
+        db.Index('ix_activity_start', 'timestamp_start'),  # class-wide time ranges
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     app_name = db.Column(db.String(100), nullable=False)
+    raw_app_name = db.Column(db.String(100))  # process name as sent by the tracker; what the model scores
     window_title = db.Column(db.String(200))
+    display_name = db.Column(db.String(100), index=True)  # classifier output, stored at ingest
+    category = db.Column(db.String(20), index=True)       # 'productive' / 'unproductive'
     duration_seconds = db.Column(db.Integer, nullable=False)
     fl_score = db.Column(db.Float, default=0.5)
     timestamp_start = db.Column(db.DateTime)
     timestamp_end = db.Column(db.DateTime)
 
+class ActivityHourly(db.Model):
+    """Rollup of Activity: seconds and row count per user, hour and display name.
+
+    Maintained by insert_activities(); rebuild with `python migrate_db.py`.
+    """
+    __table_args__ = (
+        db.Index('ix_activity_hourly_hour', 'hour'),  # class-wide time ranges
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    hour = db.Column(db.DateTime, primary_key=True)  # timestamp_start truncated to the hour
+    app_name = db.Column(db.String(100), primary_key=True)  # Activity.display_name
+    category = db.Column(db.String(20))
+    total_seconds = db.Column(db.Integer, nullable=False, default=0)
+    activity_count = db.Column(db.Integer, nullable=False, default=0)
+
 # ---------------- INIT DATABASE ----------------
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")     # dashboards read while ingestion writes
+    cursor.execute("PRAGMA synchronous=NORMAL")   # with WAL: fsync at checkpoints, not on every commit
+    cursor.execute("PRAGMA cache_size=-20000")    # 20 MB page cache per connection
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA busy_timeout=5000")    # wait for the write lock instead of failing
+    cursor.close()
+
+# ---------------- METRICS ----------------
+REQUEST_SECONDS = metrics.histogram('http_request_duration_seconds', "Request latency by route",
+                                    ('endpoint', 'method', 'status'))
+REQUEST_QUERIES = metrics.histogram('http_request_sql_queries', "SQL statements per request",
+                                    ('endpoint',), metrics.COUNT_BUCKETS)
+REQUEST_SQL_SECONDS = metrics.histogram('http_request_sql_seconds', "SQL time per request", ('endpoint',))
+INGEST_ROWS = metrics.counter('ingest_rows_total', "Activities received by outcome", ('result',))
+INGEST_BYTES = metrics.histogram('ingest_payload_bytes', "Ingest request body size",
+                                 ('endpoint',), metrics.BYTES_BUCKETS)
+COMMIT_SECONDS = metrics.histogram('ingest_commit_seconds', "Activity insert + rollup commit time")
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if has_request_context():
+        g.sql_queries = g.get('sql_queries', 0) + 1
+        g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+
+profiler = metrics.SlowRequestProfiler(app.config['PROFILE_SLOW_MS']) if app.config['PROFILE_SLOW_MS'] > 0 else None
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    if profiler is not None:
+        g.profile = profiler.begin()
+
+@app.after_request
+def record_status(response):
+    g.status = response.status_code
+    return response
+
+@app.teardown_request
+def observe_request(exc):
+    # Teardown runs after a streamed response has finished, so exports count in full
+    if 'request_started' not in g:
+        return
+    elapsed = time.perf_counter() - g.request_started
+    endpoint = request.endpoint or 'unmatched'
+    queries = g.get('sql_queries', 0)
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method,
+                            status=g.get('status', 500 if exc else 200))
+    REQUEST_QUERIES.observe(queries, endpoint=endpoint)
+    REQUEST_SQL_SECONDS.observe(g.get('sql_seconds', 0.0), endpoint=endpoint)
+    if queries > app.config['SQL_QUERY_WARN']:
+        log.warning("⚠ %d SQL queries for %s %s (N+1?)", queries, request.method, request.path)
+    if profiler is not None and 'profile' in g:
+        profiler.end(g.profile, elapsed, f"{request.method} {request.full_path.rstrip('?')}")
+
 with app.app_context():
+    if db.engine.dialect.name == 'sqlite':
+        event.listen(db.engine, 'connect', set_sqlite_pragmas)
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(db.engine, 'after_cursor_execute', after_cursor_execute)
     db.create_all()
 
 login_manager = LoginManager(app)
@@ -55,55 +177,220 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# 🔥 APP DETECTION & PROCESSING FUNCTIONS (same as before)
+# 🔥 APP DETECTION & PROCESSING FUNCTIONS (rules live in app_rules.json, see classifier.py)
 def get_display_name(raw_app_name, window_title=""):
-    # [Keep your existing get_display_name function exactly the same]
-    if not raw_app_name:
-        return "Unknown"
-    raw_lower = raw_app_name.lower()
-    window_lower = window_title.lower() if window_title else ""
-    
-    if any(x in window_lower for x in ['youtube', 'youtu.be']):
-        return "YouTube"
-    if 'perplexity' in window_lower:
-        return "Perplexity"
-    if 'netflix' in window_lower:
-        return "Netflix"
-    
-    app_mapping = {'youtube.com': 'YouTube', 'chrome': 'Chrome', 'whatsapp': 'WhatsApp',
-                   'instagram.com': 'Instagram', 'telegram': 'Telegram', 'discord': 'Discord',
-                   'code': 'VS Code', 'spotify.com': 'Spotify'}
-    
-    for key, display_name in app_mapping.items():
-        if key in raw_lower:
-            return display_name
-    
-    if 'chrome' in raw_lower and window_title:
-        clean_title = window_title.replace(' - Google Chrome', '').strip()
-        if len(clean_title) > 3:
-            return clean_title[:30]
-    
-    if raw_app_name.endswith('.exe'):
-        return raw_app_name[:-4].split('\\')[-1].title()
-    return raw_app_name.split('\\')[-1].title()
+    return classifier.display_name(raw_app_name, window_title)
 
-def process_activities(activities):
-    app_totals = defaultdict(int)
-    productive_keywords = ['code', 'vscode', 'studio', 'notepad', 'word', 'excel']
-    
-    for activity in activities:
-        display_name = get_display_name(activity.app_name, activity.window_title or "")
-        app_totals[display_name] += activity.duration_seconds
-    
+def summarize_app_totals(rows):
+    """(display_name, category, seconds) rows → entries for the dashboard app table"""
     merged = []
-    for app_name, total_time in app_totals.items():
+    for row in rows:
         merged.append({
-            'app_name': app_name,        # ← Templates use this
-            'total_minutes': round(total_time / 60, 1),
-            'is_productive': any(keyword in app_name.lower() for keyword in productive_keywords)
+            'app_name': row.display_name,        # ← Templates use this
+            'total_minutes': round(row.seconds / 60, 1),
+            'is_productive': row.category == PRODUCTIVE
         })
     return sorted(merged, key=lambda x: x['total_minutes'], reverse=True)
 
+# 🔥 HOURLY ROLLUP (dashboards read this instead of scanning raw rows)
+def hour_floor(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+def update_hourly_rollup(rows):
+    """Fold freshly inserted activity rows into ActivityHourly (one upsert per batch)"""
+    buckets = defaultdict(lambda: [0, 0])
+    for row in rows:
+        if row.get('timestamp_start') is None:
+            continue
+        key = (row['user_id'], hour_floor(row['timestamp_start']), row['display_name'], row['category'])
+        buckets[key][0] += row['duration_seconds']
+        buckets[key][1] += 1
+    if not buckets:
+        return
+
+    stmt = sqlite_insert(ActivityHourly)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'hour', 'app_name'],
+        set_={
+            'category': stmt.excluded.category,
+            'total_seconds': ActivityHourly.total_seconds + stmt.excluded.total_seconds,
+            'activity_count': ActivityHourly.activity_count + stmt.excluded.activity_count,
+        })
+    db.session.execute(stmt, [
+        {'user_id': uid, 'hour': hour, 'app_name': name, 'category': category,
+         'total_seconds': secs, 'activity_count': count}
+        for (uid, hour, name, category), (secs, count) in buckets.items()
+    ])
+
+def window_totals_query(cutoff, user_id=None):
+    """SELECT of (user_id, display_name, category, seconds, count) since cutoff.
+
+    One GROUP BY over the union of ActivityHourly (whole hours) and the raw
+    Activity rows of the partial first hour [cutoff, next hour), which are
+    found via the (user_id, timestamp_start) index. Returns plain rows, no
+    ORM objects, and the cost no longer grows with history.
+    """
+    boundary = hour_floor(cutoff) + timedelta(hours=1)
+    rollup = select(
+        ActivityHourly.user_id.label('user_id'),
+        ActivityHourly.app_name.label('display_name'),
+        func.coalesce(ActivityHourly.category, UNPRODUCTIVE).label('category'),
+        ActivityHourly.total_seconds.label('seconds'),
+        ActivityHourly.activity_count.label('count'),
+    ).where(ActivityHourly.hour >= boundary)
+    head = select(
+        Activity.user_id,
+        func.coalesce(Activity.display_name, Activity.app_name),
+        func.coalesce(Activity.category, UNPRODUCTIVE),
+        Activity.duration_seconds,
+        literal(1),
+    ).where(Activity.timestamp_start >= cutoff, Activity.timestamp_start < boundary)
+    if user_id is not None:
+        rollup = rollup.where(ActivityHourly.user_id == user_id)
+        head = head.where(Activity.user_id == user_id)
+
+    parts = union_all(rollup, head).subquery()
+    stmt = select(
+        parts.c.user_id, parts.c.display_name, parts.c.category,
+        func.sum(parts.c.seconds).label('seconds'), func.sum(parts.c.count).label('count'),
+    ).group_by(parts.c.user_id, parts.c.display_name, parts.c.category)
+    return stmt
+
+def window_totals(cutoff, user_id=None):
+    return db.session.execute(window_totals_query(cutoff, user_id)).all()
+
+# 🔥 ANALYTICS (arbitrary ranges, bucketed in SQL)
+ANALYTICS_BUCKETS = {
+    'hour': (lambda ts: func.strftime('%Y-%m-%dT%H:00:00', ts), timedelta(hours=1)),
+    'day': (lambda ts: func.strftime('%Y-%m-%dT00:00:00', ts), timedelta(days=1)),
+    'week': (lambda ts: func.date(ts, '-6 days', 'weekday 1').op('||')('T00:00:00'), timedelta(weeks=1)),  # Mondays
+}
+
+def usage_parts(start, end, user_id=None):
+    """Selects of (user_id, ts, display_name, category, seconds) covering [start, end) exactly once.
+
+    Whole hours come from ActivityHourly; the partial hours at either end
+    come from raw Activity rows via the timestamp indexes.
+    """
+    first_hour = hour_floor(start)
+    if first_hour < start:
+        first_hour += timedelta(hours=1)
+    last_hour = hour_floor(end)
+
+    def raw(lo, hi):
+        stmt = select(
+            Activity.user_id.label('user_id'),
+            Activity.timestamp_start.label('ts'),
+            func.coalesce(Activity.display_name, Activity.app_name).label('display_name'),
+            func.coalesce(Activity.category, UNPRODUCTIVE).label('category'),
+            Activity.duration_seconds.label('seconds'),
+        ).where(Activity.timestamp_start >= lo, Activity.timestamp_start < hi)
+        return stmt if user_id is None else stmt.where(Activity.user_id == user_id)
+
+    if first_hour >= last_hour:
+        return [raw(start, end)]
+    rollup = select(
+        ActivityHourly.user_id, ActivityHourly.hour, ActivityHourly.app_name,
+        func.coalesce(ActivityHourly.category, UNPRODUCTIVE), ActivityHourly.total_seconds,
+    ).where(ActivityHourly.hour >= first_hour, ActivityHourly.hour < last_hour)
+    if user_id is not None:
+        rollup = rollup.where(ActivityHourly.user_id == user_id)
+    return [raw(start, first_hour), rollup, raw(last_hour, end)]
+
+def bucketed_usage(start, end, bucket='day', user_id=None, top=5, limit=100):
+    """Up to `limit` non-empty buckets of [start, end), oldest first, and whether more follow.
+
+    Each bucket has total and productive seconds plus its `top` apps. The
+    grouping, ranking and totals are one SQL statement (window functions);
+    only the returned rows reach Python.
+    """
+    parts = union_all(*usage_parts(start, end, user_id)).subquery()
+    bucket_start = ANALYTICS_BUCKETS[bucket][0](parts.c.ts).label('bucket')
+    per_app = select(
+        bucket_start, parts.c.display_name, parts.c.category, func.sum(parts.c.seconds).label('seconds'),
+    ).group_by(bucket_start, parts.c.display_name, parts.c.category).subquery()
+
+    productive = case((per_app.c.category == PRODUCTIVE, per_app.c.seconds), else_=0)
+    ranked = select(
+        per_app,
+        func.row_number().over(partition_by=per_app.c.bucket,
+                               order_by=(per_app.c.seconds.desc(), per_app.c.display_name)).label('rank'),
+        func.dense_rank().over(order_by=per_app.c.bucket).label('bucket_no'),
+        func.sum(per_app.c.seconds).over(partition_by=per_app.c.bucket).label('total'),
+        func.sum(productive).over(partition_by=per_app.c.bucket).label('productive'),
+    ).subquery()
+    stmt = select(ranked).where(ranked.c.rank <= top, ranked.c.bucket_no <= limit + 1) \
+        .order_by(ranked.c.bucket, ranked.c.rank)
+
+    buckets = []
+    for row in db.session.execute(stmt):
+        if not buckets or buckets[-1]['start'] != row.bucket:
+            buckets.append({'start': row.bucket, 'total_seconds': int(row.total),
+                            'productive_seconds': int(row.productive), 'apps': []})
+        buckets[-1]['apps'].append({'app_name': row.display_name, 'category': row.category,
+                                    'seconds': int(row.seconds)})
+    return buckets[:limit], len(buckets) > limit
+
+# 🔥 LIVE STATS (optional in-memory sliding window, fed by insert_activities)
+def load_live_rows(user_id, since):
+    return db.session.query(
+        Activity.id,
+        func.coalesce(Activity.display_name, Activity.app_name).label('display_name'),
+        func.coalesce(Activity.category, UNPRODUCTIVE).label('category'),
+        Activity.duration_seconds, Activity.timestamp_start
+    ).filter(Activity.user_id == user_id, Activity.timestamp_start >= since).all()
+
+live_stats = SlidingWindowStore(load_live_rows) if app.config['LIVE_STATS'] else None
+
+def live_usage_rows(user_id):
+    rows = live_stats.totals(user_id)
+    if app.config['LIVE_STATS_CHECK']:
+        expected = [UsageRow(r.display_name, r.category, r.seconds, r.count)
+                    for r in window_totals(live_stats.window_start(), user_id)]
+        mismatches = live_stats.check(user_id, expected)
+        if mismatches:
+            log.error("❌ LIVE STATS MISMATCH (ID: %s): %s", user_id, mismatches)
+    return rows
+
+dashboard_cache = DashboardCache(app.config['DASHBOARD_CACHE_SIZE'], app.config['DASHBOARD_CACHE_TTL'])
+
+def conditional_page(entry, render, *viewer):
+    """Render a cached context with ETag/Last-Modified, or answer 304 if the client is up to date.
+
+    The 304 path touches neither the database nor the template.
+    """
+    etag = entry.etag(*viewer)
+    last_modified = datetime.fromtimestamp(int(entry.created), timezone.utc)
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    else:
+        fresh = request.if_modified_since is not None and last_modified <= request.if_modified_since
+    response = Response(status=304) if fresh else make_response(render(entry.value))
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'  # always revalidate
+    return response
+
+APPS_PER_PAGE = 10
+
+def dashboard_summary(user_id, cutoff, page=1):
+    """Template context shared by the student and admin detail dashboards.
+
+    Totals cover every app; merged_activities is only the requested page.
+    """
+    rows = live_usage_rows(user_id) if live_stats is not None else window_totals(cutoff, user_id)
+    merged = summarize_app_totals(rows)
+    page_count = max(1, -(-len(merged) // APPS_PER_PAGE))
+    page = min(max(page, 1), page_count)
+    return {
+        'merged_activities': merged[(page - 1) * APPS_PER_PAGE:page * APPS_PER_PAGE],
+        'page': page,
+        'page_count': page_count,
+        'total_duration': sum(r.seconds for r in rows) / 60,
+        'productive_time': sum(a['total_minutes'] for a in merged if a['is_productive']),
+        'activity_count': sum(r.count for r in rows),
+    }
+
 # ---------------- ROUTES ----------------
 @app.route('/', methods=['GET', 'POST'])
 def home():
@@ -121,7 +408,7 @@ def admin_setup():
                         password_hash=generate_password_hash(request.form['password']), role="admin")
             db.session.add(admin)
             db.session.commit()
-            print(f"✅ ADMIN CREATED: {admin.email}")
+            log.info("✅ ADMIN CREATED: %s", admin.email)
             flash("Admin created!", "success")
         except Exception as e:
             db.session.rollback()
@@ -137,7 +424,7 @@ def login():
     
     if user and check_password_hash(user.password_hash, password):
         login_user(user)
-        print(f"✅ LOGIN: {user.username} (ID: {user.id})")
+        log.info("✅ LOGIN: %s (ID: %s)", user.username, user.id)
         return redirect(url_for('admin_users' if user.role == 'admin' else 'user_dashboard'))
     
     flash("Invalid credentials!", "error")
@@ -159,7 +446,7 @@ def register():
         db.session.add(user)
         db.session.commit()
         flash('Account created! Login now.', "success")
-        print(f"✅ NEW STUDENT: {username} (ID: {user.id})")
+        log.info("✅ NEW STUDENT: %s (ID: %s)", username, user.id)
     except:
         flash("Registration failed!", "error")
     
@@ -172,112 +459,513 @@ def logout():
     flash("Logged out!", "success")
     return redirect(url_for('home'))
 
+USERS_PAGE_LIMIT = 100
+
 @app.route('/users')
 def list_users():
-    users = User.query.all()
-    print("\n📋 USERS:")
-    for u in users:
-        print(f"ID: {u.id} | {u.username} | {u.email} | {u.role}")
-    return jsonify([{'id': u.id, 'username': u.username, 'email': u.email, 'role': u.role} for u in users])
+    """Users in id order, `limit` at a time; the Link header points at the next page (?after=<last id>)"""
+    after = request.args.get('after', 0, type=int)
+    limit = min(max(request.args.get('limit', USERS_PAGE_LIMIT, type=int), 1), 1000)
+    users = db.session.execute(
+        select(User.id, User.username, User.email, User.role)
+        .where(User.id > after).order_by(User.id).limit(limit)
+    ).all()
+    response = jsonify([{'id': u.id, 'username': u.username, 'email': u.email, 'role': u.role} for u in users])
+    if len(users) == limit:
+        response.headers['Link'] = f'<{url_for("list_users", after=users[-1].id, limit=limit)}>; rel="next"'
+    return response
 
 # 🔥 24HR ADMIN DASHBOARD (FIXED utcnow)
+STUDENTS_PER_PAGE = 50
+CLASSROOM_SORTS = ('id', 'name', 'total', 'productive', 'activity')
+
+def classroom_summary(sort='id', descending=False, page=1):
+    """One page of students (including ones with no activity) plus class-wide totals.
+
+    A single statement: per-student 24h usage is LEFT JOINed onto the
+    students, sorted and paginated in SQL, and the class summary comes from
+    window aggregates over the whole (unpaginated) result.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=24)
+    totals = window_totals_query(cutoff).subquery()
+    usage = select(
+        totals.c.user_id,
+        func.sum(totals.c.seconds).label('seconds'),
+        func.sum(case((totals.c.category == PRODUCTIVE, totals.c.seconds), else_=0)).label('productive'),
+        func.sum(totals.c.count).label('count'),
+    ).group_by(totals.c.user_id).subquery()
+
+    seconds = func.coalesce(usage.c.seconds, 0)
+    productive = func.coalesce(usage.c.productive, 0)
+    count = func.coalesce(usage.c.count, 0)
+    share = productive * 1.0 / func.nullif(seconds, 0)
+    order = {'id': User.id, 'name': User.username, 'total': seconds, 'productive': share, 'activity': count}[sort]
+    stmt = select(
+        User.id, User.username, seconds.label('seconds'), productive.label('productive'), count.label('count'),
+        func.count().over().label('class_students'),
+        func.sum(seconds).over().label('class_seconds'),
+        func.sum(productive).over().label('class_productive'),
+        func.sum(count).over().label('class_count'),
+    ).outerjoin(usage, usage.c.user_id == User.id).where(User.role == 'student')
+    stmt = stmt.order_by(order.desc() if descending else order.asc(), User.id) \
+        .limit(STUDENTS_PER_PAGE).offset((page - 1) * STUDENTS_PER_PAGE)
+    rows = db.session.execute(stmt).all()
+    if not rows and page > 1:
+        return classroom_summary(sort, descending, 1)
+
+    student_stats = [{
+        'student': {'id': r.id, 'username': r.username},  # plain values, safe to cache
+        'total_time': r.seconds / 60,
+        'productive_share': r.productive / r.seconds if r.seconds else None,
+        'activity_count': r.count,
+    } for r in rows]
+    first = rows[0] if rows else None
+    class_seconds = first.class_seconds if first else 0
+    return {
+        'student_stats': student_stats,
+        'student_count': first.class_students if first else 0,
+        'total_classroom_time': class_seconds / 60,  # ✅ minutes, whole class
+        'class_productive_share': first.class_productive / class_seconds if class_seconds else None,
+        'class_activity_count': first.class_count if first else 0,
+        'page': page,
+        'page_count': max(1, -(-(first.class_students if first else 0) // STUDENTS_PER_PAGE)),
+        'sort': sort,
+        'descending': descending,
+    }
+
 @app.route('/admin/users')
 @login_required
 @admin_required
 def admin_users():
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=24)
-    stats = db.session.query(
-        User.id, User.username,
-        func.sum(Activity.duration_seconds).label('total'),
-        func.count(Activity.id).label('count')
-    ).outerjoin(Activity).filter(
-        User.role == 'student',
-        Activity.timestamp_start >= cutoff
-    ).group_by(User.id, User.username).all()
-    
-    # ✅ FIXED: Use db.session.get() + calculate total_classroom_time
-    student_stats = []
-    total_classroom_time = 0  # ✅ ADDED
-    for r in stats:
-        student = db.session.get(User, r[0])  # ✅ FIXED Query.get()
-        total_time = (r[2] or 0) / 60
-        total_classroom_time += total_time  # ✅ ADDED
-        student_stats.append({
-            'student': student,
-            'total_time': total_time,
-            'activity_count': r[3] or 0
-        })
+    sort = request.args.get('sort', 'id')
+    if sort not in CLASSROOM_SORTS:
+        sort = 'id'
+    descending = request.args.get('dir') == 'desc'
+    page = max(1, request.args.get('page', 1, type=int))
+    # Any student's new activity bumps the classroom version
+    entry = dashboard_cache.get_or_compute(('classroom', sort, descending, page), dashboard_cache.version(),
+                                           lambda: classroom_summary(sort, descending, page))
     
     # ✅ PASS total_classroom_time to template
-    return render_template('admin_users.html', 
-                          student_stats=student_stats, 
-                          total_classroom_time=total_classroom_time)  # ✅ FIXED
+    return conditional_page(entry, lambda context: render_template('admin_users.html', **context),
+                            current_user.id)
 
 
 @app.route('/admin/student/<int:student_id>')
 @login_required
 @admin_required
 def admin_student_dashboard(student_id):
-    student = User.query.get_or_404(student_id)
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=24)  # ✅ FIXED
-    activities = Activity.query.filter(
-        Activity.user_id == student.id,
-        Activity.timestamp_start >= cutoff
-    ).order_by(Activity.id.desc()).all()
+    page = request.args.get('page', 1, type=int)
+    key = ('student', student_id, page)
+    version = dashboard_cache.version(student_id)
+    entry = dashboard_cache.get(key, version)
+    if entry is None:
+        student = db.get_or_404(User, student_id)
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=24)  # ✅ FIXED
+        summary = dashboard_summary(student.id, cutoff, page)
+        entry = dashboard_cache.put(key, version, dict(summary, user={'id': student.id, 'username': student.username}))
     
-    merged = process_activities(activities)
-    total_duration = sum(a.duration_seconds for a in activities) / 60 if activities else 0
-    productive_time = sum(a['total_minutes'] for a in merged if a['is_productive'])
-    
-    return render_template('admin_user_details.html',
-                          user=student, merged_activities=merged, 
-                          total_duration=total_duration, productive_time=productive_time,
-                          activities=activities, activity_count=len(activities),
-                          **{'user_id': student.id})  # ✅ PASSED USER ID
+    return conditional_page(entry, lambda context: render_template('admin_user_details.html',
+                                                                   **context, user_id=student_id),  # ✅ PASSED USER ID
+                            current_user.id)
 
 # 🔥 24HR USER DASHBOARD (FIXED + USER ID)
 @app.route('/dashboard')
 @login_required
 def user_dashboard():
+    page = request.args.get('page', 1, type=int)
     cutoff = datetime.now(timezone.utc) - timedelta(hours=24)  # ✅ FIXED
-    activities = Activity.query.filter(
-        Activity.user_id == current_user.id,
-        Activity.timestamp_start >= cutoff
-    ).order_by(Activity.id.desc()).all()
-    
-    merged = process_activities(activities)
-    total_duration = sum(a.duration_seconds for a in activities) / 60 if activities else 0
-    productive_time = sum(a['total_minutes'] for a in merged if a['is_productive'])
+    entry = dashboard_cache.get_or_compute(('dashboard', current_user.id, page),
+                                           dashboard_cache.version(current_user.id),
+                                           lambda: dashboard_summary(current_user.id, cutoff, page))
     
-    return render_template('dashboard.html',
-                          merged_activities=merged, total_duration=total_duration,
-                          productive_time=productive_time, activity_count=len(activities),
-                          activities=activities, user=current_user,
-                          **{'user_id': current_user.id})  # ✅ USER ID PASSED!
+    return conditional_page(entry, lambda summary: render_template('dashboard.html', **summary, user=current_user,
+                                                                   **{'user_id': current_user.id}))  # ✅ USER ID PASSED!
+
+# 🔥 ANALYTICS API
+def parse_time(value):
+    """ISO timestamp → naive datetime as stored (aware values are converted to UTC)"""
+    ts = datetime.fromisoformat(value)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+@app.route('/api/analytics')
+@login_required
+def analytics():
+    """Bucketed usage as JSON.
+
+    Query: from, to (ISO; default the last 7 days), bucket=hour|day|week,
+    top (apps per bucket), limit (buckets per page), user_id (admins only;
+    omitted = whole class) and after (the next_after of the previous page).
+    """
+    args = request.args
+    try:
+        end = parse_time(args['to']) if args.get('to') else datetime.now(timezone.utc).replace(tzinfo=None)
+        start = parse_time(args['from']) if args.get('from') else end - timedelta(days=7)
+        after = parse_time(args['after']) if args.get('after') else None
+        user_id = int(args['user_id']) if args.get('user_id') else None
+        top = int(args.get('top', 5))
+        limit = int(args.get('limit', 100))
+    except ValueError:
+        return jsonify({"error": "bad from/to/after timestamp or number"}), 400
+    bucket = args.get('bucket', 'day')
+    if bucket not in ANALYTICS_BUCKETS:
+        return jsonify({"error": f"bucket must be one of {', '.join(ANALYTICS_BUCKETS)}"}), 400
+    if not (1 <= top <= 50 and 1 <= limit <= 1000) or start >= end:
+        return jsonify({"error": "need from < to, 1 <= top <= 50, 1 <= limit <= 1000"}), 400
+
+    if current_user.role != 'admin':
+        if user_id not in (None, current_user.id):
+            abort(403)
+        user_id = current_user.id
+
+    page_start = start
+    if after is not None:
+        page_start = max(start, after + ANALYTICS_BUCKETS[bucket][1])  # keyset: resume after that bucket
+    buckets, has_more = bucketed_usage(page_start, end, bucket, user_id, top, limit) if page_start < end else ([], False)
+    return jsonify({
+        'user_id': user_id,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'bucket': bucket,
+        'buckets': buckets,
+        'next_after': buckets[-1]['start'] if has_more else None,
+    })
+
+# 🔥 RAW ACTIVITY EXPORT (streamed; memory stays flat however many rows match)
+EXPORT_COLUMNS = ('id', 'user_id', 'username', 'app_name', 'display_name', 'category', 'window_title',
+                  'duration_seconds', 'fl_score', 'timestamp_start', 'timestamp_end')
+EXPORT_CHUNK_ROWS = 1000
+
+def export_rows(start=None, end=None, user_id=None):
+    """Activity rows in start-time order, fetched EXPORT_CHUNK_ROWS at a time from a server-side cursor"""
+    stmt = select(
+        Activity.id, Activity.user_id, User.username, Activity.app_name, Activity.display_name,
+        Activity.category, Activity.window_title, Activity.duration_seconds, Activity.fl_score,
+        Activity.timestamp_start, Activity.timestamp_end,
+    ).join(User, User.id == Activity.user_id)
+    if user_id is not None:
+        stmt = stmt.where(Activity.user_id == user_id)
+    if start is not None:
+        stmt = stmt.where(Activity.timestamp_start >= start)
+    if end is not None:
+        stmt = stmt.where(Activity.timestamp_start < end)
+    stmt = stmt.order_by(Activity.timestamp_start, Activity.id).execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    return db.session.execute(stmt)
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def encode_export(result, fmt):
+    """Yield CSV or NDJSON text, one chunk per fetched partition"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(EXPORT_COLUMNS)
+    for partition in result.partitions():
+        for row in partition:
+            values = [_export_value(v) for v in row]
+            if fmt == 'csv':
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))) + '\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if fmt == 'csv' and buffer.tell():
+        yield buffer.getvalue()  # header of an empty export
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.route('/admin/export')
+@app.route('/admin/student/<int:student_id>/export')
+@login_required
+@admin_required
+def export_activities(student_id=None):
+    """Download raw activities: ?from=&to= (ISO, optional), format=csv|ndjson, gzip=1"""
+    if student_id is not None:
+        db.get_or_404(User, student_id)
+    try:
+        start = parse_time(request.args['from']) if request.args.get('from') else None
+        end = parse_time(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({"error": "bad from/to timestamp"}), 400
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    chunks = encode_export(export_rows(start, end, student_id), fmt)
+    filename = f"activities_{'student_%d' % student_id if student_id is not None else 'class'}.{fmt}"
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    if request.args.get('gzip') == '1':
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+# 🔥 ACTIVITY INGESTION (single + bulk share the same validation)
+MAX_BATCH_SIZE = 5000
+MAX_ACTIVITY_SECONDS = 24 * 3600  # one focus activity never spans more than a day
+EARLIEST_ACTIVITY = datetime(2000, 1, 1)
+ACTIVITY_FIELDS = ('user_id', 'app_name', 'window_title', 'duration_seconds',
+                   'fl_score', 'timestamp_start', 'timestamp_end')
+
+def unpack_batch(data):
+    """Turn a bulk payload into a list of activity dicts.
+
+    Accepts either row form ``{"activities": [{...}, ...]}`` or the compact
+    columnar form ``{"columns": {"app_name": [...], "duration_seconds": [...]}}``.
+    Top-level fields (typically ``user_id``) apply to every row that lacks them.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("payload must be a JSON object")
+    if 'activities' in data:
+        rows = data['activities']
+        if not isinstance(rows, list):
+            raise ValueError("'activities' must be a list")
+    elif 'columns' in data:
+        columns = data['columns']
+        if not isinstance(columns, dict) or not all(isinstance(v, list) for v in columns.values()):
+            raise ValueError("'columns' must map field names to lists")
+        lengths = {len(v) for v in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("all columns must have the same length")
+        count = lengths.pop() if lengths else 0
+        rows = [{k: v[i] for k, v in columns.items()} for i in range(count)]
+    else:
+        raise ValueError("expected 'activities' or 'columns'")
+
+    shared = {k: data[k] for k in ACTIVITY_FIELDS if k in data}
+    return [{**shared, **row} if isinstance(row, dict) else row for row in rows]
+
+def parse_user_id(value):
+    """A positive id that fits SQLite's INTEGER, else None (bools are not ids)"""
+    if isinstance(value, bool):
+        return None
+    try:
+        user_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return user_id if 0 < user_id < 2 ** 63 else None
+
+def build_activity_row(item, valid_user_ids):
+    """Validate one activity payload and return the column dict to insert.
+
+    Raises ValueError with a short reason when the item must be rejected.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("activity must be an object")
+    user_id = parse_user_id(item.get('user_id'))
+    if user_id not in valid_user_ids:
+        raise ValueError("Invalid user")
+    if not item.get('app_name'):
+        raise ValueError("missing app_name")
+    if not isinstance(item['app_name'], str) or not isinstance(item.get('window_title') or '', str):
+        raise ValueError("app_name and window_title must be strings")
+    if isinstance(item.get('duration_seconds'), bool):
+        raise ValueError("bad duration, score or timestamp")
+    try:
+        duration = int(item['duration_seconds'])
+        start = datetime.fromisoformat(item['timestamp_start'])
+        end = datetime.fromisoformat(item['timestamp_end'])
+        fl_score = float(item['fl_score']) if item.get('fl_score') is not None else None
+    except KeyError as e:
+        raise ValueError(f"missing {e.args[0]}")
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("bad duration, score or timestamp")
+    if duration < 0:
+        raise ValueError("negative duration")
+    if duration > MAX_ACTIVITY_SECONDS:
+        raise ValueError("duration too long")
+    if fl_score is not None and not math.isfinite(fl_score):
+        raise ValueError("bad duration, score or timestamp")
+    latest = datetime.now() + timedelta(days=1)  # naive local time, like the tracker's; a day covers any zone
+    if not EARLIEST_ACTIVITY <= start.replace(tzinfo=None) <= end.replace(tzinfo=None) <= latest:
+        raise ValueError("timestamps out of range")
+
+    window_title = item.get('window_title') or ''
+    app_name = get_display_name(item['app_name'], window_title)[:50]
+    window_title = window_title[:200]
+    # Dashboards group by the classification of the stored (already normalized) name
+    display_name, category = classifier.classify(app_name, window_title)
+    return {
+        'user_id': user_id,
+        'app_name': app_name,
+        'raw_app_name': item['app_name'][:100],
+        'window_title': window_title,
+        'display_name': display_name,
+        'category': category,
+        'duration_seconds': duration,
+        'fl_score': fl_score,  # None → scored by the global model in insert_activities()
+        'timestamp_start': start,
+        'timestamp_end': end,
+    }
+
+scorer = ActivityScorer(app.config['MODEL_PATH'])
+
+def score_rows(rows, raw_app_names):
+    """Fill missing fl_score values with one batched forward pass of the global model"""
+    pending = [i for i, row in enumerate(rows) if row['fl_score'] is None]
+    scores = None
+    if pending:
+        scores = scorer.score([raw_app_names[i] for i in pending], [rows[i]['duration_seconds'] for i in pending])
+    for n, i in enumerate(pending):
+        rows[i]['fl_score'] = float(scores[n]) if scores is not None else 0.5
+
+def insert_activities(rows, raw_app_names=None):
+    """Insert validated activity rows (and their rollup) in one executemany + one commit.
+
+    raw_app_names are the process names as sent by the tracker, which is
+    what the model was trained on; without them each row's raw_app_name is used.
+    """
+    if rows:
+        score_rows(rows, raw_app_names or [row['raw_app_name'] for row in rows])
+        ids = db.session.scalars(insert(Activity).returning(Activity.id, sort_by_parameter_order=True), rows).all()
+        for row, activity_id in zip(rows, ids):
+            row['id'] = activity_id
+        update_hourly_rollup(rows)
+    db.session.commit()
+    if live_stats is not None:
+        live_stats.add_rows(rows)
+    if rows:
+        dashboard_cache.bump(row['user_id'] for row in rows)
+
+def commit_queued_rows(rows, raw_app_names):
+    """Write-behind commit, run on the writer thread"""
+    with app.app_context():
+        try:
+            with COMMIT_SECONDS.time():
+                insert_activities(rows, raw_app_names)
+        except Exception:
+            db.session.rollback()
+            raise
+
+write_behind = None
+if app.config['WRITE_BEHIND']:
+    write_behind = WriteBehindWriter(commit_queued_rows,
+                                     interval_ms=app.config['WRITE_BEHIND_INTERVAL_MS'],
+                                     max_rows=app.config['WRITE_BEHIND_MAX_ROWS'])
+    atexit.register(write_behind.close)  # commit whatever is still queued on shutdown
+    metrics.gauge('write_behind_queue_rows', "Rows waiting for the write-behind writer").set_function(
+        lambda: write_behind.stats()['queue_depth'])
+    metrics.counter('write_behind_failed_rows_total', "Rows lost to failed write-behind commits").set_function(
+        lambda: write_behind.stats()['failed_rows'])
+metrics.counter('dashboard_cache_hits_total', "Dashboard contexts served from cache").set_function(
+    lambda: dashboard_cache.hits)
+metrics.counter('dashboard_cache_misses_total', "Dashboard contexts computed").set_function(
+    lambda: dashboard_cache.misses)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape target"""
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        abort(403)
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/ingest_stats')
+@login_required
+@admin_required
+def ingest_stats():
+    if write_behind is None:
+        return jsonify({"mode": "sync"})
+    return jsonify(dict(write_behind.stats(), mode="write_behind"))
 
 @app.route('/track_activity', methods=['POST'])
 def track_activity():
-    data = request.json
-    user = User.query.get(data.get('user_id'))
+    INGEST_BYTES.observe(request.content_length or 0, endpoint='track_activity')
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        INGEST_ROWS.inc(result='rejected')
+        return jsonify({"error": "activity must be an object"}), 400
+    user_id = parse_user_id(data.get('user_id'))
+    user = db.session.get(User, user_id) if user_id is not None else None
     if not user:
+        INGEST_ROWS.inc(result='rejected')
         return jsonify({"error": "Invalid user"}), 400
-    
-    app_name = get_display_name(data['app_name'], data.get('window_title', ''))
-    activity = Activity(
-        user_id=user.id,
-        app_name=app_name[:50],
-        window_title=data.get('window_title', '')[:200],
-        duration_seconds=data['duration_seconds'],
-        fl_score=data.get('fl_score', 0.5),
-        timestamp_start=datetime.fromisoformat(data['timestamp_start']),
-        timestamp_end=datetime.fromisoformat(data['timestamp_end'])
-    )
-    db.session.add(activity)
-    db.session.commit()
-    print(f"✅ TRACKED: {app_name} (ID: {user.id})")
+
+    try:
+        row = build_activity_row(data, {user.id})
+    except ValueError as e:
+        INGEST_ROWS.inc(result='rejected')
+        return jsonify({"error": str(e)}), 400
+    if write_behind is not None:
+        if not write_behind.submit([row], [data['app_name']]):
+            INGEST_ROWS.inc(result='overloaded')
+            return jsonify({"error": "ingest queue full"}), 503
+        INGEST_ROWS.inc(result='queued')
+        return jsonify({"status": "queued"}), 202
+    with COMMIT_SECONDS.time():
+        insert_activities([row], [data['app_name']])
+    INGEST_ROWS.inc(result='accepted')
+    log.debug("✅ TRACKED: %s (ID: %s)", row['app_name'], user.id)
     return jsonify({"status": "tracked"})
 
+@app.route('/track_activities', methods=['POST'])
+def track_activities():
+    """Bulk ingestion: many activities (any users) in one transaction.
+
+    Returns per-item results so the client can retry only the rejected rows.
+    """
+    INGEST_BYTES.observe(request.content_length or 0, endpoint='track_activities')
+    try:
+        items = unpack_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"batch larger than {MAX_BATCH_SIZE}"}), 413
+
+    # Validate every distinct user once per batch
+    user_ids = {parse_user_id(item.get('user_id')) for item in items if isinstance(item, dict)} - {None}
+    valid_user_ids = {uid for (uid,) in db.session.query(User.id).filter(User.id.in_(user_ids))} if user_ids else set()
+
+    rows, raw_app_names, results = [], [], []
+    for index, item in enumerate(items):
+        try:
+            rows.append(build_activity_row(item, valid_user_ids))
+            raw_app_names.append(item['app_name'])
+            results.append({"index": index, "status": "accepted"})
+        except ValueError as e:
+            results.append({"index": index, "status": "rejected", "error": str(e)})
+    INGEST_ROWS.inc(len(items) - len(rows), result='rejected')
+
+    if write_behind is not None:
+        if not write_behind.submit(rows, raw_app_names):
+            INGEST_ROWS.inc(len(rows), result='overloaded')
+            for result in results:
+                if result["status"] == "accepted":
+                    result.update(status="rejected", error="ingest queue full")
+            return jsonify({"status": "failed", "accepted": 0, "rejected": len(results), "results": results}), 503
+        INGEST_ROWS.inc(len(rows), result='queued')
+        return jsonify({"status": "queued", "accepted": len(rows),
+                        "rejected": len(items) - len(rows), "results": results}), 202
+
+    try:
+        with COMMIT_SECONDS.time():
+            insert_activities(rows, raw_app_names)
+    except Exception as e:
+        db.session.rollback()
+        INGEST_ROWS.inc(len(rows), result='failed')
+        log.exception("❌ BULK INSERT FAILED: %s", e)
+        for result in results:
+            if result["status"] == "accepted":
+                result.update(status="rejected", error="database error")
+        return jsonify({"status": "failed", "accepted": 0, "rejected": len(results), "results": results}), 500
+
+    INGEST_ROWS.inc(len(rows), result='accepted')
+    log.debug("✅ TRACKED BATCH: %d/%d activities for %d users", len(rows), len(items), len(valid_user_ids))
+    return jsonify({"status": "tracked", "accepted": len(rows),
+                    "rejected": len(items) - len(rows), "results": results})
+
 if __name__ == '__main__':
-    print("🚀 FedClassroom Pro (24HR + Perfect Detection)")
-    print("📱 http://127.0.0.1:5000")
+    log.info("🚀 FedClassroom Pro (24HR + Perfect Detection)")
+    log.info("📱 http://127.0.0.1:5000")
     app.run(debug=True, port=5000, host='127.0.0.1')
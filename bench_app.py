@@ -0,0 +1,284 @@
+# bench_app.py - ingestion and dashboard latency on a synthetic classroom
+# Usage: python bench_app.py [--quick] [--students 50] [--days 7] [--per-day 60]
+#                            [--output bench_app.json] [--baseline old.json]
+#
+# The classroom is generated once into a temporary SQLite database (never
+# instance/users.db). Every scenario then runs in a fresh subprocess against
+# its own copy, so peak RSS and cache state are per scenario and ingestion
+# doesn't change what the next scenario reads.
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import metrics
+
+# (process, window titles, weight among productive students, weight among distracted ones);
+# process names go through the same .title() as in tracker.py, titles exercise the browser rules
+BENCH_APPS = [
+    ('code.exe', ['app.py - Visual Studio Code', 'tracker.py - Visual Studio Code',
+                  '● server.py - Visual Studio Code'], 5, 1),
+    ('chrome.exe', ['Stack Overflow - Google Chrome', 'Python docs - Google Chrome',
+                    'Google Docs - Google Chrome'], 3, 2),
+    ('chrome.exe', ['YouTube - Google Chrome', '(3) YouTube - Google Chrome',
+                    'lofi beats - YouTube - Google Chrome'], 1, 5),
+    ('chrome.exe', ['Netflix - Google Chrome'], 0.5, 3),
+    ('chrome.exe', ['Perplexity - Google Chrome'], 1, 1),
+    ('notepad.exe', ['notes.txt - Notepad'], 2, 1),
+    ('devenv.exe', ['Solution1 - Microsoft Visual Studio'], 2, 0.5),
+    ('winword.exe', ['Essay.docx - Word'], 2, 1),
+    ('discord.exe', ['#general - Discord'], 0.5, 3),
+    ('spotify.exe', ['Spotify Premium'], 1, 2),
+    ('whatsapp.exe', ['WhatsApp'], 0.5, 2),
+    ('explorer.exe', ['Downloads', 'File Explorer'], 1, 1),
+]
+SCENARIOS = ['track_activity', 'dashboard', 'admin_student', 'admin_users', 'mixed']
+MIXED = [('dashboard', 0.6), ('track_activity', 0.3), ('admin_student', 0.1)]  # a class mid-lesson
+BENCH_PASSWORD = 'bench'
+REGRESSION_TOLERANCE = 1.25  # flag p95 growth or throughput loss beyond 25%
+
+def random_activity(rng, weights, user_id, start):
+    """One tracker payload for user_id starting at `start` (naive UTC)"""
+    app, titles, _, _ = BENCH_APPS[rng.choice(len(BENCH_APPS), p=weights)]
+    duration = int(np.clip(rng.lognormal(mean=4.5, sigma=1), 16, 3600))
+    return {
+        'user_id': user_id,
+        'app_name': app.title(),
+        'window_title': titles[rng.integers(len(titles))],
+        'duration_seconds': duration,
+        'timestamp_start': start.isoformat(),
+        'timestamp_end': (start + timedelta(seconds=duration)).isoformat(),
+    }
+
+def student_weights(rng):
+    focus = rng.uniform(0, 1)  # how productive this student is
+    weights = np.array([focus * p + (1 - focus) * d for _, _, p, d in BENCH_APPS])
+    return weights / weights.sum()
+
+def populate(students, days, per_day, seed=0):
+    """Fill the database app.py is configured with; returns the number of activities"""
+    from werkzeug.security import generate_password_hash
+    from app import app, db, User, build_activity_row, insert_activities
+
+    rng = np.random.default_rng(seed)
+    password_hash = generate_password_hash(BENCH_PASSWORD, method='pbkdf2:sha256:1000')  # cheap logins
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    total = 0
+    with app.app_context():
+        db.session.add(User(username='admin', email='admin@bench.local', password_hash=password_hash, role='admin'))
+        users = [User(username=f"student{i:04d}", email=f"student{i:04d}@bench.local",
+                      password_hash=password_hash, role='student') for i in range(students)]
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = {user.id for user in users}
+
+        rows, raw_app_names = [], []
+        for user_id in sorted(user_ids):
+            weights = student_weights(rng)
+            for day in range(days):
+                # Each "day" is a 24h slice ending `day` days ago, so day 0 fills the dashboards
+                day_end = now - timedelta(days=day)
+                t = day_end - timedelta(hours=24) + timedelta(minutes=float(rng.uniform(0, 120)))
+                for _ in range(per_day):
+                    item = random_activity(rng, weights, user_id, t)
+                    t += timedelta(seconds=item['duration_seconds'] + float(rng.exponential(60)))
+                    if t >= day_end:
+                        break
+                    rows.append(build_activity_row(item, user_ids))
+                    raw_app_names.append(item['app_name'])
+                if len(rows) >= 5000:
+                    insert_activities(rows, raw_app_names)
+                    total += len(rows)
+                    rows, raw_app_names = [], []
+        insert_activities(rows, raw_app_names)
+        total += len(rows)
+        db.engine.dispose()  # closing the last connection checkpoints the WAL into the file we copy
+    return total
+
+# ---------------- SCENARIO (runs in a subprocess) ----------------
+def _login(client, email):
+    response = client.post('/login', data={'email': email, 'password': BENCH_PASSWORD})
+    if response.status_code != 302:
+        raise RuntimeError(f"bench login failed for {email}")
+    return client
+
+class Worker:
+    """One thread's clients: a few logged-in students, an admin, and its own random stream"""
+    def __init__(self, app, students, index, seed, clients_per_worker=8):
+        self.rng = np.random.default_rng([seed, index])
+        self.student_ids = [user_id for user_id, _ in students]
+        k = min(clients_per_worker, len(students))
+        mine = [students[(index * k + j) % len(students)] for j in range(k)]
+        self.students = [_login(app.test_client(), email) for _, email in mine]
+        self.admin = _login(app.test_client(), 'admin@bench.local')
+        self.tracker = app.test_client()
+        self.weights = [student_weights(self.rng) for _ in range(8)]
+
+    def request(self, scenario):
+        if scenario == 'mixed':
+            names, p = zip(*MIXED)
+            scenario = names[self.rng.choice(len(names), p=p)]
+        if scenario == 'track_activity':
+            user_id = int(self.rng.choice(self.student_ids))
+            start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=30)
+            item = random_activity(self.rng, self.weights[user_id % len(self.weights)], user_id, start)
+            return self.tracker.post('/track_activity', json=item)
+        if scenario == 'dashboard':
+            return self.students[self.rng.integers(len(self.students))].get('/dashboard')
+        if scenario == 'admin_student':
+            return self.admin.get(f"/admin/student/{int(self.rng.choice(self.student_ids))}")
+        if scenario == 'admin_users':
+            return self.admin.get('/admin/users')
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+def run_scenario(scenario, workers, requests, seed=0, warmup=10):
+    from app import app, db, User, REQUEST_QUERIES
+
+    with app.app_context():
+        students = db.session.query(User.id, User.email).filter_by(role='student').order_by(User.id).all()
+    pool = [Worker(app, students, i, seed) for i in range(workers)]
+    for _ in range(warmup):  # template compilation, model load, first SQLite pages
+        pool[0].request(scenario)
+    queries_before = {endpoint: REQUEST_QUERIES.value(endpoint=endpoint)
+                      for endpoint in ('track_activity', 'user_dashboard', 'admin_student_dashboard', 'admin_users')}
+
+    latencies = [[] for _ in range(workers)]
+    errors = [0] * workers
+    share = [requests // workers + (1 if i < requests % workers else 0) for i in range(workers)]
+    barrier = threading.Barrier(workers + 1)
+
+    def work(i):
+        barrier.wait()
+        for _ in range(share[i]):
+            started = time.perf_counter()
+            response = pool[i].request(scenario)
+            latencies[i].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[i] += 1
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    ms = np.array([l for per_worker in latencies for l in per_worker]) * 1000
+    queries = [REQUEST_QUERIES.value(endpoint=e)[1] - before[1] for e, before in queries_before.items()]
+    return {
+        'scenario': scenario,
+        'workers': workers,
+        'requests': int(ms.size),
+        'errors': sum(errors),
+        'throughput_rps': ms.size / wall,
+        'latency_mean_ms': float(ms.mean()),
+        'latency_p50_ms': float(np.percentile(ms, 50)),
+        'latency_p95_ms': float(np.percentile(ms, 95)),
+        'latency_p99_ms': float(np.percentile(ms, 99)),
+        'sql_per_request': sum(queries) / ms.size,
+        'peak_rss_mb': metrics.peak_rss_mb(),
+    }
+
+# ---------------- DRIVER ----------------
+def run_config(db_path, scenario, workers, requests, seed, cache):
+    """One scenario in a fresh interpreter on a private copy of the generated database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, 'bench.db')
+        shutil.copy(db_path, copy)
+        report_path = os.path.join(tmp, 'report.json')
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{copy}", LOG_LEVEL='WARNING',
+                   APP_BENCH_REPORT=report_path)
+        if not cache:
+            env['DASHBOARD_CACHE_TTL'] = '0'
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--scenario', scenario,
+                        '--workers', str(workers), '--requests', str(requests), '--seed', str(seed)],
+                       check=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+        with open(report_path) as f:
+            return dict(json.load(f), cache=cache)
+
+def config_key(result):
+    return (result['scenario'], result['workers'], result.get('cache', True))
+
+def compare(results, baseline):
+    """Scenarios whose p95 latency or throughput regressed past REGRESSION_TOLERANCE"""
+    previous = {config_key(r): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        old = previous.get(config_key(r))
+        if old and (r['latency_p95_ms'] > old['latency_p95_ms'] * REGRESSION_TOLERANCE
+                    or r['throughput_rps'] * REGRESSION_TOLERANCE < old['throughput_rps']):
+            regressions.append({'config': list(config_key(r)),
+                                'latency_p95_ms': r['latency_p95_ms'], 'baseline_latency_p95_ms': old['latency_p95_ms'],
+                                'throughput_rps': r['throughput_rps'], 'baseline_throughput_rps': old['throughput_rps']})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion and dashboard benchmark on a synthetic classroom")
+    parser.add_argument('--quick', action='store_true', help="small classroom and few requests for a sanity check")
+    parser.add_argument('--students', type=int, default=50)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--per-day', type=int, default=60, help="activities per student per day")
+    parser.add_argument('--requests', type=int, default=300, help="timed requests per scenario")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help="concurrent worker counts to run")
+    parser.add_argument('--scenarios', nargs='+', default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument('--no-cache', action='store_true', help="disable the dashboard cache (DASHBOARD_CACHE_TTL=0)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--baseline', help="earlier --output file to compare against")
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)  # subprocess entry point
+    args = parser.parse_args()
+
+    if args.scenario:
+        with open(os.environ['APP_BENCH_REPORT'], 'w') as f:
+            json.dump(run_scenario(args.scenario, args.workers[0], args.requests, args.seed), f)
+        return 0
+
+    if args.quick:
+        args.students, args.days, args.per_day, args.requests = 10, 2, 30, 60
+        args.workers = [1, 2]
+
+    with tempfile.TemporaryDirectory(prefix='bench_app_') as tmp:
+        db_path = os.path.join(tmp, 'classroom.db')
+        os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        started = time.perf_counter()
+        activities = populate(args.students, args.days, args.per_day, args.seed)
+        print(f"🏫 {args.students} students, {activities} activities over {args.days} days "
+              f"generated in {time.perf_counter() - started:.1f}s")
+
+        results = []
+        for scenario in args.scenarios:
+            for workers in args.workers:
+                r = run_config(db_path, scenario, workers, args.requests, args.seed, not args.no_cache)
+                results.append(r)
+                print(f"⏱️  {scenario:<15} x{workers:<2} {r['throughput_rps']:7.1f} req/s | "
+                      f"p50 {r['latency_p50_ms']:6.1f} ms p95 {r['latency_p95_ms']:6.1f} ms "
+                      f"p99 {r['latency_p99_ms']:6.1f} ms | {r['sql_per_request']:.1f} SQL/req | "
+                      f"errors {r['errors']} | peak RSS {r['peak_rss_mb']:.0f} MB")
+
+    output = {'students': args.students, 'days': args.days, 'per_day': args.per_day, 'activities': activities,
+              'requests': args.requests, 'cache': not args.no_cache, 'results': results}
+    if args.baseline:
+        with open(args.baseline) as f:
+            output['regressions'] = compare(results, json.load(f))
+        for r in output['regressions']:
+            print(f"❌ REGRESSION {r['config']}: p95 {r['latency_p95_ms']:.1f} ms "
+                  f"(baseline {r['baseline_latency_p95_ms']:.1f} ms), {r['throughput_rps']:.1f} req/s "
+                  f"(baseline {r['baseline_throughput_rps']:.1f} req/s)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+    return 1 if output.get('regressions') else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
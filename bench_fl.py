@@ -0,0 +1,96 @@
+# bench_fl.py - round-latency benchmark over simulate.py
+# Usage: python bench_fl.py [--quick] [--output bench_fl.json] [--baseline old.json]
+#
+# Every configuration runs in a fresh subprocess so peak RSS is per configuration.
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SWEEP = {
+    'clients': [2, 8, 32],
+    'samples': [200, 2000],
+    'hidden': [(32, 16), (256, 128), (1024, 512)],
+}
+QUICK_SWEEP = {
+    'clients': [2, 8],
+    'samples': [200],
+    'hidden': [(32, 16), (256, 128)],
+}
+REGRESSION_TOLERANCE = 1.25  # flag configs whose mean round time grew by more than 25%
+
+def run_config(clients, samples, hidden, rounds, workers, codec):
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, 'report.json')
+        cmd = [sys.executable, 'simulate.py', '--clients', str(clients), '--samples', str(samples),
+               '--hidden', str(hidden[0]), str(hidden[1]), '--rounds', str(rounds),
+               '--workers', str(workers), '--json', report_path]
+        if codec:
+            cmd += ['--codec', codec]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        with open(report_path) as f:
+            report = json.load(f)
+
+    # Round 1 includes torch warm-up, so summarize the steady-state rounds
+    steady = report['rounds'][1:] or report['rounds']
+    mean = lambda key: sum(r[key] for r in steady) / len(steady)
+    return {
+        'clients': clients, 'samples': samples, 'hidden': list(hidden),
+        'round_time': mean('wall_time'),
+        'aggregation_time': mean('aggregation_time'),
+        'serialization_time': mean('serialization_time'),
+        'client_compute_time': mean('client_compute_time'),
+        'peak_rss_mb': report['peak_rss_mb'],
+    }
+
+def config_key(result):
+    return (result['clients'], result['samples'], tuple(result['hidden']))
+
+def compare(results, baseline):
+    """Configs whose round time regressed past REGRESSION_TOLERANCE"""
+    previous = {config_key(r): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        old = previous.get(config_key(r))
+        if old and r['round_time'] > old['round_time'] * REGRESSION_TOLERANCE:
+            regressions.append({'config': list(config_key(r)), 'round_time': r['round_time'],
+                                'baseline_round_time': old['round_time']})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Federated round-latency benchmark")
+    parser.add_argument('--quick', action='store_true', help="small sweep for a fast sanity check")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--codec', default=None)
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--baseline', help="earlier --output file to compare against")
+    args = parser.parse_args()
+
+    sweep = QUICK_SWEEP if args.quick else SWEEP
+    results = []
+    for clients, samples, hidden in itertools.product(sweep['clients'], sweep['samples'], sweep['hidden']):
+        result = run_config(clients, samples, hidden, args.rounds, args.workers, args.codec)
+        results.append(result)
+        print(f"⏱️  clients={clients:<3} samples={samples:<5} hidden={hidden[0]}x{hidden[1]:<5} "
+              f"round {result['round_time'] * 1000:8.1f} ms | aggregation {result['aggregation_time'] * 1000:7.1f} ms | "
+              f"serialization {result['serialization_time'] * 1000:7.1f} ms | peak RSS {result['peak_rss_mb']:.0f} MB")
+
+    output = {'rounds': args.rounds, 'workers': args.workers, 'codec': args.codec, 'results': results}
+    if args.baseline:
+        with open(args.baseline) as f:
+            output['regressions'] = compare(results, json.load(f))
+        for r in output['regressions']:
+            print(f"❌ REGRESSION {r['config']}: {r['round_time'] * 1000:.1f} ms "
+                  f"(baseline {r['baseline_round_time'] * 1000:.1f} ms)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+    return 1 if output.get('regressions') else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
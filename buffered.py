@@ -0,0 +1,126 @@
+# buffered.py - FedBuff-style asynchronous aggregation and availability-aware client sampling
+import threading
+
+import numpy as np
+
+def staleness_weight(staleness, alpha=0.5):
+    """Discount for an update that started `staleness` versions ago: (1 + staleness) ** -alpha"""
+    return (1.0 + staleness) ** -alpha
+
+class BufferedAggregator:
+    """Versioned global weights updated from a buffer of asynchronous client updates.
+
+    A client checks out whatever version is current and reports whenever it
+    finishes. Its delta against the version it started from is weighted by
+    num_examples * staleness_weight() and buffered; once `buffer_size`
+    updates are in, the buffer is applied as one server step and the version
+    advances. Dividing by the raw example count (not the discounted one) is
+    what makes stale updates move the model less.
+
+    Updates more than `max_staleness` versions behind are rejected, so only
+    the last max_staleness + 1 versions are kept. Memory is those copies plus
+    one float64 running sum, however many clients report.
+    """
+    def __init__(self, weights, buffer_size=4, max_staleness=4, alpha=0.5, server_lr=1.0, version=0):
+        self.buffer_size = buffer_size
+        self.max_staleness = max_staleness
+        self.alpha = alpha
+        self.server_lr = server_lr
+        self.version = version
+        self.weights = [np.asarray(w) for w in weights]
+        self.counters = {'buffered': 0, 'applied': 0, 'stale': 0}
+        self._history = {version: self.weights}
+        self._sums = None
+        self._examples = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def checkout(self):
+        """(version, weights) a client should start training from"""
+        with self._lock:
+            return self.version, self.weights
+
+    def weights_at(self, version):
+        """Weights of a version still within the staleness bound, else None"""
+        with self._lock:
+            return self._history.get(version)
+
+    def submit(self, weights, version, num_examples):
+        """Buffer a client's trained weights; returns (status, staleness).
+
+        status is 'stale' (rejected), 'buffered', or 'applied' when this
+        update filled the buffer and a new version was produced.
+        """
+        with self._lock:
+            staleness = self.version - version
+            base = self._history.get(version)
+            if base is None or staleness > self.max_staleness:
+                self.counters['stale'] += 1
+                return 'stale', staleness
+            if num_examples <= 0:
+                return 'buffered', staleness
+            if self._sums is None:
+                self._sums = [np.zeros(np.shape(w), dtype=np.float64) for w in self.weights]
+            scale = num_examples * staleness_weight(staleness, self.alpha)
+            for acc, w, b in zip(self._sums, weights, base):
+                acc += (np.asarray(w, dtype=np.float64) - b) * scale
+            self._examples += num_examples
+            self._count += 1
+            self.counters['buffered'] += 1
+            if self._count < self.buffer_size:
+                return 'buffered', staleness
+            self._apply()
+            return 'applied', staleness
+
+    def _apply(self):
+        step = self.server_lr / self._examples
+        self.weights = [(w + acc * step).astype(w.dtype) for w, acc in zip(self.weights, self._sums)]
+        self.version += 1
+        self._history[self.version] = self.weights
+        for old in [v for v in self._history if v < self.version - self.max_staleness]:
+            del self._history[old]
+        self._sums, self._examples, self._count = None, 0, 0
+        self.counters['applied'] += 1
+
+class ClientAvailability:
+    """Recent response times per client, for availability-aware sampling.
+
+    Response times are smoothed with an EWMA; a failure or timeout counts as
+    `penalty` seconds. Clients are drawn with probability proportional to
+    1 / expected response time, so quick, reliably online laptops are asked
+    more often while slow ones still get picked now and then. Clients never
+    seen get the median of the known ones so newcomers are tried early.
+    """
+    def __init__(self, smoothing=0.3, penalty=600.0, seed=None):
+        self.smoothing = smoothing
+        self.penalty = penalty
+        self.rng = np.random.default_rng(seed)
+        self._expected = {}
+        self._lock = threading.Lock()
+
+    def record(self, cid, seconds):
+        with self._lock:
+            previous = self._expected.get(cid)
+            if previous is not None:
+                seconds = previous + self.smoothing * (seconds - previous)
+            self._expected[cid] = seconds
+
+    def failed(self, cid):
+        self.record(cid, self.penalty)
+
+    def expected(self, cid):
+        with self._lock:
+            if cid in self._expected:
+                return self._expected[cid]
+            return float(np.median(list(self._expected.values()))) if self._expected else 1.0
+
+    def sample(self, cids, k):
+        """Up to k distinct cids, favouring fast responders"""
+        cids = list(cids)
+        if k <= 0 or not cids:
+            return []
+        if k >= len(cids):
+            return cids
+        p = np.array([1.0 / max(self.expected(cid), 1e-3) for cid in cids])
+        picked = self.rng.choice(len(cids), size=k, replace=False, p=p / p.sum())
+        return [cids[i] for i in picked]
@@ -0,0 +1,142 @@
+# checkpoint.py - per-round global model checkpoints written off the FL round loop
+import glob
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+import torch
+
+log = logging.getLogger(__name__)
+
+# Defaults sit next to this file, like app.py's MODEL_PATH, so they don't depend on the working directory
+_HERE = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_DIR = os.environ.get('FL_CHECKPOINT_DIR', os.path.join(_HERE, 'checkpoints'))
+LATEST_PATH = os.environ.get('MODEL_PATH', os.path.join(_HERE, 'global_model.pth'))  # what app.py scores with
+KEEP_CHECKPOINTS = 5
+
+_NAME = re.compile(r'global_model_r(\d+)\.pth$')
+
+def _atomic_write(path, write):
+    """write(file) into a temp file next to path, fsync, then rename over path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def checkpoint_path(directory, server_round):
+    return os.path.join(directory, f'global_model_r{server_round:05d}.pth')
+
+def list_checkpoints(directory=CHECKPOINT_DIR):
+    """[(round, path)] sorted oldest first"""
+    found = []
+    for path in glob.glob(os.path.join(directory, 'global_model_r*.pth')):
+        match = _NAME.search(os.path.basename(path))
+        if match:
+            found.append((int(match.group(1)), path))
+    return sorted(found)
+
+def latest_checkpoint(directory=CHECKPOINT_DIR):
+    """(round, state_dict, metadata) of the newest checkpoint, or None"""
+    for server_round, path in reversed(list_checkpoints(directory)):
+        try:
+            state_dict = torch.load(path)
+        except Exception as e:
+            log.error("❌ Skipping unreadable checkpoint %s: %s", path, e)
+            continue
+        metadata = {}
+        sidecar = path[:-len('.pth')] + '.json'
+        if os.path.exists(sidecar):
+            with open(sidecar) as f:
+                metadata = json.load(f)
+        return server_round, state_dict, metadata
+    return None
+
+class CheckpointWriter:
+    """Saves aggregated weights on a background thread.
+
+    submit() only hands the arrays over, so a slow disk never stalls the
+    round loop. If rounds finish faster than the disk, a pending round is
+    replaced by the newer one instead of queueing up. Every write is atomic
+    (temp file + rename): versioned files plus a JSON sidecar in
+    `directory`, the newest `keep` of which are retained, and `latest_path`
+    is refreshed for the web app.
+    """
+    def __init__(self, keys, directory=CHECKPOINT_DIR, keep=KEEP_CHECKPOINTS, latest_path=LATEST_PATH):
+        os.makedirs(directory, exist_ok=True)
+        self.keys = list(keys)
+        self.directory = directory
+        self.keep = keep
+        self.latest_path = latest_path
+        self._pending = None
+        self._closed = False
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, server_round, weights, metadata=None):
+        with self._cond:
+            if self._pending is not None:
+                log.warning("⚠ Checkpoint for round %s superseded by round %s", self._pending[0], server_round)
+            self._pending = (server_round, weights, dict(metadata or {}))
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                job, self._pending = self._pending, None
+                self._busy = True
+            try:
+                self._write(*job)
+            except Exception as e:
+                log.error("❌ CHECKPOINT FAILED (round %s): %s", job[0], e)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write(self, server_round, weights, metadata):
+        started = time.perf_counter()
+        state_dict = {k: torch.from_numpy(w) for k, w in zip(self.keys, weights)}
+        path = checkpoint_path(self.directory, server_round)
+        _atomic_write(path, lambda f: torch.save(state_dict, f))
+        metadata = dict(metadata, round=server_round, saved_at=time.time(), path=os.path.basename(path))
+        sidecar = path[:-len('.pth')] + '.json'
+        _atomic_write(sidecar, lambda f: f.write(json.dumps(metadata, indent=2, default=float).encode()))
+        if self.latest_path:
+            _atomic_write(self.latest_path, lambda f: torch.save(state_dict, f))
+
+        for _, old in list_checkpoints(self.directory)[:-self.keep]:
+            for stale in (old, old[:-len('.pth')] + '.json'):
+                if os.path.exists(stale):
+                    os.remove(stale)
+        log.info("💾 Round %s checkpoint saved in %.0f ms", server_round, (time.perf_counter() - started) * 1000)
+
+    def flush(self):
+        """Block until everything submitted so far is on disk"""
+        with self._cond:
+            while self._pending is not None or self._busy:
+                self._cond.wait()
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
@@ -0,0 +1,186 @@
+# classifier.py - compiled app-name → (display name, productivity) rules
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+log = logging.getLogger(__name__)
+
+RULES_PATH = os.environ.get('APP_RULES_PATH',
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app_rules.json'))
+
+# Used when the rules file is missing; must stay in sync with app_rules.json
+DEFAULT_RULES = {
+    'title_rules': [
+        {'keywords': ['youtube', 'youtu.be'], 'display_name': 'YouTube'},
+        {'keywords': ['perplexity'], 'display_name': 'Perplexity'},
+        {'keywords': ['netflix'], 'display_name': 'Netflix'},
+    ],
+    'app_rules': [
+        {'keywords': ['youtube.com'], 'display_name': 'YouTube'},
+        {'keywords': ['chrome'], 'display_name': 'Chrome'},
+        {'keywords': ['whatsapp'], 'display_name': 'WhatsApp'},
+        {'keywords': ['instagram.com'], 'display_name': 'Instagram'},
+        {'keywords': ['telegram'], 'display_name': 'Telegram'},
+        {'keywords': ['discord'], 'display_name': 'Discord'},
+        {'keywords': ['code'], 'display_name': 'VS Code'},
+        {'keywords': ['spotify.com'], 'display_name': 'Spotify'},
+    ],
+    'browser_apps': ['chrome'],
+    'browser_title_suffixes': [' - Google Chrome'],
+    'productive_keywords': ['code', 'vscode', 'studio', 'notepad', 'word', 'excel'],
+}
+
+PRODUCTIVE = 'productive'
+UNPRODUCTIVE = 'unproductive'
+
+Classification = namedtuple('Classification', ['display_name', 'category'])
+
+class _KeywordMatcher:
+    """All keywords of an ordered rule list compiled into one regex.
+
+    The first rule (in file order) with any keyword in the text wins, exactly
+    like the old chain of `if any(x in text ...)` checks. A zero-width
+    lookahead lets finditer() report overlapping hits, and alternatives are
+    ordered by rule priority so each position yields its best rule.
+    """
+    def __init__(self, rules):
+        self.priority = {}
+        self.results = []
+        alternatives = []
+        for rank, (keywords, result) in enumerate(rules):
+            self.results.append(result)
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword and keyword not in self.priority:
+                    self.priority[keyword] = rank
+                    alternatives.append(re.escape(keyword))
+        self.regex = re.compile('(?=(%s))' % '|'.join(alternatives)) if alternatives else None
+
+    def first(self, text):
+        """Result of the highest-priority rule matching text, or None"""
+        if self.regex is None or not text:
+            return None
+        best = None
+        for match in self.regex.finditer(text):
+            rank = self.priority[match.group(1)]
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        return None if best is None else self.results[best]
+
+    def any(self, text):
+        return self.regex is not None and self.regex.search(text) is not None
+
+class _CompiledRules:
+    def __init__(self, rules, cache_size):
+        self.title = _KeywordMatcher([(r['keywords'], r['display_name']) for r in rules.get('title_rules', [])])
+        self.app = _KeywordMatcher([(r['keywords'], r['display_name']) for r in rules.get('app_rules', [])])
+        self.browsers = _KeywordMatcher([([k], True) for k in rules.get('browser_apps', [])])
+        self.title_suffixes = list(rules.get('browser_title_suffixes', []))
+        self.productive = _KeywordMatcher([(rules.get('productive_keywords', []), True)])
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+        self.is_productive = lru_cache(maxsize=cache_size)(self._is_productive)
+
+    def _display_name(self, raw_app_name, window_title):
+        if not raw_app_name:
+            return "Unknown"
+        raw_lower = raw_app_name.lower()
+
+        name = self.title.first(window_title.lower()) if window_title else None
+        if name is None:
+            name = self.app.first(raw_lower)
+        if name is not None:
+            return name
+
+        if window_title and self.browsers.any(raw_lower):
+            clean_title = window_title
+            for suffix in self.title_suffixes:
+                clean_title = clean_title.replace(suffix, '')
+            clean_title = clean_title.strip()
+            if len(clean_title) > 3:
+                return clean_title[:30]
+
+        if raw_app_name.endswith('.exe'):
+            return raw_app_name[:-4].split('\\')[-1].title()
+        return raw_app_name.split('\\')[-1].title()
+
+    def _is_productive(self, display_name):
+        return self.productive.any(display_name.lower())
+
+    def _classify(self, raw_app_name, window_title):
+        display_name = self._display_name(raw_app_name, window_title)
+        return Classification(display_name, PRODUCTIVE if self.is_productive(display_name) else UNPRODUCTIVE)
+
+class AppClassifier:
+    """Maps raw (process name, window title) pairs to a display name and category.
+
+    Rules come from a JSON file (see app_rules.json) and are compiled once.
+    The file's mtime is checked at most every `reload_interval` seconds; an
+    edited file is recompiled and swapped in without restarting the app,
+    which also drops the LRU caches.
+    """
+    def __init__(self, rules_path=RULES_PATH, cache_size=8192, reload_interval=2.0):
+        self.rules_path = rules_path
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self._compiled = None
+        self.reload(force=True)
+
+    def _load_rules(self):
+        if self.rules_path and os.path.exists(self.rules_path):
+            with open(self.rules_path, encoding='utf-8') as f:
+                return json.load(f), os.path.getmtime(self.rules_path)
+        return DEFAULT_RULES, None
+
+    def reload(self, force=False):
+        """Recompile the rules if the file changed (or always, with force)"""
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.rules_path) if self.rules_path else None
+            except OSError:
+                mtime = None
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                rules, mtime = self._load_rules()
+                self._compiled = _CompiledRules(rules, self.cache_size)
+                self._mtime = mtime
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # Keep serving the previous rules if an edit is half-written or invalid
+                if self._compiled is None:
+                    self._compiled = _CompiledRules(DEFAULT_RULES, self.cache_size)
+                self._mtime = mtime  # don't retry until the file changes again
+                log.error("❌ APP RULES NOT RELOADED: %s", e)
+                return False
+            return True
+
+    def _rules(self):
+        if self.reload_interval is not None:
+            now = time.monotonic()
+            if now >= self._next_check:
+                self._next_check = now + self.reload_interval
+                self.reload()
+        return self._compiled
+
+    def classify(self, raw_app_name, window_title=""):
+        return self._rules().classify(raw_app_name or "", window_title or "")
+
+    def display_name(self, raw_app_name, window_title=""):
+        return self.classify(raw_app_name, window_title).display_name
+
+    def is_productive(self, display_name):
+        return self._rules().is_productive(display_name or "")
+
+    def cache_info(self):
+        return self._compiled.classify.cache_info()
+
+classifier = AppClassifier()
@@ -1,69 +1,81 @@
+import logging
 import flwr as fl
-import torch
-import numpy as np
+import metrics
 from save_model import ProductivityNet
-import time
+from features import local_store
+from training import evaluate_local, split_indices, train_local, training_settings
+from codec import UpdateEncoder, get_parameters, payload_bytes, set_parameters
 
-# Your existing model
-model = ProductivityNet()
+log = logging.getLogger(__name__)
 
-# Simulated activity data (from tracker.py)
-activity_features = []  # [app_features, duration, time_of_day, etc.]
-activity_labels = []    # 0=unproductive, 1=productive
+FIT_SECONDS = metrics.histogram('fl_fit_seconds', "Client fit: local training plus update encoding",
+                                buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+EVALUATE_SECONDS = metrics.histogram('fl_evaluate_seconds', "Client evaluation on the local split")
+FIT_SAMPLES = metrics.counter('fl_fit_samples_total', "Local samples trained on")
 
-def get_activity_features(app_name, duration):
-    """Convert tracker data → ML features"""
-    features = np.array([
-        1.0 if 'code' in app_name.lower() else 0.0,
-        1.0 if 'youtube' in app_name.lower() else 0.0,
-        1.0 if duration > 300 else 0.0,
-        len(app_name) / 20.0,
-        time.time() % 86400 / 86400  # Time of day
-    ], dtype=np.float32)
-    label = 1 if 'code' in app_name.lower() else 0  # Binary classification
-    return features, label
+# Your existing model
+model = ProductivityNet()
 
 class ActivityClient(fl.client.NumPyClient):
+    def __init__(self, data=None, net=None):
+        # The simulator (simulate.py) gives each virtual client its own data and model
+        self.data = data if data is not None else local_store()  # written by tracker.py
+        self.model = net if net is not None else model
+        self.encoder = UpdateEncoder()  # keeps error-feedback residuals between rounds
+
     def get_parameters(self, config):
-        return [val.cpu().numpy() for val in model.state_dict().values()]
+        return get_parameters(self.model)
 
     def set_parameters(self, parameters):
-        params_dict = zip(model.state_dict().keys(), parameters)
-        state_dict = {k: torch.tensor(v) for k, v in params_dict}
-        model.load_state_dict(state_dict, strict=True)
+        set_parameters(self.model, parameters)
 
     def fit(self, parameters, config):
+        with FIT_SECONDS.time():
+            return self._fit(parameters, config)
+
+    def _fit(self, parameters, config):
         # Load global model
         self.set_parameters(parameters)
         
-        # Train on local activity data
-        if len(activity_features) > 0:
-            X = torch.tensor(activity_features)
-            y = torch.tensor(activity_labels)
-            
-            optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
-            criterion = torch.nn.CrossEntropyLoss()
-            
-            model.train()
-            for epoch in range(3):  # Local epochs
-                optimizer.zero_grad()
-                outputs = model(X)
-                loss = criterion(outputs, y)
-                loss.backward()
-                optimizer.step()
-            
-            print(f"✅ Client trained on {len(activity_features)} samples")
-            return self.get_parameters(config), len(activity_features), {}
+        # Train on local activity data (epochs, batch size, lr, step cap come from the server)
+        settings = training_settings(config)
+        train_idx, _ = split_indices(len(self.data), settings['val_fraction'])
+        if len(train_idx) == 0:
+            return self.get_parameters(config), 0, {}
+        
+        results = train_local(self.model, self.data.features(), self.data.labels(), train_idx, settings)
+        FIT_SAMPLES.inc(len(train_idx))
+        log.info("✅ Client trained on %d samples: %d steps, loss %.4f, %.0f samples/s",
+                 len(train_idx), results['steps'], results['train_loss'], results['samples_per_sec'])
         
-        return self.get_parameters(config), 0, {}
+        # Send a (compressed) delta against this round's global model
+        weights = self.get_parameters(config)
+        codec = str(config.get('codec', 'none'))
+        update = self.encoder.encode(weights, parameters, codec, float(config.get('topk_fraction', 0.01)))
+        results['update_bytes'] = payload_bytes(update)
+        if 'model_version' in config:
+            results['model_version'] = int(config['model_version'])  # async mode: the version trained from
+        log.info("📦 Update: %d bytes (%s, dense float32: %d)", results['update_bytes'], codec, payload_bytes(weights))
+        return update, len(train_idx), results
 
     def evaluate(self, parameters, config):
+        with EVALUATE_SECONDS.time():
+            return self._evaluate(parameters, config)
+
+    def _evaluate(self, parameters, config):
         self.set_parameters(parameters)
-        model.eval()
-        # Placeholder evaluation
-        return 0.0, len(activity_features), {"accuracy": 0.85}
+        settings = training_settings(config)
+        _, val_idx = split_indices(len(self.data), settings['val_fraction'])
+        if len(val_idx) == 0:
+            return 0.0, 0, {}
+        
+        results = evaluate_local(self.model, self.data.features(), self.data.labels(),
+                                 val_idx, settings['batch_size'])
+        return results.pop('loss'), len(val_idx), results
 
 def start_client():
+    metrics.configure_logging()
+    metrics.start_dump_from_env()
     fl.client.start_numpy_client(server_address="127.0.0.1:8080")
 
 if __name__ == '__main__':
@@ -0,0 +1,133 @@
+# codec.py - compressed model updates between client.py and server.py
+#
+# A client update travels as a plain list of ndarrays (what Flower expects):
+#   [header, arrays of tensor 0..., arrays of tensor 1..., ...]
+# The header is a uint8 array holding MAGIC + JSON {"codec": ..., "kinds": [...]}.
+# Payloads without the header are treated as plain full weights.
+import json
+import math
+import weakref
+import numpy as np
+import torch
+
+MAGIC = b'FLC1'
+CODECS = ('none', 'fp16', 'int8', 'topk')
+
+# ---------------- MODEL <-> NDARRAYS ----------------
+_state_keys = weakref.WeakKeyDictionary()
+
+def state_keys(model):
+    """state_dict key order of a model, computed once per model instance"""
+    keys = _state_keys.get(model)
+    if keys is None:
+        keys = _state_keys[model] = list(model.state_dict().keys())
+    return keys
+
+def get_parameters(model):
+    return [val.cpu().numpy() for val in model.state_dict().values()]
+
+def set_parameters(model, parameters):
+    """Load ndarrays into model; torch.from_numpy wraps them without an extra copy"""
+    state_dict = {k: torch.from_numpy(np.asarray(v)) for k, v in zip(state_keys(model), parameters)}
+    model.load_state_dict(state_dict, strict=True)
+
+def payload_bytes(arrays):
+    """Bytes of tensor data a list of ndarrays puts on the wire"""
+    return int(sum(np.asarray(a).nbytes for a in arrays))
+
+def _header(codec, kinds):
+    data = MAGIC + json.dumps({'codec': codec, 'kinds': kinds}).encode()
+    return np.frombuffer(data, dtype=np.uint8).copy()
+
+def _read_header(arrays):
+    if not arrays:
+        return None
+    first = np.asarray(arrays[0])
+    if first.dtype != np.uint8 or first.ndim != 1 or first[:len(MAGIC)].tobytes() != MAGIC:
+        return None
+    return json.loads(first[len(MAGIC):].tobytes().decode())
+
+# ---------------- PER-TENSOR ENCODINGS ----------------
+# Each returns the arrays to send; the matching decoder rebuilds a float32 delta.
+def _encode_fp16(x, _):
+    return [x.astype(np.float16)]
+
+def _decode_fp16(parts, shape):
+    return parts[0].astype(np.float32).reshape(shape)
+
+def _encode_int8(x, _):
+    peak = float(np.abs(x).max()) if x.size else 0.0
+    scale = peak / 127 if peak > 0 else 1.0
+    q = np.clip(np.rint(x / scale), -127, 127).astype(np.int8)
+    return [q, np.array([scale], dtype=np.float32)]
+
+def _decode_int8(parts, shape):
+    return (parts[0].astype(np.float32) * parts[1][0]).reshape(shape)
+
+def _encode_topk(x, fraction):
+    flat = x.reshape(-1)
+    k = min(flat.size, max(1, math.ceil(fraction * flat.size)))
+    idx = np.argpartition(np.abs(flat), flat.size - k)[flat.size - k:].astype(np.int32)
+    return [idx, flat[idx].astype(np.float32)]
+
+def _decode_topk(parts, shape):
+    flat = np.zeros(int(np.prod(shape)), dtype=np.float32)
+    flat[parts[0]] = parts[1]
+    return flat.reshape(shape)
+
+_ENCODERS = {'fp16': _encode_fp16, 'int8': _encode_int8, 'topk': _encode_topk}
+_DECODERS = {'fp16': (_decode_fp16, 1), 'int8': (_decode_int8, 2), 'topk': (_decode_topk, 2)}
+
+class UpdateEncoder:
+    """Client side: encode trained weights as a compressed delta from the round's global model.
+
+    Lossy codecs use error feedback: what compression dropped this round is
+    kept in `residuals` and added to the next round's delta, so small
+    updates are delayed rather than lost.
+    """
+    def __init__(self):
+        self.residuals = None
+
+    def encode(self, weights, global_weights, codec='fp16', topk_fraction=0.01):
+        if codec not in CODECS:
+            raise ValueError(f"unknown codec {codec!r}, expected one of {CODECS}")
+        if codec == 'none':
+            return [_header('none', ['raw'] * len(weights))] + [np.asarray(w) for w in weights]
+
+        if self.residuals is None or len(self.residuals) != len(weights):
+            self.residuals = [None] * len(weights)
+        kinds, arrays = [], []
+        for i, (w, g) in enumerate(zip(weights, global_weights)):
+            w = np.asarray(w)
+            if not np.issubdtype(w.dtype, np.floating):
+                kinds.append('raw')  # integer buffers (e.g. counters) go as-is
+                arrays.append(w)
+                continue
+            delta = w.astype(np.float32) - np.asarray(g, dtype=np.float32)
+            if self.residuals[i] is not None and self.residuals[i].shape == delta.shape:
+                delta += self.residuals[i]
+            parts = _ENCODERS[codec](delta, topk_fraction)
+            decoder, _ = _DECODERS[codec]
+            self.residuals[i] = delta - decoder(parts, delta.shape)
+            kinds.append(codec)
+            arrays.extend(parts)
+        return [_header(codec, kinds)] + arrays
+
+def decode_update(arrays, global_weights):
+    """Server side: rebuild full weights from an encoded client payload"""
+    header = _read_header(arrays)
+    if header is None:
+        return [np.asarray(a) for a in arrays]  # plain weights (older clients)
+
+    weights, pos = [], 1
+    for kind, g in zip(header['kinds'], global_weights):
+        g = np.asarray(g)
+        if kind == 'raw':
+            weights.append(np.asarray(arrays[pos]))
+            pos += 1
+            continue
+        decoder, count = _DECODERS[kind]
+        delta = decoder([np.asarray(a) for a in arrays[pos:pos + count]], g.shape)
+        weights.append((g.astype(np.float32) + delta).astype(g.dtype, copy=False))
+        pos += count
+    return weights
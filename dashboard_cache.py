@@ -0,0 +1,73 @@
+# dashboard_cache.py - computed dashboard contexts, invalidated by per-user version counters
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+class CacheEntry:
+    __slots__ = ('key', 'value', 'version', 'created')
+
+    def __init__(self, key, value, version, created):
+        self.key = key
+        self.value = value
+        self.version = version
+        self.created = created
+
+    def etag(self, *extra):
+        """Strong validator for this entry as rendered for `extra` (e.g. the viewer)"""
+        raw = repr((self.key, self.version, self.created) + extra).encode()
+        return hashlib.sha1(raw).hexdigest()[:20]
+
+class DashboardCache:
+    """Bounded LRU of dashboard contexts with a TTL.
+
+    Every insert bumps the version of the users it touched (and the
+    classroom version); an entry only counts while the version it was
+    computed at is still current and it is younger than `ttl` seconds. The
+    TTL is what lets rows age out of the sliding 24h window.
+    In-process state, so like live_stats it is exact for one process only.
+    """
+    def __init__(self, max_entries=1024, ttl=60.0, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = defaultdict(int)
+        self._class_version = 0
+        self._lock = threading.Lock()
+
+    def bump(self, user_ids):
+        with self._lock:
+            for user_id in set(user_ids):
+                self._versions[user_id] += 1
+            self._class_version += 1
+
+    def version(self, user_id=None):
+        """Version of one user's data, or of the whole classroom when user_id is None"""
+        with self._lock:
+            return self._class_version if user_id is None else self._versions[user_id]
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version and self.clock() - entry.created < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, version, value):
+        entry = CacheEntry(key, value, version, self.clock())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_or_compute(self, key, version, compute):
+        return self.get(key, version) or self.put(key, version, compute())
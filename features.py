@@ -0,0 +1,101 @@
+# features.py - activity → ProductivityNet features, shared by tracker.py and client.py
+import os
+import numpy as np
+
+# Column order of the 5 inputs ProductivityNet expects
+FEATURE_NAMES = ('productive_app', 'entertainment_app', 'long_session', 'name_length', 'browser')
+NUM_FEATURES = len(FEATURE_NAMES)
+
+DEFAULT_CAPACITY = 100_000
+
+def _contains_any(names, words):
+    mask = np.zeros(names.shape, dtype=bool)
+    for word in words:
+        mask |= np.char.find(names, word) >= 0
+    return mask
+
+def get_activity_features(app_names, durations):
+    """Encode a batch of activities at once.
+
+    Returns (features float32 [n, 5], labels int64 [n]); label 1 = productive.
+    """
+    raw = np.asarray(app_names, dtype=np.str_)
+    names = np.char.lower(raw)
+    durations = np.asarray(durations, dtype=np.float32)
+
+    productive = _contains_any(names, ('code', 'studio'))
+    features = np.empty((len(raw), NUM_FEATURES), dtype=np.float32)
+    features[:, 0] = productive                                  # productive
+    features[:, 1] = _contains_any(names, ('youtube', 'netflix'))  # entertainment
+    features[:, 2] = durations > 300                             # long session
+    features[:, 3] = np.char.str_len(raw) / 20.0                 # app complexity
+    features[:, 4] = _contains_any(names, ('chrome',))           # browser time
+    return features, productive.astype(np.int64)
+
+class ActivityDataStore:
+    """Fixed-capacity ring buffer of training samples in memory-mapped .npy files.
+
+    The tracker appends to it and the Flower client trains straight from the
+    mapped arrays (see features()/labels()), so samples survive restarts,
+    disk use is bounded, and no per-sample Python objects are kept.
+    """
+    def __init__(self, path=None, capacity=DEFAULT_CAPACITY):
+        path = path or os.environ.get('FL_DATA_DIR', 'fl_data')
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._features = self._open('features.npy', (capacity, NUM_FEATURES), np.float32)
+        self._labels = self._open('labels.npy', (self._features.shape[0],), np.int64)
+        self._state = self._open('state.npy', (2,), np.int64)  # [next write slot, samples stored]
+        self.capacity = self._features.shape[0]
+
+    def _open(self, name, shape, dtype):
+        filename = os.path.join(self.path, name)
+        if os.path.exists(filename):
+            # Capacity is fixed when the files are first created
+            return np.lib.format.open_memmap(filename, mode='r+')
+        array = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=shape)
+        array.flush()
+        return array
+
+    def __len__(self):
+        return int(self._state[1])
+
+    def append(self, features, labels):
+        """Write a batch of samples, overwriting the oldest once full"""
+        features = np.asarray(features, dtype=np.float32).reshape(-1, NUM_FEATURES)
+        labels = np.asarray(labels, dtype=np.int64).reshape(-1)
+        count = len(labels)
+        if count == 0:
+            return
+        if count > self.capacity:
+            features, labels = features[-self.capacity:], labels[-self.capacity:]
+            count = self.capacity
+
+        head = int(self._state[0])
+        slots = (head + np.arange(count)) % self.capacity
+        self._features[slots] = features
+        self._labels[slots] = labels
+        self._state[0] = (head + count) % self.capacity
+        self._state[1] = min(len(self) + count, self.capacity)
+        for array in (self._features, self._labels, self._state):
+            array.flush()
+
+    def features(self):
+        """[n, 5] float32 view of the stored samples (no copy)"""
+        return self._features[:len(self)]
+
+    def labels(self):
+        """[n] int64 view of the stored labels (no copy)"""
+        return self._labels[:len(self)]
+
+_local_store = None
+
+def local_store():
+    """This machine's store (FL_DATA_DIR, default fl_data/): tracker.py writes it, client.py trains on it.
+
+    Opened on first use, so importing either module creates nothing on disk.
+    """
+    global _local_store
+    if _local_store is None:
+        _local_store = ActivityDataStore()
+    return _local_store
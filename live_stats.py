@@ -0,0 +1,163 @@
+# live_stats.py - in-process sliding-window usage totals per user
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+# Same shape as the rows app.window_totals() returns for one user
+UsageRow = namedtuple('UsageRow', ['display_name', 'category', 'seconds', 'count'])
+
+def epoch_seconds(ts):
+    """Stored timestamps are naive and compared as if UTC, so treat them that way here"""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+class _UserWindow:
+    """Ring buffer of per-bucket {display name: [seconds, count]} plus running totals.
+
+    Slot i holds bucket number b where b % num_buckets == i. Sliding the
+    window subtracts each expiring slot from the running totals, so reads
+    cost O(expired buckets + apps) instead of a rescan.
+    """
+    def __init__(self, num_buckets, head):
+        self.num_buckets = num_buckets
+        self.slots = [None] * num_buckets  # (bucket number, {name: [seconds, count]})
+        self.head = head                    # newest bucket number covered
+        self.totals = {}                    # name → [seconds, count, category]
+        self.loaded_max_id = 0              # highest Activity.id in the _load() snapshot
+
+    def advance(self, bucket):
+        if bucket <= self.head:
+            return
+        if bucket - self.head >= self.num_buckets:
+            expiring = range(len(self.slots))
+        else:
+            expiring = [b % self.num_buckets for b in range(self.head + 1, bucket + 1)]
+        for i in expiring:
+            slot = self.slots[i]
+            if slot is not None:
+                for name, (secs, count) in slot[1].items():
+                    total = self.totals[name]
+                    total[0] -= secs
+                    total[1] -= count
+                    if total[1] <= 0:
+                        del self.totals[name]
+                self.slots[i] = None
+        self.head = bucket
+
+    def add(self, bucket, name, category, seconds):
+        if bucket <= self.head - self.num_buckets:
+            return  # already outside the window
+        bucket = min(bucket, self.head)  # future-dated rows count in the newest bucket
+        i = bucket % self.num_buckets
+        slot = self.slots[i]
+        if slot is None or slot[0] != bucket:
+            slot = self.slots[i] = (bucket, {})
+        entry = slot[1].setdefault(name, [0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+        total = self.totals.setdefault(name, [0, 0, category])
+        total[0] += seconds
+        total[1] += 1
+        total[2] = category
+
+class SlidingWindowStore:
+    """Per-user usage totals over the last `window_seconds`, kept in memory.
+
+    - add_rows() is fed freshly committed activity rows by the ingest path.
+    - totals() rebuilds a user lazily from the database via `loader` the
+      first time they are read (e.g. after a restart) and then serves
+      O(buckets) reads.
+    - At most `max_users` users are held; the least recently used is evicted.
+
+    The window is aligned to bucket boundaries, so it can start up to one
+    bucket earlier than an exact now-minus-24h cutoff; window_start() gives
+    the exact start for comparing against SQL.
+
+    Only rows ingested by this process are seen, so enable it only when the
+    web app runs as a single process.
+    """
+    def __init__(self, loader, window_seconds=86400, bucket_seconds=60, max_users=1000, clock=time.time):
+        self.loader = loader  # loader(user_id, since) → rows with id, display_name, category, duration_seconds, timestamp_start
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = -(-window_seconds // bucket_seconds)
+        self.max_users = max_users
+        self.clock = clock
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, ts):
+        return int(epoch_seconds(ts) // self.bucket_seconds)
+
+    def _now_bucket(self):
+        return int(self.clock() // self.bucket_seconds)
+
+    def window_start(self):
+        """Oldest instant (aware UTC) covered by the window"""
+        first = self._now_bucket() - self.num_buckets + 1
+        return datetime.fromtimestamp(first * self.bucket_seconds, tz=timezone.utc)
+
+    def _apply(self, window, rows):
+        for row in rows:
+            if row.get('timestamp_start') is None or row.get('id', 0) <= window.loaded_max_id:
+                continue
+            window.add(self._bucket(row['timestamp_start']), row['display_name'],
+                       row['category'], row['duration_seconds'])
+
+    def _load(self, user_id):
+        window = _UserWindow(self.num_buckets, self._now_bucket())
+        rows = [r._asdict() if hasattr(r, '_asdict') else r for r in self.loader(user_id, self.window_start())]
+        self._apply(window, rows)
+        window.loaded_max_id = max((r['id'] for r in rows), default=0)
+        self._users[user_id] = window
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        return window
+
+    def add_rows(self, rows):
+        """Count newly committed rows (dicts with id) for users already in memory.
+
+        Only rows already in the load snapshot are skipped. Concurrent ingests
+        can arrive here out of id order, so the high-water mark is never raised.
+        """
+        with self._lock:
+            now = self._now_bucket()
+            for row in rows:
+                window = self._users.get(row['user_id'])
+                if window is not None:
+                    window.advance(now)
+                    self._apply(window, [row])
+
+    def totals(self, user_id):
+        """UsageRow list for the user's current window"""
+        with self._lock:
+            window = self._users.get(user_id)
+            if window is None:
+                window = self._load(user_id)
+            else:
+                self._users.move_to_end(user_id)
+            window.advance(self._now_bucket())
+            return [UsageRow(name, category, secs, count)
+                    for name, (secs, count, category) in window.totals.items()]
+
+    def forget(self, user_id=None):
+        """Drop one user (or everyone); they are reloaded on next read"""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def check(self, user_id, expected_rows):
+        """Compare totals() with rows computed elsewhere (e.g. SQL over window_start()).
+
+        Returns {display name: (in memory, expected)} for every mismatch.
+        """
+        mine = {r.display_name: (r.seconds, r.count) for r in self.totals(user_id)}
+        theirs = {r.display_name: (r.seconds, r.count) for r in expected_rows}
+        return {name: (mine.get(name), theirs.get(name))
+                for name in mine.keys() | theirs.keys() if mine.get(name) != theirs.get(name)}
+
+    def __len__(self):
+        return len(self._users)
@@ -0,0 +1,314 @@
+# metrics.py - in-process counters, gauges and histograms, rendered in the Prometheus text format
+#
+# The web app serves REGISTRY.render() at /metrics. The tracker and the FL
+# processes have no HTTP server, so they write the same text to METRICS_FILE
+# every few seconds (node_exporter's textfile collector can scrape that).
+# Everything here is per process, like live_stats and the dashboard cache.
+import atexit
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Samples
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+def configure_logging(level=None):
+    """Root logger at LOG_LEVEL (default INFO); a no-op if logging is already set up"""
+    logging.basicConfig(level=(level or os.environ.get('LOG_LEVEL', 'INFO')).upper(),
+                        format='%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._function = None
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def set_function(self, function):
+        """Read the value from function() at render time (unlabelled metrics only)"""
+        self._function = function
+        return self
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                return [('', (), (), self._function())]
+            except Exception as e:
+                log.warning("⚠ metric %s not collected: %s", self.name, e)
+                return []
+        with self._lock:
+            return [('', key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labels, key, extra)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+class Histogram(_Metric):
+    """Cumulative buckets plus _sum and _count, per label set"""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        slot = bisect_left(self.buckets, value)  # first bucket with le >= value; len() is +Inf
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][slot] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """with histogram.time(): ... observes the block's wall time in seconds"""
+        return _Timer(self, labels)
+
+    def value(self, **labels):
+        """(count, sum) for one label set"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return (state[2], state[1]) if state else (0, 0.0)
+
+    def _samples(self):
+        with self._lock:
+            snapshot = [(key, list(state[0]), state[1], state[2]) for key, state in sorted(self._values.items())]
+        samples = []
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                samples.append(('_bucket', key, (('le', _format_value(bound)),), cumulative))
+            samples.append(('_sum', key, (), total))
+            samples.append(('_count', key, (), count))
+        return samples
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._dump_thread = None
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get_or_create(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._get_or_create(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, help, labels, buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """Write render() to path atomically, so a scraper never reads half a file"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.render())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def start_dump(self, path, interval=15.0):
+        """Dump every `interval` seconds on a daemon thread, and once more at exit"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.dump(path)
+                except OSError as e:
+                    log.warning("⚠ METRICS DUMP FAILED (%s): %s", path, e)
+
+        if self._dump_thread is None:
+            self._dump_thread = threading.Thread(target=run, name='metrics-dump', daemon=True)
+            self._dump_thread.start()
+            atexit.register(self.dump, path)
+        return self._dump_thread
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+def start_dump_from_env():
+    """Non-web processes: dump to METRICS_FILE (every METRICS_DUMP_INTERVAL s) when it is set"""
+    path = os.environ.get('METRICS_FILE')
+    if path:
+        REGISTRY.start_dump(path, float(os.environ.get('METRICS_DUMP_INTERVAL', 15)))
+        log.info("📈 Metrics → %s", path)
+
+# ---------------- PEAK MEMORY ----------------
+def peak_rss_mb():
+    """Peak resident set size in MiB: this process or its largest child, whichever is bigger"""
+    try:
+        import resource
+    except ImportError:  # Windows: psutil reports the peak working set
+        import psutil
+        processes = [psutil.Process()]
+        processes += processes[0].children(recursive=True)
+        peaks = []
+        for process in processes:
+            try:
+                info = process.memory_info()
+            except psutil.Error:  # a child that exited meanwhile
+                continue
+            peaks.append(getattr(info, 'peak_wset', info.rss))
+        return max(peaks) / 2 ** 20
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    unit = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    return max(own, children) * unit / 2 ** 20
+
+# ---------------- SLOW REQUEST PROFILER ----------------
+def _stack_key(frame, limit=40):
+    """Collapsed stack, root first ("file:function:line;..."), as flamegraph.pl expects"""
+    parts = []
+    while frame is not None and len(parts) < limit:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+class SlowRequestProfiler:
+    """Opt-in sampling profiler for requests slower than `threshold_ms`.
+
+    One daemon thread samples the stacks of the threads currently inside a
+    request every `interval_ms` (sys._current_frames, so nothing is traced
+    and fast requests only pay for begin()/end()). When a request finishes
+    over the threshold its hottest stacks are logged as a warning.
+    """
+    def __init__(self, threshold_ms=500.0, interval_ms=5.0, top=5):
+        self.threshold = threshold_ms / 1000.0
+        self.interval = interval_ms / 1000.0
+        self.top = top
+        self.slow_requests = 0
+        self._active = {}  # thread id -> stack samples
+        self._lock = threading.Condition()
+        self._thread = None
+
+    def begin(self):
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._active[thread_id] = _Samples()
+            self._lock.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+                self._thread.start()
+        return thread_id
+
+    def end(self, token, elapsed, label=''):
+        with self._lock:
+            samples = self._active.pop(token, None)
+        if samples is None or elapsed < self.threshold:
+            return None
+        self.slow_requests += 1
+        total = sum(samples.values())
+        lines = [f"{count:5d} {stack}" for stack, count in samples.most_common(self.top)]
+        log.warning("🐢 SLOW REQUEST %s: %.0f ms, %d samples\n%s", label, elapsed * 1000, total,
+                    '\n'.join(lines) or "  (finished before the first sample)")
+        return samples
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._lock.wait()  # no request in flight: don't wake every interval
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != me:
+                        samples[_stack_key(frame)] += 1
@@ -0,0 +1,83 @@
+# migrate_db.py - bring an existing users.db up to the current schema
+# Usage: python migrate_db.py [--reclassify]
+import sys
+from sqlalchemy import inspect, text, update
+from sqlalchemy.schema import CreateColumn
+from app import app, db, Activity, ActivityHourly, update_hourly_rollup
+from classifier import classifier
+
+BATCH = 5000
+
+def ensure_columns():
+    """create_all() never alters existing tables, so add missing columns here"""
+    inspector = inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                db.session.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                added.append(f"{table.name}.{column.name}")
+    db.session.commit()
+    return added
+
+def ensure_indexes():
+    """...and never adds new indexes to them either"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+def backfill_display_names(reclassify=False):
+    """Store display_name/category on rows written before they existed.
+
+    With reclassify=True every row is recomputed, e.g. after app_rules.json changed.
+    """
+    last_id, total = 0, 0
+    while True:
+        query = db.session.query(Activity.id, Activity.app_name, Activity.window_title).filter(Activity.id > last_id)
+        if not reclassify:
+            query = query.filter(Activity.display_name.is_(None))
+        chunk = query.order_by(Activity.id).limit(BATCH).all()
+        if not chunk:
+            break
+        updates = []
+        for activity_id, app_name, window_title in chunk:
+            display_name, category = classifier.classify(app_name, window_title or "")
+            updates.append({'id': activity_id, 'display_name': display_name, 'category': category})
+        db.session.execute(update(Activity), updates)
+        db.session.commit()
+        last_id = chunk[-1][0]
+        total += len(chunk)
+    return total
+
+def rebuild_hourly_rollup():
+    """Recompute ActivityHourly from raw Activity rows, streaming in batches"""
+    db.session.execute(text(f"DELETE FROM {ActivityHourly.__tablename__}"))
+    rows, total = [], 0
+    query = db.session.query(
+        Activity.user_id, Activity.display_name, Activity.category,
+        Activity.duration_seconds, Activity.timestamp_start
+    ).execution_options(yield_per=BATCH)
+    for r in query:
+        rows.append(r._asdict())
+        if len(rows) >= BATCH:
+            update_hourly_rollup(rows)
+            total += len(rows)
+            rows = []
+    update_hourly_rollup(rows)
+    total += len(rows)
+    db.session.commit()
+    return total
+
+if __name__ == '__main__':
+    with app.app_context():
+        db.create_all()
+        for column in ensure_columns():
+            print(f"➕ Added column {column}")
+        ensure_indexes()
+        print("✅ Indexes ready")
+        count = backfill_display_names(reclassify='--reclassify' in sys.argv)
+        print(f"✅ Display name/category stored for {count} activities")
+        count = rebuild_hourly_rollup()
+        print(f"✅ Hourly rollup rebuilt from {count} activities")
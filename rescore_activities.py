@@ -0,0 +1,37 @@
+# rescore_activities.py - recompute Activity.fl_score with the current global model
+# Usage: python rescore_activities.py [--since 2026-01-01]
+import sys
+from datetime import datetime
+from sqlalchemy import func, update
+from app import app, db, Activity, scorer
+
+BATCH = 5000
+
+def rescore(since=None):
+    """Keyset-paged bulk re-score from the same inputs as ingest (the raw process name).
+
+    Rows stored before raw_app_name existed fall back to the normalized app name.
+    """
+    last_id, total = 0, 0
+    app_name = func.coalesce(Activity.raw_app_name, Activity.app_name).label('app_name')
+    while True:
+        query = db.session.query(Activity.id, app_name, Activity.duration_seconds).filter(Activity.id > last_id)
+        if since is not None:
+            query = query.filter(Activity.timestamp_start >= since)
+        chunk = query.order_by(Activity.id).limit(BATCH).all()
+        if not chunk:
+            break
+        scores = scorer.score([r.app_name for r in chunk], [r.duration_seconds for r in chunk])
+        db.session.execute(update(Activity), [{'id': r.id, 'fl_score': float(s)} for r, s in zip(chunk, scores)])
+        db.session.commit()
+        last_id = chunk[-1].id
+        total += len(chunk)
+    return total
+
+if __name__ == '__main__':
+    since = datetime.fromisoformat(sys.argv[sys.argv.index('--since') + 1]) if '--since' in sys.argv else None
+    with app.app_context():
+        if not scorer.reload(force=True):
+            print(f"❌ No usable model at {scorer.path}")
+            sys.exit(1)
+        print(f"✅ Re-scored {rescore(since)} activities")
@@ -1,21 +1,29 @@
+import os
+import sys
 import torch
 import torch.nn as nn
 import flwr as fl
 
 class ProductivityNet(nn.Module):
-    def __init__(self):
+    def __init__(self, hidden1=32, hidden2=16):
+        # Defaults give the 5-32-16-2 net stored in global_model.pth; wider
+        # layers are only used to benchmark larger models (see bench_fl.py)
         super().__init__()
-        self.fc1 = nn.Linear(5, 32)
-        self.fc2 = nn.Linear(32, 16)
-        self.fc3 = nn.Linear(16, 2)
+        self.fc1 = nn.Linear(5, hidden1)
+        self.fc2 = nn.Linear(hidden1, hidden2)
+        self.fc3 = nn.Linear(hidden2, 2)
 
     def forward(self, x):
         x = torch.relu(self.fc1(x))
         x = torch.relu(self.fc2(x))
         return self.fc3(x)
 
-# Save the final federated model
-model = ProductivityNet()
-# Flower server saves final parameters internally - simulate save
-torch.save(model.state_dict(), 'global_model.pth')
-print("✅ global_model.pth SAVED! Dashboard will now use ML!")
+if __name__ == '__main__':
+    # Initial (untrained) global model; server.py overwrites global_model.pth
+    # with the aggregated model after every round (see checkpoint.py)
+    if os.path.exists('global_model.pth') and '--force' not in sys.argv:
+        print("⚠ global_model.pth already exists (use --force to reset it to random weights)")
+        sys.exit(1)
+    model = ProductivityNet()
+    torch.save(model.state_dict(), 'global_model.pth')
+    print("✅ global_model.pth SAVED! Dashboard will now use ML!")
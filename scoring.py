@@ -0,0 +1,153 @@
+# scoring.py - score activities with the global ProductivityNet, NumPy only
+#
+# The web app must not pay for importing torch, so this reads torch.save()
+# checkpoints (zip + pickle) directly and runs the MLP forward pass in NumPy.
+import logging
+import os
+import pickle
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+
+from features import get_activity_features
+
+log = logging.getLogger(__name__)
+
+_STORAGE_DTYPES = {
+    'FloatStorage': np.float32, 'DoubleStorage': np.float64, 'HalfStorage': np.float16,
+    'LongStorage': np.int64, 'IntStorage': np.int32, 'ShortStorage': np.int16,
+    'CharStorage': np.int8, 'ByteStorage': np.uint8, 'BoolStorage': np.bool_,
+}
+
+def _rebuild_tensor(storage, storage_offset, size, stride, *_):
+    itemsize = storage.dtype.itemsize
+    view = np.lib.stride_tricks.as_strided(storage[storage_offset:], shape=tuple(size),
+                                           strides=tuple(s * itemsize for s in stride))
+    return np.array(view)
+
+class _CheckpointUnpickler(pickle.Unpickler):
+    """Unpickles a torch state_dict into NumPy arrays; refuses any other globals"""
+    def __init__(self, file, archive, prefix):
+        super().__init__(file)
+        self.archive = archive
+        self.prefix = prefix
+
+    def find_class(self, module, name):
+        if (module, name) == ('collections', 'OrderedDict'):
+            return OrderedDict
+        if module == 'torch._utils' and name in ('_rebuild_tensor_v2', '_rebuild_tensor'):
+            return _rebuild_tensor
+        if module == 'torch' and name in _STORAGE_DTYPES:
+            return _STORAGE_DTYPES[name]
+        raise pickle.UnpicklingError(f"unsupported global in checkpoint: {module}.{name}")
+
+    def persistent_load(self, saved_id):
+        _, dtype, key, _, numel = saved_id
+        data = self.archive.read(f"{self.prefix}data/{key}")
+        return np.frombuffer(data, dtype=dtype, count=numel)
+
+def load_state_dict(path):
+    """{name: ndarray} from a torch.save()'d state_dict, without importing torch"""
+    with zipfile.ZipFile(path) as archive:
+        pkl = next(n for n in archive.namelist() if n.endswith('data.pkl'))
+        prefix = pkl[:-len('data.pkl')]
+        with archive.open(pkl) as f:
+            return _CheckpointUnpickler(f, archive, prefix).load()
+
+class NumpyMLP:
+    """Forward pass of a stack of nn.Linear layers with ReLU between them"""
+    def __init__(self, state_dict):
+        self.layers = []
+        for name, weight in state_dict.items():
+            if name.endswith('.weight'):
+                bias = state_dict[name[:-len('weight')] + 'bias']
+                self.layers.append((np.ascontiguousarray(weight.T, dtype=np.float32),
+                                    np.asarray(bias, dtype=np.float32)))
+
+    def productive_probability(self, X):
+        x = np.asarray(X, dtype=np.float32)
+        for i, (w_t, b) in enumerate(self.layers):
+            x = x @ w_t + b
+            if i < len(self.layers) - 1:
+                np.maximum(x, 0, out=x)
+        # softmax over the 2 classes; class 1 = productive
+        x -= x.max(axis=1, keepdims=True)
+        e = np.exp(x)
+        return e[:, 1] / e.sum(axis=1)
+
+class ActivityScorer:
+    """Loads the latest global checkpoint and scores activities in batches.
+
+    The checkpoint's mtime is checked at most every `reload_interval`
+    seconds and a changed file is loaded in place. Scores are cached per
+    feature vector (an LRU of `cache_size` entries), since most activities
+    share a handful of app/duration combinations.
+    """
+    def __init__(self, path, cache_size=4096, reload_interval=5.0):
+        self.path = path
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self.model = None
+        self.version = None  # mtime of the loaded checkpoint
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+
+    def reload(self, force=False):
+        """Load the checkpoint if it changed; returns True when a new model was loaded"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if not force and mtime == self.version:
+            return False
+        try:
+            model = NumpyMLP(load_state_dict(self.path))
+        except Exception as e:
+            log.error("❌ MODEL LOAD FAILED (%s): %s", self.path, e)
+            self.version = mtime  # don't retry until the file changes again
+            return False
+        with self._lock:
+            self.model, self.version = model, mtime
+            self._cache.clear()
+        log.info("🧠 MODEL LOADED: %s", self.path)
+        return True
+
+    def _current_model(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.reload_interval
+            self.reload()
+        return self.model
+
+    def score(self, app_names, durations):
+        """P(productive) per activity as a float array, or None when no model is available"""
+        model = self._current_model()
+        if model is None:
+            return None
+        features, _ = get_activity_features(app_names, durations)
+        keys = [row.tobytes() for row in features]
+        scores = np.empty(len(keys), dtype=np.float64)
+
+        with self._lock:
+            missing = []
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    scores[i] = cached
+        if missing:
+            scores[missing] = model.productive_probability(features[missing])
+            with self._lock:
+                if model is not self.model:
+                    return scores  # reloaded meanwhile; don't cache stale scores
+                for i in missing:
+                    self._cache[keys[i]] = scores[i]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
@@ -0,0 +1,124 @@
+# segments.py - coalesce raw focus segments before they are uploaded
+from classifier import classifier
+
+class _Segment:
+    __slots__ = ('app_name', 'display_name', 'start', 'end', 'active', 'titles')
+
+    def __init__(self, app_name, display_name, window_title, start, end):
+        self.app_name = app_name
+        self.display_name = display_name
+        self.start = start
+        self.end = end
+        self.active = (end - start).total_seconds()  # focused time; gaps between merged segments don't count
+        self.titles = {window_title: self.active}
+
+    def seconds(self):
+        return self.active
+
+    def absorb(self, segment):
+        self.end = segment.end
+        self.active += segment.active
+        for title, seconds in segment.titles.items():
+            self.titles[title] = self.titles.get(title, 0) + seconds
+
+    def activity(self):
+        return {
+            'app_name': self.app_name,
+            'window_title': max(self.titles, key=self.titles.get),  # the title shown longest
+            'duration_seconds': int(self.seconds()),
+            'timestamp_start': self.start.isoformat(),
+            'timestamp_end': self.end.isoformat()
+        }
+
+class SegmentCoalescer:
+    """Turns the tracker's raw focus segments into fewer, longer activities.
+
+    Segments are keyed by display name (the same rules as get_display_name),
+    so title churn inside one app - tab switches, "(3) YouTube", unsaved-file
+    markers - doesn't start a new activity. Consecutive segments with the same
+    display name are merged when the gap between them is at most `merge_gap`
+    seconds. Fragments shorter than `min_duration` are folded into the
+    neighbouring activity instead of being dropped. An activity's duration is
+    the sum of its segments, so a merged gap never counts as use.
+
+    add(), expire() and flush() return the activities that are finished.
+    """
+    def __init__(self, min_duration=15, merge_gap=120.0):
+        self.min_duration = min_duration
+        self.merge_gap = merge_gap
+        self.pending = None  # the activity still open for merging
+        self.carry = None    # a fragment waiting for the next segment
+        self.raw_segments = 0
+        self.emitted = 0
+
+    def _emit(self, segment):
+        self.emitted += 1
+        return [segment.activity()]
+
+    def add(self, app_name, window_title, start, end):
+        self.raw_segments += 1
+        segment = _Segment(app_name, classifier.display_name(app_name, window_title), window_title, start, end)
+        finished = []
+
+        if self.carry is not None:
+            if (segment.start - self.carry.end).total_seconds() <= self.merge_gap:
+                segment.start = self.carry.start  # the fragment's time goes to what came next
+                segment.active += self.carry.active
+            else:
+                finished += self._emit(self.carry)
+            self.carry = None
+
+        pending = self.pending
+        if pending is not None and (segment.start - pending.end).total_seconds() <= self.merge_gap:
+            if segment.display_name == pending.display_name:
+                pending.absorb(segment)
+                return finished
+            if segment.seconds() < self.min_duration:
+                pending.end = segment.end  # too short to stand alone; credit the activity before it
+                pending.active += segment.active
+                return finished
+
+        if pending is not None:
+            finished += self._emit(pending)
+            self.pending = None
+        if segment.seconds() < self.min_duration:
+            self.carry = segment
+        else:
+            self.pending = segment
+        return finished
+
+    def expire(self, now, open_segment=None):
+        """Finish whatever can no longer be merged with a segment starting at `now`.
+
+        open_segment is the tracker's (app_name, window_title, start) still in
+        progress: whatever it will merge with when it closes is kept, however
+        long it runs.
+        """
+        finished = []
+        for attr in ('carry', 'pending'):
+            segment = getattr(self, attr)
+            if segment is None or self._merges_with_open(segment, attr, open_segment):
+                continue
+            if (now - segment.end).total_seconds() > self.merge_gap:
+                finished += self._emit(segment)
+                setattr(self, attr, None)
+        return finished
+
+    def _merges_with_open(self, segment, attr, open_segment):
+        if open_segment is None:
+            return False
+        app_name, window_title, start = open_segment
+        if (start - segment.end).total_seconds() > self.merge_gap:
+            return False
+        # a fragment joins whatever comes next; an activity only the same display name
+        return attr == 'carry' or classifier.display_name(app_name, window_title) == segment.display_name
+
+    def flush(self):
+        """Finish everything (idle or shutdown); a lone fragment is still reported"""
+        finished = []
+        for attr in ('pending', 'carry'):
+            segment = getattr(self, attr)
+            if segment is not None:
+                finished += self._emit(segment)
+                setattr(self, attr, None)
+        return finished
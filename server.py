@@ -1,43 +1,318 @@
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import flwr as fl
 import torch
+from flwr.common import Code, FitIns, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.history import History
+import metrics
 from save_model import ProductivityNet  # Your existing model!
+from codec import decode_update, get_parameters, state_keys
+from aggregation import make_aggregator
+from buffered import BufferedAggregator, ClientAvailability
+from checkpoint import CheckpointWriter, LATEST_PATH, latest_checkpoint
 
-# Load your existing global model
+log = logging.getLogger(__name__)
+
+ROUND_SECONDS = metrics.histogram('fl_round_seconds', "configure_fit to aggregated weights",
+                                  buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800))
+AGGREGATION_SECONDS = metrics.histogram('fl_aggregation_seconds', "Decoding and combining client updates",
+                                        ('mode',))
+UPDATE_BYTES = metrics.histogram('fl_update_bytes', "Client update size on the wire", buckets=metrics.BYTES_BUCKETS)
+ROUND_CLIENTS = metrics.counter('fl_round_clients_total', "Client fit results by outcome", ('result',))
+LAST_ROUND = metrics.gauge('fl_round', "Last aggregated round")
+ASYNC_UPDATES = metrics.counter('fl_async_updates_total', "Asynchronous client updates by outcome", ('result',))
+STALENESS = metrics.histogram('fl_update_staleness', "Model versions a client update is behind",
+                              buckets=(0, 1, 2, 4, 8, 16))
+
+# Your existing global model (weights loaded by resume_global_model())
 global_model = ProductivityNet()
-global_model.load_state_dict(torch.load('global_model.pth'))
 global_model.eval()
 
-def get_parameters(model):
-    return [val.cpu().numpy() for val in model.state_dict().values()]
+def resume_global_model(model):
+    """Load the newest round checkpoint, else global_model.pth; returns the round reached"""
+    latest = latest_checkpoint()
+    if latest is not None:
+        server_round, state_dict, metadata = latest
+        model.load_state_dict(state_dict)
+        log.info("🔁 Resuming from round %s checkpoint (%s clients)", server_round, metadata.get('num_clients', '?'))
+        return server_round
+    model.load_state_dict(torch.load(LATEST_PATH))
+    return 0
+
+# Local training settings pushed to every client each round (see training.py)
+TRAINING_CONFIG = {
+    'epochs': 3,
+    'batch_size': 32,
+    'learning_rate': 0.01,
+    'max_steps': 200,       # time budget per round on slow laptops
+    'val_fraction': 0.2,
+    'codec': 'int8',        # client update encoding: none / fp16 / int8 / topk (see codec.py)
+    'topk_fraction': 0.05,  # share of each tensor sent when codec == 'topk'
+}
+
+# How client updates are combined (see aggregation.py)
+AGGREGATION_CONFIG = {
+    'mode': 'fedavg',       # fedavg / median / trimmed_mean (robust modes for noisy classrooms)
+    'trim_fraction': 0.1,   # share dropped at each end for trimmed_mean
+}
+
+# Asynchronous buffered rounds (FedBuff, see buffered.py); FL_MODE=async in server.py
+ASYNC_CONFIG = {
+    'buffer_size': 4,        # client updates per global step (K)
+    'max_staleness': 4,      # reject updates that started more than this many versions ago
+    'staleness_alpha': 0.5,  # an update's weight is (1 + staleness) ** -alpha
+    'server_lr': 1.0,
+    'concurrency': 6,        # laptops training at the same time
+    'client_timeout': 600,   # seconds before a silent laptop counts as failed
+    'failure_cooldown': 30,  # seconds before a laptop that failed is asked again
+}
+
+def fit_config(server_round):
+    return dict(TRAINING_CONFIG, server_round=server_round)
 
-def set_parameters(model, parameters):
-    params_dict = zip(model.state_dict().keys(), parameters)
-    state_dict = {k: torch.tensor(v) for k,v in params_dict}
-    model.load_state_dict(state_dict, strict=True)
+def evaluate_config(server_round):
+    return {'batch_size': TRAINING_CONFIG['batch_size'], 'val_fraction': TRAINING_CONFIG['val_fraction']}
+
+def weighted_average(client_metrics):
+    """Average client metrics weighted by their number of examples"""
+    total = sum(num_examples for num_examples, _ in client_metrics)
+    if total == 0:
+        return {}
+    keys = set().union(*(m.keys() for _, m in client_metrics))
+    return {k: sum(n * m.get(k, 0.0) for n, m in client_metrics) / total for k in keys}
 
 class ActivityServer(fl.server.strategy.FedAvg):
-    def __init__(self):
+    def __init__(self, aggregation=AGGREGATION_CONFIG, min_clients=2,
+                 initial_parameters=None, checkpoints=None, round_offset=0):
+        self.aggregation = dict(aggregation)
+        self.checkpoints = checkpoints    # CheckpointWriter, or None to skip saving
+        self.round_offset = round_offset  # rounds completed before a restart
         super().__init__(
             fraction_fit=1.0,  # Sample 100% clients
-            min_fit_clients=2,
-            min_available_clients=2,
+            min_fit_clients=min_clients,
+            min_evaluate_clients=min_clients,
+            min_available_clients=min_clients,
+            on_fit_config_fn=fit_config,
+            on_evaluate_config_fn=evaluate_config,
+            fit_metrics_aggregation_fn=weighted_average,
+            evaluate_metrics_aggregation_fn=weighted_average,
+            initial_parameters=initial_parameters,
         )
     
+    def configure_fit(self, server_round, parameters, client_manager):
+        # Client updates arrive as deltas against exactly these weights
+        self.round_weights = parameters_to_ndarrays(parameters)
+        self.round_bytes = sum(len(t) for t in parameters.tensors)
+        self.round_started = time.perf_counter()
+        return super().configure_fit(server_round, parameters, client_manager)
+
     def aggregate_fit(
         self, server_round, results, failures
     ):
-        """Aggregate client updates with FedAvg"""
-        weights_results = [
-            (fl.common.weights_to_parameters(w.parameters()), w.num_examples)
-            for w in results
-        ]
-        aggregate_weights = fl.server.strategy.fedavg_weighted_aggregate(weights_results)
-        return fl.server.strategy.FedAvg.aggregate_fit(self, server_round, results, failures)
-
-strategy = ActivityServer()
-print("🚀 Flower FL Server starting... (Uses your global_model.pth)")
-fl.server.start_server(
-    server_address="0.0.0.0:8080",
-    config=fl.server.ServerConfig(num_rounds=10),
-    strategy=strategy,
-)
+        """Decode each client update and fold it straight into the aggregate"""
+        ROUND_CLIENTS.inc(len(results), result='ok')
+        ROUND_CLIENTS.inc(len(failures), result='failed')
+        if not results:
+            return None, {}
+        if failures and not self.accept_failures:
+            return None, {}
+
+        started = time.perf_counter()
+        aggregator = make_aggregator(self.aggregation['mode'], len(results),
+                                     self.aggregation.get('trim_fraction', 0.1))
+        wire_bytes = 0
+        fit_metrics = []
+        for _, fit_res in results:
+            update_bytes = sum(len(t) for t in fit_res.parameters.tensors)
+            UPDATE_BYTES.observe(update_bytes)
+            wire_bytes += update_bytes
+            aggregator.add(decode_update(parameters_to_ndarrays(fit_res.parameters), self.round_weights),
+                           fit_res.num_examples)
+            fit_metrics.append((fit_res.num_examples, fit_res.metrics))
+            fit_res.parameters.tensors = []  # the serialized update is no longer needed
+        weights = aggregator.result()
+        if weights is None:
+            return None, {}
+        aggregation_time = time.perf_counter() - started
+        AGGREGATION_SECONDS.observe(aggregation_time, mode=self.aggregation['mode'])
+        if getattr(self, 'round_started', None) is not None:
+            ROUND_SECONDS.observe(time.perf_counter() - self.round_started)
+        LAST_ROUND.set(self.round_offset + server_round)
+
+        round_metrics = self.fit_metrics_aggregation_fn(fit_metrics) if self.fit_metrics_aggregation_fn else {}
+        round_metrics['aggregation_time'] = aggregation_time
+        log.info("📦 Round %s: %d bytes on the wire from %d clients (full weights: %d)",
+                 server_round, wire_bytes, len(results), self.round_bytes * len(results))
+        log.info("🧮 Round %s: %s aggregation took %.1f ms", server_round, self.aggregation['mode'],
+                 aggregation_time * 1000)
+        if self.checkpoints is not None:
+            self.checkpoints.submit(self.round_offset + server_round, weights, {
+                'server_round': server_round,
+                'num_clients': len(results),
+                'num_failures': len(failures),
+                'num_examples': sum(n for n, _ in fit_metrics),
+                'metrics': round_metrics,
+            })
+        return ndarrays_to_parameters(weights), round_metrics
+
+class BufferedActivityServer(ActivityServer):
+    """Asynchronous mode: no client waits for another.
+
+    Clients are picked by recent response time (ClientAvailability), train on
+    whatever global version is current and report when they are done. Their
+    updates go through a BufferedAggregator; a "round" is one buffer flush,
+    i.e. one new global version, which is also what gets checkpointed. Driven
+    by AsyncServer in server.py and by run_async_simulation() in simulate.py.
+    """
+    def __init__(self, async_config=ASYNC_CONFIG, min_clients=1, initial_parameters=None, checkpoints=None,
+                 round_offset=0, seed=None):
+        super().__init__(min_clients=min_clients, initial_parameters=initial_parameters,
+                         checkpoints=checkpoints, round_offset=round_offset)
+        self.async_config = dict(ASYNC_CONFIG, **async_config)
+        self.availability = ClientAvailability(penalty=self.async_config['client_timeout'], seed=seed)
+        self.buffer = None
+        self.pending_metrics = []  # (num_examples, metrics) of the updates in the buffer
+        self.last_metrics = {}
+
+    def start(self, parameters):
+        c = self.async_config
+        self.buffer = BufferedAggregator(parameters_to_ndarrays(parameters), c['buffer_size'], c['max_staleness'],
+                                         c['staleness_alpha'], c['server_lr'])
+
+    def select_clients(self, client_manager, busy, count):
+        """Up to `count` idle clients, favouring those that answered quickly lately"""
+        clients = {cid: proxy for cid, proxy in client_manager.all().items() if cid not in busy}
+        return [clients[cid] for cid in self.availability.sample(sorted(clients), count)]
+
+    def configure_client(self):
+        """(version, FitIns) for a client starting now"""
+        version, weights = self.buffer.checkout()
+        config = dict(self.on_fit_config_fn(self.round_offset + version + 1), model_version=version)
+        return version, FitIns(ndarrays_to_parameters(weights), config)
+
+    def report_failure(self, cid):
+        self.availability.failed(cid)
+        ASYNC_UPDATES.inc(result='failed')
+
+    def report(self, cid, version, fit_res, elapsed):
+        """Fold one finished client in; returns the new global parameters when the buffer flushed"""
+        self.availability.record(cid, elapsed)
+        base = self.buffer.weights_at(version)
+        if base is None:
+            status, staleness = 'stale', self.buffer.version - version
+        else:
+            update_bytes = sum(len(t) for t in fit_res.parameters.tensors)
+            UPDATE_BYTES.observe(update_bytes)
+            started = time.perf_counter()
+            weights = decode_update(parameters_to_ndarrays(fit_res.parameters), base)
+            status, staleness = self.buffer.submit(weights, version, fit_res.num_examples)
+            AGGREGATION_SECONDS.observe(time.perf_counter() - started, mode='buffered')
+        ASYNC_UPDATES.inc(result=status)
+        STALENESS.observe(staleness)
+        if status == 'stale':
+            log.info("🕰️  Dropped update from client %s: %d versions stale", cid, staleness)
+            return None
+        client_metrics = {k: v for k, v in fit_res.metrics.items() if k != 'model_version'}
+        self.pending_metrics.append((fit_res.num_examples, dict(client_metrics, staleness=staleness)))
+        if status != 'applied':
+            return None
+
+        server_round = self.round_offset + self.buffer.version
+        self.last_metrics = self.fit_metrics_aggregation_fn(self.pending_metrics)
+        LAST_ROUND.set(server_round)
+        log.info("🧮 Version %d from %d buffered updates (mean staleness %.1f)", server_round,
+                 len(self.pending_metrics), self.last_metrics.get('staleness', 0.0))
+        if self.checkpoints is not None:
+            self.checkpoints.submit(server_round, self.buffer.weights, {
+                'server_round': server_round,
+                'num_clients': len(self.pending_metrics),
+                'num_examples': sum(n for n, _ in self.pending_metrics),
+                'metrics': self.last_metrics,
+            })
+        self.pending_metrics = []
+        return ndarrays_to_parameters(self.buffer.weights)
+
+class AsyncServer(fl.server.Server):
+    """Flower server loop for BufferedActivityServer.
+
+    Keeps `concurrency` clients training and folds each result in as it
+    arrives instead of waiting for a round to complete. num_rounds counts
+    new global versions.
+    """
+    def fit(self, num_rounds, timeout):
+        strategy = self.strategy
+        timeout = timeout or strategy.async_config['client_timeout']
+        concurrency = strategy.async_config['concurrency']
+        history = History()
+        self.parameters = self._get_initial_parameters(server_round=0, timeout=timeout)
+        strategy.start(self.parameters)
+        started = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        in_flight = {}  # future -> (proxy, version, started)
+        cooldown = {}   # cid -> when a failed client may be asked again
+        try:
+            while strategy.buffer.version < num_rounds:
+                now = time.perf_counter()
+                busy = {proxy.cid for proxy, _, _ in in_flight.values()}
+                busy.update(cid for cid, until in cooldown.items() if until > now)
+                for proxy in strategy.select_clients(self._client_manager, busy, concurrency - len(in_flight)):
+                    version, ins = strategy.configure_client()
+                    # group_id is Flower's round routing; the model version travels in ins.config
+                    future = executor.submit(proxy.fit, ins, timeout, ins.config.get('server_round'))
+                    in_flight[future] = (proxy, version, time.perf_counter())
+                if not in_flight:
+                    if self._client_manager.num_available() == 0:
+                        self._client_manager.wait_for(1, timeout=int(timeout))
+                    else:
+                        time.sleep(1)  # everyone connected has just failed
+                    continue
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    proxy, version, sent = in_flight.pop(future)
+                    try:
+                        fit_res = future.result()
+                        if fit_res.status.code != Code.OK:
+                            raise RuntimeError(fit_res.status.message)
+                    except Exception as e:
+                        log.warning("❌ Client %s failed: %s", proxy.cid, e)
+                        strategy.report_failure(proxy.cid)
+                        cooldown[proxy.cid] = time.perf_counter() + strategy.async_config['failure_cooldown']
+                        continue
+                    parameters = strategy.report(proxy.cid, version, fit_res, time.perf_counter() - sent)
+                    if parameters is not None:
+                        self.parameters = parameters
+                        history.add_metrics_distributed_fit(server_round=strategy.buffer.version,
+                                                            metrics=strategy.last_metrics)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)  # don't wait on laptops that went to sleep
+        return history, time.perf_counter() - started
+
+if __name__ == '__main__':
+    metrics.configure_logging()
+    metrics.start_dump_from_env()
+    round_offset = resume_global_model(global_model)
+    checkpoints = CheckpointWriter(state_keys(global_model))
+    initial_parameters = ndarrays_to_parameters(get_parameters(global_model))
+    server = None
+    if os.environ.get('FL_MODE') == 'async':
+        strategy = BufferedActivityServer(initial_parameters=initial_parameters, checkpoints=checkpoints,
+                                          round_offset=round_offset)
+        server = AsyncServer(client_manager=fl.server.SimpleClientManager(), strategy=strategy)
+    else:
+        strategy = ActivityServer(
+            initial_parameters=initial_parameters,
+            checkpoints=checkpoints,
+            round_offset=round_offset,
+        )
+    log.info("🚀 Flower FL Server starting... (Uses your global_model.pth)")
+    try:
+        fl.server.start_server(
+            server_address="0.0.0.0:8080",
+            server=server,
+            config=fl.server.ServerConfig(num_rounds=10),
+            strategy=None if server else strategy,
+        )
+    finally:
+        checkpoints.close()  # don't lose the last round's write
@@ -0,0 +1,320 @@
+# simulate.py - run ActivityServer against N virtual ActivityClients in one process (no network)
+# Usage: python simulate.py --clients 10 --rounds 3 --samples 500 [--workers 4] [--json report.json]
+#        python simulate.py --mode async --clients 20 --rounds 10 [--delays]   # FedBuff on a virtual clock
+import argparse
+import heapq
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from flwr.common import (Code, EvaluateRes, FitRes, GetParametersRes, GetPropertiesRes, Status,
+                         ndarrays_to_parameters, parameters_to_ndarrays)
+from flwr.server.client_manager import SimpleClientManager
+from flwr.server.client_proxy import ClientProxy
+
+import metrics
+from client import ActivityClient
+from codec import get_parameters
+from features import ActivityDataStore, get_activity_features
+from save_model import ProductivityNet
+from server import ActivityServer, AGGREGATION_CONFIG, ASYNC_CONFIG, BufferedActivityServer, fit_config
+
+# (app name, weight among productive students, weight among distracted ones)
+SYNTHETIC_APPS = [
+    ('Code.Exe', 5, 1), ('Visual Studio', 3, 1), ('Notepad', 2, 1), ('Chrome.Exe', 3, 4),
+    ('Youtube', 1, 5), ('Netflix', 1, 3), ('Spotify', 1, 2), ('Discord', 1, 3),
+]
+
+def synthetic_dataset(path, num_samples, seed):
+    """Fill an ActivityDataStore at path with one student's synthetic history"""
+    rng = np.random.default_rng(seed)
+    focus = rng.uniform(0, 1)  # how productive this student is
+    weights = np.array([focus * p + (1 - focus) * d for _, p, d in SYNTHETIC_APPS], dtype=np.float64)
+    names = rng.choice([name for name, _, _ in SYNTHETIC_APPS], size=num_samples, p=weights / weights.sum())
+    durations = rng.lognormal(mean=5, sigma=1, size=num_samples)
+    store = ActivityDataStore(path, capacity=max(num_samples, 1))
+    store.append(*get_activity_features(names, durations))
+    return store
+
+class ClientDelays:
+    """Simulated seconds from sending a fit to its result, per client.
+
+    Laptop speeds are lognormal around `median`; on each call a client is
+    asleep (lid closed, offline) with probability `offline` and takes
+    `offline_seconds` longer.
+    """
+    def __init__(self, num_clients, median=30.0, spread=1.0, offline=0.1, offline_seconds=900.0, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.speeds = median * self.rng.lognormal(0.0, spread, num_clients)
+        self.offline = offline
+        self.offline_seconds = offline_seconds
+
+    def __call__(self, cid):
+        delay = self.speeds[int(cid)] * self.rng.uniform(0.8, 1.2)
+        if self.rng.random() < self.offline:
+            delay += self.offline_seconds * self.rng.uniform(0.5, 1.5)
+        return float(delay)
+
+def _run_client(client, method, ins):
+    """Call a NumPyClient the way Flower would, timing (de)serialization separately"""
+    started = time.perf_counter()
+    arrays = parameters_to_ndarrays(ins.parameters)
+    decoded = time.perf_counter()
+    if method == 'fit':
+        params, num_examples, client_metrics = client.fit(arrays, ins.config)
+        trained = time.perf_counter()
+        res = FitRes(Status(Code.OK, 'ok'), ndarrays_to_parameters(params), num_examples, client_metrics)
+    else:
+        loss, num_examples, client_metrics = client.evaluate(arrays, ins.config)
+        trained = time.perf_counter()
+        res = EvaluateRes(Status(Code.OK, 'ok'), loss, num_examples, client_metrics)
+    finished = time.perf_counter()
+    return res, {'serialize': (decoded - started) + (finished - trained), 'compute': trained - decoded}
+
+# Process-pool workers keep their virtual clients between rounds. A client
+# served by a different worker next round is rebuilt from its seed, so its
+# error-feedback residuals start over.
+_worker_clients = {}
+
+def _make_client(spec):
+    store = synthetic_dataset(spec['path'], spec['samples'], spec['seed'])
+    return ActivityClient(data=store, net=ProductivityNet(*spec['hidden']))
+
+def _pool_call(spec, method, ins):
+    client = _worker_clients.get(spec['cid'])
+    if client is None:
+        client = _worker_clients[spec['cid']] = _make_client(spec)
+    return _run_client(client, method, ins)
+
+class SimClientProxy(ClientProxy):
+    """In-memory stand-in for a connected device"""
+    def __init__(self, spec, pool=None):
+        super().__init__(spec['cid'])
+        self.spec = spec
+        self.pool = pool
+        self.client = None if pool else _make_client(spec)
+
+    def call(self, method, ins):
+        """Start a fit/evaluate call; returns a zero-arg function producing (res, timings)"""
+        if self.pool:
+            future = self.pool.submit(_pool_call, self.spec, method, ins)
+            return future.result
+        return lambda: _run_client(self.client, method, ins)
+
+    def fit(self, ins, timeout, group_id):
+        return self.call('fit', ins)()[0]
+
+    def evaluate(self, ins, timeout, group_id):
+        return self.call('evaluate', ins)()[0]
+
+    def get_properties(self, ins, timeout, group_id):
+        return GetPropertiesRes(Status(Code.OK, 'ok'), {})
+
+    def get_parameters(self, ins, timeout, group_id):
+        return GetParametersRes(Status(Code.OK, 'ok'), ndarrays_to_parameters([]))
+
+    def reconnect(self, ins, timeout, group_id):
+        return None
+
+def _dispatch(instructions, method):
+    """Run one round of calls; in pool mode all clients run concurrently"""
+    pending = [(proxy, proxy.call(method, ins)) for proxy, ins in instructions]
+    results, failures = [], []
+    timings = {'serialize': 0.0, 'compute': 0.0}
+    for proxy, wait in pending:
+        try:
+            res, timing = wait()
+        except Exception as e:
+            failures.append(e)
+            continue
+        results.append((proxy, res))
+        for key in timings:
+            timings[key] += timing[key]
+    return results, failures, timings
+
+def _register_clients(manager, num_clients, samples, hidden, seed, data_dir, pool=None):
+    for i in range(num_clients):
+        spec = {'cid': str(i), 'seed': seed * 100_003 + i, 'samples': samples, 'hidden': tuple(hidden),
+                'path': os.path.join(data_dir, str(i))}
+        manager.register(SimClientProxy(spec, pool))
+
+def run_simulation(num_clients=10, num_rounds=3, samples=500, hidden=(32, 16), workers=0,
+                   aggregation=AGGREGATION_CONFIG, training=None, seed=0, strategy=None, delays=None):
+    """Run num_rounds of fit + evaluate and return a report dict with per-round timings.
+
+    With `delays` (ClientDelays) each round also gets a virtual_time: a
+    synchronous round lasts as long as its slowest client.
+    """
+    data_dir = tempfile.mkdtemp(prefix='fl_sim_')
+    pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+    try:
+        strategy = strategy or ActivityServer(aggregation, min_clients=num_clients)
+        overrides = dict(training or {})
+        strategy.on_fit_config_fn = lambda rnd: dict(fit_config(rnd), **overrides)
+
+        manager = SimpleClientManager()
+        _register_clients(manager, num_clients, samples, hidden, seed, data_dir, pool)
+
+        parameters = ndarrays_to_parameters(get_parameters(ProductivityNet(*hidden)))
+        rounds = []
+        virtual_time = 0.0
+        for rnd in range(1, num_rounds + 1):
+            started = time.perf_counter()
+            instructions = strategy.configure_fit(rnd, parameters, manager)
+            if delays is not None:
+                virtual_time += max(delays(proxy.cid) for proxy, _ in instructions)
+            fit_results, fit_failures, fit_timings = _dispatch(instructions, 'fit')
+            new_parameters, fit_metrics = strategy.aggregate_fit(rnd, fit_results, fit_failures)
+            if new_parameters is not None:
+                parameters = new_parameters
+            eval_results, eval_failures, eval_timings = _dispatch(
+                strategy.configure_evaluate(rnd, parameters, manager), 'evaluate')
+            loss, eval_metrics = strategy.aggregate_evaluate(rnd, eval_results, eval_failures)
+            rounds.append({
+                'round': rnd,
+                'wall_time': time.perf_counter() - started,
+                'aggregation_time': fit_metrics.get('aggregation_time', 0.0),
+                'serialization_time': fit_timings['serialize'] + eval_timings['serialize'],
+                'client_compute_time': fit_timings['compute'] + eval_timings['compute'],
+                'fit_clients': len(fit_results),
+                'failures': len(fit_failures) + len(eval_failures),
+                'train_loss': fit_metrics.get('train_loss'),
+                'eval_loss': loss,
+                'eval_accuracy': eval_metrics.get('accuracy'),
+            })
+            if delays is not None:
+                rounds[-1]['virtual_time'] = virtual_time
+        return {
+            'config': {'clients': num_clients, 'rounds': num_rounds, 'samples': samples,
+                       'hidden': list(hidden), 'workers': workers, 'aggregation': dict(aggregation)},
+            'rounds': rounds,
+            'peak_rss_mb': metrics.peak_rss_mb(),
+        }
+    finally:
+        if pool:
+            pool.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def run_async_simulation(num_clients=10, num_versions=10, samples=500, hidden=(32, 16), delays=None,
+                         async_config=None, training=None, seed=0):
+    """BufferedActivityServer on a virtual clock.
+
+    Every fit really runs (on the version current when it was sent), but its
+    result is only reported delays(cid) simulated seconds later; clients slower
+    than client_timeout count as failed. Each new global version is evaluated
+    on all clients. Returns a report like run_simulation(), one entry per version.
+    """
+    data_dir = tempfile.mkdtemp(prefix='fl_sim_')
+    delays = delays or ClientDelays(num_clients, seed=seed)
+    try:
+        strategy = BufferedActivityServer(dict(async_config or {}), min_clients=num_clients, seed=seed)
+        overrides = dict(training or {})
+        strategy.on_fit_config_fn = lambda rnd: dict(fit_config(rnd), **overrides)
+        manager = SimpleClientManager()
+        _register_clients(manager, num_clients, samples, hidden, seed, data_dir)
+        strategy.start(ndarrays_to_parameters(get_parameters(ProductivityNet(*hidden))))
+        timeout = strategy.async_config['client_timeout']
+        concurrency = strategy.async_config['concurrency']
+
+        clock, sent, failures = 0.0, 0, 0
+        events = []  # heap of (report time, send order, proxy, version, FitRes or None on timeout, elapsed)
+        versions = []
+        started = time.perf_counter()
+        while strategy.buffer.version < num_versions:
+            busy = {event[2].cid for event in events}
+            for proxy in strategy.select_clients(manager, busy, concurrency - len(events)):
+                version, ins = strategy.configure_client()
+                delay = delays(proxy.cid)
+                fit_res = proxy.fit(ins, None, ins.config.get('server_round')) if delay <= timeout else None
+                heapq.heappush(events, (clock + min(delay, timeout), sent, proxy, version, fit_res, delay))
+                sent += 1
+            clock, _, proxy, version, fit_res, elapsed = heapq.heappop(events)
+            if fit_res is None:
+                strategy.report_failure(proxy.cid)
+                failures += 1
+                continue
+            parameters = strategy.report(proxy.cid, version, fit_res, elapsed)
+            if parameters is None:
+                continue
+            eval_results, eval_failures, _ = _dispatch(
+                strategy.configure_evaluate(strategy.buffer.version, parameters, manager), 'evaluate')
+            loss, eval_metrics = strategy.aggregate_evaluate(strategy.buffer.version, eval_results, eval_failures)
+            versions.append({
+                'round': strategy.buffer.version,
+                'virtual_time': clock,
+                'wall_time': time.perf_counter() - started,
+                'updates_sent': sent,
+                'stale_dropped': strategy.buffer.counters['stale'],
+                'timeouts': failures,
+                'mean_staleness': strategy.last_metrics.get('staleness', 0.0),
+                'train_loss': strategy.last_metrics.get('train_loss'),
+                'eval_loss': loss,
+                'eval_accuracy': eval_metrics.get('accuracy'),
+            })
+            started = time.perf_counter()
+        return {
+            'config': {'clients': num_clients, 'rounds': num_versions, 'samples': samples, 'hidden': list(hidden),
+                       'mode': 'async', 'async': strategy.async_config},
+            'rounds': versions,
+            'peak_rss_mb': metrics.peak_rss_mb(),
+        }
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="In-process federated simulation")
+    parser.add_argument('--clients', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--samples', type=int, default=500, help="synthetic samples per client")
+    parser.add_argument('--hidden', type=int, nargs=2, default=[32, 16], help="hidden layer widths")
+    parser.add_argument('--workers', type=int, default=0, help="process pool size, 0 = run clients in-process")
+    parser.add_argument('--aggregation', default=AGGREGATION_CONFIG['mode'])
+    parser.add_argument('--codec', default=None, help="override the update codec pushed to clients")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write the report to this file")
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync',
+                        help="sync FedAvg rounds, or FedBuff-style buffered asynchronous updates")
+    parser.add_argument('--delays', action='store_true',
+                        help="simulate heterogeneous client response times (always on in async mode)")
+    parser.add_argument('--delay-median', type=float, default=30.0, help="median client fit time, seconds")
+    parser.add_argument('--delay-spread', type=float, default=1.0, help="lognormal sigma of client speeds")
+    parser.add_argument('--offline', type=float, default=0.1, help="chance a client is asleep on a given call")
+    parser.add_argument('--buffer-size', type=int, default=ASYNC_CONFIG['buffer_size'])
+    parser.add_argument('--max-staleness', type=int, default=ASYNC_CONFIG['max_staleness'])
+    parser.add_argument('--concurrency', type=int, default=ASYNC_CONFIG['concurrency'])
+    args = parser.parse_args(argv)
+    metrics.configure_logging()
+
+    training = {'codec': args.codec} if args.codec else None
+    delays = None
+    if args.delays or args.mode == 'async':
+        delays = ClientDelays(args.clients, args.delay_median, args.delay_spread, args.offline, seed=args.seed)
+    if args.mode == 'async':
+        async_config = {'buffer_size': args.buffer_size, 'max_staleness': args.max_staleness,
+                        'concurrency': args.concurrency}
+        report = run_async_simulation(args.clients, args.rounds, args.samples, args.hidden, delays,
+                                      async_config, training, args.seed)
+        for r in report['rounds']:
+            print(f"⏱️  Version {r['round']}: t={r['virtual_time']:.0f}s simulated, {r['updates_sent']} fits sent, "
+                  f"{r['stale_dropped']} stale, {r['timeouts']} timed out, mean staleness {r['mean_staleness']:.1f} "
+                  f"accuracy {r['eval_accuracy']}")
+    else:
+        report = run_simulation(args.clients, args.rounds, args.samples, args.hidden, args.workers,
+                                dict(AGGREGATION_CONFIG, mode=args.aggregation), training, args.seed, delays=delays)
+        for r in report['rounds']:
+            simulated = f"t={r['virtual_time']:.0f}s simulated, " if 'virtual_time' in r else ""
+            print(f"⏱️  Round {r['round']}: {simulated}{r['wall_time'] * 1000:.0f} ms "
+                  f"(aggregation {r['aggregation_time'] * 1000:.1f} ms, serialization {r['serialization_time'] * 1000:.1f} ms) "
+                  f"accuracy {r['eval_accuracy']}")
+    print(f"📈 Peak RSS: {report['peak_rss_mb']:.1f} MB")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# conftest.py - the modules live at the repository root; keep test runs away from real data
+import os
+import random
+import sys
+import tempfile
+from datetime import timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_scratch = tempfile.mkdtemp(prefix='activity_tests_')
+os.environ.setdefault('FL_DATA_DIR', os.path.join(_scratch, 'fl_data'))
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(_scratch, 'users.db'))
+
+@pytest.fixture
+def flask_app():
+    """app.py against the scratch database, emptied before each test"""
+    from app import app, db
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+    app.config['TESTING'] = True
+    return app
+
+@pytest.fixture
+def student(flask_app):
+    from app import db, User
+    with flask_app.app_context():
+        user = User(username='student', email='student@test.local', password_hash='-', role='student')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+@pytest.fixture
+def admin(flask_app):
+    from app import db, User
+    with flask_app.app_context():
+        user = User(username='teacher', email='teacher@test.local', password_hash='-', role='admin')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+def logged_in(app, user_id):
+    """A test client whose session is already logged in as user_id"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    return client
+
+@pytest.fixture
+def add_activities(flask_app):
+    """add_activities(user_id, [(app_name, window_title, start, seconds), ...]) through the ingest path"""
+    from app import build_activity_row, insert_activities
+
+    def add(user_id, specs):
+        items = [{'user_id': user_id, 'app_name': app_name, 'window_title': title, 'duration_seconds': seconds,
+                  'timestamp_start': start.isoformat(),
+                  'timestamp_end': (start + timedelta(seconds=seconds)).isoformat()}
+                 for app_name, title, start, seconds in specs]
+        with flask_app.app_context():
+            rows = [build_activity_row(item, {user_id}) for item in items]
+            insert_activities(rows, [item['app_name'] for item in items])
+        return rows
+    return add
+
+def random_specs(seed, count, end, span_hours=30):
+    """Activities scattered over the `span_hours` before `end` (naive local time)"""
+    rng = random.Random(seed)
+    apps = [('Code.Exe', 'app.py - Visual Studio Code'), ('Chrome.Exe', 'YouTube - Google Chrome'),
+            ('Chrome.Exe', 'Stack Overflow - Google Chrome'), ('notepad.exe', 'notes.txt - Notepad'),
+            ('Discord.Exe', '#general - Discord')]
+    return [apps[rng.randrange(len(apps))] + (end - timedelta(seconds=rng.uniform(600, span_hours * 3600)),
+                                              rng.randint(1, 900))
+            for _ in range(count)]
@@ -0,0 +1,41 @@
+# test_aggregation.py - streaming FedAvg and the robust aggregation modes
+import numpy as np
+import pytest
+
+from aggregation import CoordinateMedian, StreamingFedAvg, TrimmedMean, _StackedAggregator, make_aggregator
+
+def client_updates():
+    return [([np.full((2, 3), v, dtype=np.float32), np.array([v], dtype=np.float32)], n)
+            for v, n in [(1.0, 10), (2.0, 30), (3.0, 20), (100.0, 40)]]
+
+def aggregate(aggregator):
+    for weights, num_examples in client_updates():
+        aggregator.add(weights, num_examples)
+    return aggregator.result()
+
+def test_fedavg_is_the_example_weighted_mean():
+    result = aggregate(StreamingFedAvg())
+    expected = (1 * 10 + 2 * 30 + 3 * 20 + 100 * 40) / 100
+    np.testing.assert_allclose(result[0], np.full((2, 3), expected))
+    assert result[0].dtype == np.float32
+
+def test_median_ignores_one_outlier():
+    result = aggregate(CoordinateMedian(num_clients=4))
+    np.testing.assert_allclose(result[1], [2.5])
+
+def test_trimmed_mean_drops_the_extremes():
+    result = aggregate(TrimmedMean(num_clients=4, trim_fraction=0.25))
+    np.testing.assert_allclose(result[1], [2.5])
+
+def test_empty_rounds_and_zero_example_clients():
+    aggregator = make_aggregator('median', 2)
+    aggregator.add([np.ones(3)], 0)
+    assert aggregator.result() is None
+    assert StreamingFedAvg().result() is None
+
+def test_modes():
+    assert isinstance(make_aggregator('trimmed_mean', 3), TrimmedMean)
+    with pytest.raises(ValueError):
+        make_aggregator('mean', 3)
+    with pytest.raises(TypeError):
+        _StackedAggregator(3)  # needs a _reduce
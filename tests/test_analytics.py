@@ -0,0 +1,73 @@
+# test_analytics.py - bucketed_usage agrees with bucketing the raw rows in Python
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import random_specs
+from app import Activity, ANALYTICS_BUCKETS, bucketed_usage, db
+from classifier import PRODUCTIVE
+
+NOW = datetime(2026, 3, 4, 15, 37, 12)  # a Wednesday, so week buckets straddle a Monday
+
+def bucket_of(ts, bucket):
+    if bucket == 'hour':
+        return ts.strftime('%Y-%m-%dT%H:00:00')
+    if bucket == 'day':
+        return ts.strftime('%Y-%m-%dT00:00:00')
+    return (ts - timedelta(days=ts.weekday())).strftime('%Y-%m-%dT00:00:00')
+
+def python_buckets(start, end, bucket, user_id, top):
+    apps = defaultdict(Counter)
+    for a in db.session.query(Activity).filter(Activity.user_id == user_id):
+        if start <= a.timestamp_start < end:
+            apps[bucket_of(a.timestamp_start, bucket)][(a.display_name, a.category)] += a.duration_seconds
+    result = []
+    for key in sorted(apps):
+        ranked = sorted(apps[key].items(), key=lambda kv: (-kv[1], kv[0][0]))[:top]
+        result.append({
+            'start': key,
+            'total_seconds': sum(apps[key].values()),
+            'productive_seconds': sum(s for (_, category), s in apps[key].items() if category == PRODUCTIVE),
+            'apps': [{'app_name': name, 'category': category, 'seconds': s} for (name, category), s in ranked],
+        })
+    return result
+
+@pytest.mark.parametrize('bucket', sorted(ANALYTICS_BUCKETS))
+def test_buckets_match_raw_rows(flask_app, student, add_activities, bucket):
+    add_activities(student, random_specs(1, 500, NOW, span_hours=24 * 10))
+    # unaligned ends: the partial hours come from raw rows, the rest from the rollup
+    start, end = NOW - timedelta(days=8, minutes=23), NOW - timedelta(hours=3, minutes=41)
+    with flask_app.app_context():
+        got, more = bucketed_usage(start, end, bucket, student, top=3, limit=1000)
+        assert not more
+        assert got == python_buckets(start, end, bucket, student, top=3)
+
+def test_limit_pages_through_every_bucket(flask_app, student, add_activities):
+    add_activities(student, random_specs(2, 300, NOW, span_hours=24 * 5))
+    start, end = NOW - timedelta(days=6), NOW
+    with flask_app.app_context():
+        expected = python_buckets(start, end, 'hour', student, top=5)
+        pages, page_start = [], start
+        while True:
+            page, more = bucketed_usage(page_start, end, 'hour', student, top=5, limit=7)
+            pages += page
+            if not more:
+                break
+            page_start = datetime.fromisoformat(page[-1]['start']) + timedelta(hours=1)
+    assert pages == expected
+
+def test_route_scopes_students_to_themselves(flask_app, student, add_activities):
+    add_activities(student, [('Code.Exe', 'app.py - Visual Studio Code', NOW - timedelta(hours=2), 600)])
+    client = flask_app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(student)
+    query = {'from': (NOW - timedelta(days=1)).isoformat(), 'to': NOW.isoformat(), 'bucket': 'day'}
+
+    body = client.get('/api/analytics', query_string=query).get_json()
+    assert body['user_id'] == student
+    assert [b['total_seconds'] for b in body['buckets']] == [600] and body['next_after'] is None
+
+    assert client.get('/api/analytics', query_string={**query, 'user_id': student + 1}).status_code == 403
+    assert client.get('/api/analytics', query_string={**query, 'bucket': 'month'}).status_code == 400
+    assert client.get('/api/analytics', query_string={**query, 'to': 'yesterday'}).status_code == 400
@@ -0,0 +1,44 @@
+# test_bench_app.py - the classroom benchmark runs end to end and flags regressions
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+from bench_app import compare
+
+def result(scenario, p95, rps, workers=1, cache=True):
+    return {'scenario': scenario, 'workers': workers, 'cache': cache, 'latency_p95_ms': p95, 'throughput_rps': rps}
+
+def test_compare_flags_only_changes_past_the_tolerance():
+    baseline = {'results': [result('dashboard', 10.0, 100.0), result('admin_users', 10.0, 100.0),
+                            result('mixed', 10.0, 100.0), result('dashboard', 10.0, 100.0, cache=False)]}
+    current = [result('dashboard', 12.0, 85.0),             # within 25% both ways
+               result('admin_users', 13.0, 100.0),          # slower p95
+               result('mixed', 10.0, 70.0),                 # lower throughput
+               result('dashboard', 50.0, 10.0, workers=4)]  # no baseline for this config
+    assert [r['config'] for r in compare(current, baseline)] == [['admin_users', 1, True], ['mixed', 1, True]]
+
+def test_tiny_run_reports_every_scenario(tmp_path):
+    output = tmp_path / 'bench.json'
+    env = dict(os.environ)
+    env.pop('DATABASE_URL', None)  # the benchmark makes its own database
+    run = subprocess.run([sys.executable, os.path.join(ROOT, 'bench_app.py'), '--students', '3', '--days', '1',
+                          '--per-day', '5', '--requests', '6', '--workers', '1',
+                          '--scenarios', 'track_activity', 'dashboard', 'admin_users', '--output', str(output)],
+                         cwd=tmp_path, env=env, capture_output=True, text=True, timeout=300)
+    assert run.returncode == 0, run.stderr
+    report = json.loads(output.read_text())
+    assert report['activities'] == 15
+    assert [r['scenario'] for r in report['results']] == ['track_activity', 'dashboard', 'admin_users']
+    assert all(r['errors'] == 0 and r['requests'] == 6 for r in report['results'])
+    assert sorted(os.listdir(tmp_path)) == ['bench.json']  # nothing left behind next to it
+
+    slower = dict(report, results=[dict(r, latency_p95_ms=r['latency_p95_ms'] / 10) for r in report['results']])
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(slower))
+    rerun = subprocess.run([sys.executable, os.path.join(ROOT, 'bench_app.py'), '--students', '3', '--days', '1',
+                            '--per-day', '5', '--requests', '6', '--workers', '1', '--scenarios', 'dashboard',
+                            '--baseline', str(baseline)],
+                           cwd=tmp_path, env=env, capture_output=True, text=True, timeout=300)
+    assert rerun.returncode == 1 and 'REGRESSION' in rerun.stdout
@@ -0,0 +1,109 @@
+# test_buffered.py - buffered asynchronous aggregation and availability-aware sampling
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from buffered import BufferedAggregator, ClientAvailability, staleness_weight
+from simulate import run_async_simulation
+
+def test_staleness_weight():
+    assert staleness_weight(0) == 1.0
+    assert staleness_weight(3) == pytest.approx(0.5)
+    assert staleness_weight(3, alpha=1.0) == pytest.approx(0.25)
+
+def test_buffer_is_applied_as_one_example_weighted_step():
+    buffer = BufferedAggregator([np.zeros(2, dtype=np.float32)], buffer_size=2, server_lr=0.5)
+    version, base = buffer.checkout()
+    assert buffer.submit([np.array([1.0, 2.0])], version, 10) == ('buffered', 0)
+    assert buffer.version == 0 and buffer.weights[0].tolist() == [0.0, 0.0]
+    assert buffer.submit([np.array([4.0, 8.0])], version, 30) == ('applied', 0)
+    assert buffer.version == 1 and buffer.weights[0].dtype == np.float32
+    # 0.5 * (10 * [1, 2] + 30 * [4, 8]) / 40
+    np.testing.assert_allclose(buffer.weights[0], [1.625, 3.25])
+    assert buffer.counters == {'buffered': 2, 'applied': 1, 'stale': 0}
+
+def test_stale_updates_move_the_model_less():
+    buffer = BufferedAggregator([np.zeros(1)], buffer_size=1, alpha=1.0)
+    old_version, _ = buffer.checkout()
+    buffer.submit([np.ones(1)], old_version, 5)  # version 1, weights 1
+    status, staleness = buffer.submit([np.full(1, 3.0)], old_version, 5)
+    assert (status, staleness) == ('applied', 1)
+    # delta against version 0 is 3, discounted by (1 + 1) ** -1
+    np.testing.assert_allclose(buffer.weights[0], [2.5])
+
+def test_updates_past_max_staleness_are_rejected_and_old_versions_dropped():
+    buffer = BufferedAggregator([np.zeros(1)], buffer_size=1, max_staleness=2)
+    first, _ = buffer.checkout()
+    for _ in range(3):
+        buffer.submit([buffer.weights[0] + 1], buffer.version, 1)
+    assert buffer.version == 3
+    assert buffer.weights_at(first) is None and buffer.weights_at(1) is not None
+    assert buffer.submit([np.zeros(1)], first, 1) == ('stale', 3)
+    assert buffer.counters['stale'] == 1 and buffer.version == 3
+
+def test_empty_updates_do_not_count_toward_the_buffer():
+    buffer = BufferedAggregator([np.zeros(1)], buffer_size=1)
+    assert buffer.submit([np.ones(1)], 0, 0) == ('buffered', 0)
+    assert buffer.version == 0 and buffer.counters['buffered'] == 0
+
+def test_availability_smooths_and_penalizes():
+    availability = ClientAvailability(smoothing=0.5, penalty=100.0)
+    assert availability.expected('new') == 1.0
+    availability.record('a', 10.0)
+    availability.record('a', 20.0)
+    availability.record('b', 40.0)
+    availability.failed('b')
+    assert availability.expected('a') == 15.0 and availability.expected('b') == 70.0
+    assert availability.expected('new') == 42.5  # median of the known clients
+
+def test_sampling_favours_fast_clients():
+    availability = ClientAvailability(seed=0)
+    availability.record('fast', 1.0)
+    availability.record('slow', 9.0)
+    for cid in ('x', 'y'):
+        availability.record(cid, 3.0)
+    picks = Counter(cid for _ in range(2000) for cid in availability.sample(['fast', 'slow', 'x', 'y'], 2))
+    assert sum(picks.values()) == 4000
+    assert picks['fast'] > picks['x'] > picks['slow']
+    assert sorted(availability.sample(['a', 'b'], 5)) == ['a', 'b']
+    assert availability.sample(['a', 'b'], 0) == []
+    assert len(set(availability.sample(['fast', 'slow', 'x', 'y'], 3))) == 3
+
+def test_async_simulation_does_not_wait_for_a_slow_client():
+    delays = lambda cid: 10_000.0 if cid == '0' else 10.0 + int(cid)
+    report = run_async_simulation(num_clients=4, num_versions=2, samples=80, hidden=(8, 4), delays=delays,
+                                  async_config={'buffer_size': 2, 'concurrency': 3})
+    assert [r['round'] for r in report['rounds']] == [1, 2]
+    assert all(r['eval_loss'] is not None for r in report['rounds'])
+    assert report['rounds'][-1]['virtual_time'] < 600  # never waited on client 0, not even for its timeout
+
+@pytest.mark.parametrize('cooldown', (0, 3600))
+def test_async_server_routes_by_round_and_cools_failed_clients_down(tmp_path, cooldown):
+    from flwr.common import ndarrays_to_parameters
+    from flwr.server.client_manager import SimpleClientManager
+
+    from codec import get_parameters
+    from save_model import ProductivityNet
+    from server import AsyncServer, BufferedActivityServer
+    from simulate import _register_clients
+
+    manager = SimpleClientManager()
+    _register_clients(manager, 3, 60, (8, 4), 0, str(tmp_path))
+    calls = []
+    for proxy in manager.all().values():
+        def fit(ins, timeout, group_id, proxy=proxy, real_fit=proxy.fit):
+            calls.append((proxy.cid, group_id, ins.config['server_round'], ins.config['model_version']))
+            if proxy.cid == '0':
+                raise ConnectionError("lid closed")
+            return real_fit(ins, timeout, group_id)
+        proxy.fit = fit
+    strategy = BufferedActivityServer({'buffer_size': 2, 'concurrency': 3, 'failure_cooldown': cooldown},
+                                      min_clients=3, seed=0,
+                                      initial_parameters=ndarrays_to_parameters(get_parameters(ProductivityNet(8, 4))))
+    AsyncServer(client_manager=manager, strategy=strategy).fit(3, None)
+
+    assert strategy.buffer.version == 3
+    asked = [cid for cid, *_ in calls].count('0')
+    assert asked > 1 if cooldown == 0 else asked == 1  # not asked again within the cooldown
+    assert all(group_id == server_round == version + 1 for _, group_id, server_round, version in calls)
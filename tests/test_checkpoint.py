@@ -0,0 +1,48 @@
+# test_checkpoint.py - background checkpoints, retention and resume
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from conftest import ROOT
+from checkpoint import CheckpointWriter, latest_checkpoint, list_checkpoints
+from codec import get_parameters, state_keys
+from save_model import ProductivityNet
+from scoring import load_state_dict
+
+def test_rounds_are_saved_pruned_and_resumable(tmp_path):
+    model = ProductivityNet()
+    weights = get_parameters(model)
+    latest = str(tmp_path / 'global_model.pth')
+    writer = CheckpointWriter(state_keys(model), directory=str(tmp_path / 'ckpt'), keep=2, latest_path=latest)
+    for server_round in range(1, 5):
+        writer.submit(server_round, [w + server_round for w in weights], {'num_clients': 3})
+        writer.flush()
+    writer.close()
+
+    assert [r for r, _ in list_checkpoints(str(tmp_path / 'ckpt'))] == [3, 4]
+    assert len(os.listdir(tmp_path / 'ckpt')) == 4  # .pth + .json sidecar each, no temp files left
+    server_round, state_dict, metadata = latest_checkpoint(str(tmp_path / 'ckpt'))
+    assert server_round == 4 and metadata['num_clients'] == 3 and metadata['round'] == 4
+    for key, w in zip(state_keys(model), weights):
+        np.testing.assert_array_equal(state_dict[key].numpy(), w + 4)
+        np.testing.assert_array_equal(load_state_dict(latest)[key], w + 4)  # what the web app scores with
+
+def test_unreadable_newest_checkpoint_is_skipped(tmp_path):
+    model = ProductivityNet()
+    writer = CheckpointWriter(state_keys(model), directory=str(tmp_path), latest_path=None)
+    writer.submit(1, get_parameters(model))
+    writer.close()
+    (tmp_path / 'global_model_r00002.pth').write_bytes(b'truncated')
+    assert latest_checkpoint(str(tmp_path))[0] == 1
+
+def test_latest_path_is_the_model_the_app_reads(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k not in ('MODEL_PATH', 'FL_CHECKPOINT_DIR')}
+    env['PYTHONPATH'] = ROOT
+    script = "import app, checkpoint; print(app.app.config['MODEL_PATH']); print(checkpoint.LATEST_PATH); " \
+             "print(checkpoint.CHECKPOINT_DIR)"
+    out = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, env=env, check=True,
+                         capture_output=True, text=True).stdout.split()
+    assert out[0] == out[1] == os.path.join(ROOT, 'global_model.pth')
+    assert out[2] == os.path.join(ROOT, 'checkpoints')
@@ -0,0 +1,47 @@
+# test_classifier.py - display names, categories and rule hot-reload
+import json
+import os
+
+import pytest
+
+from classifier import PRODUCTIVE, UNPRODUCTIVE, AppClassifier
+
+RULES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app_rules.json')
+
+@pytest.fixture
+def classifier():
+    return AppClassifier(RULES, reload_interval=None)
+
+@pytest.mark.parametrize('app_name, title, display_name, category', [
+    ('Chrome.Exe', 'YouTube - Google Chrome', 'YouTube', UNPRODUCTIVE),     # title rules win
+    ('Chrome.Exe', '(3) YouTube - Google Chrome', 'YouTube', UNPRODUCTIVE),
+    ('Code.Exe', 'app.py - Visual Studio Code', 'VS Code', PRODUCTIVE),
+    ('notepad.exe', 'notes.txt - Notepad', 'Notepad', PRODUCTIVE),            # .exe stripped, title-cased
+    ('C:\\Tools\\winword.exe', 'Essay.docx - Word', 'Winword', PRODUCTIVE),   # path stripped
+    ('', 'anything', 'Unknown', UNPRODUCTIVE),
+])
+def test_classify(classifier, app_name, title, display_name, category):
+    assert tuple(classifier.classify(app_name, title)) == (display_name, category)
+
+def test_results_are_cached(classifier):
+    for _ in range(3):
+        classifier.classify('Code.Exe', 'app.py - Visual Studio Code')
+    info = classifier.cache_info()
+    assert info.misses == 1 and info.hits == 2
+
+def test_edited_rules_are_reloaded_and_bad_edits_ignored(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'app_rules': [{'keywords': ['slack'], 'display_name': 'Slack'}],
+                                'productive_keywords': ['slack']}))
+    classifier = AppClassifier(str(path), reload_interval=None)
+    assert tuple(classifier.classify('slack.exe')) == ('Slack', PRODUCTIVE)
+
+    path.write_text(json.dumps({'app_rules': [{'keywords': ['slack'], 'display_name': 'Chat'}]}))
+    os.utime(path, (1, 1))
+    assert classifier.reload()
+    assert tuple(classifier.classify('slack.exe')) == ('Chat', UNPRODUCTIVE)
+
+    path.write_text('{"app_rules": [')  # half-written
+    os.utime(path, (2, 2))
+    assert not classifier.reload()
+    assert classifier.display_name('slack.exe') == 'Chat'
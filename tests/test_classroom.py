@@ -0,0 +1,86 @@
+# test_classroom.py - the admin overview sorts and pages in SQL, in a constant number of queries
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+import app as app_module
+from conftest import logged_in
+from app import CLASSROOM_SORTS, User, classroom_summary, db
+
+NOW = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+@pytest.fixture
+def classroom(flask_app, add_activities, monkeypatch):
+    """Seven students, two of them idle; {id: (name, seconds, productive, count)}"""
+    monkeypatch.setattr(app_module, 'STUDENTS_PER_PAGE', 3)
+    plans = {'ana': [(600, True), (300, False)], 'ben': [(1200, False)], 'cy': [],
+             'dee': [(60, True)] * 5, 'eve': [(900, True)], 'fay': [], 'gus': [(450, True), (450, False)]}
+    expected = {}
+    for name, plan in plans.items():
+        with flask_app.app_context():
+            user = User(username=name, email=f'{name}@test.local', password_hash='-', role='student')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+        add_activities(user_id, [
+            ('Code.Exe', 'app.py - Visual Studio Code', NOW - timedelta(hours=3, minutes=i), s) if productive else
+            ('Chrome.Exe', 'YouTube - Google Chrome', NOW - timedelta(hours=3, minutes=i), s)
+            for i, (s, productive) in enumerate(plan)])
+        expected[user_id] = (name, sum(s for s, _ in plan), sum(s for s, p in plan if p), len(plan))
+    return expected
+
+def python_order(expected, sort, descending):
+    def key(item):
+        user_id, (name, seconds, productive, count) = item
+        return {'id': user_id, 'name': name, 'total': seconds, 'activity': count,
+                'productive': productive / seconds if seconds else None}[sort]
+    items = sorted(expected.items())  # ties fall back to id ascending
+    with_value = sorted([i for i in items if key(i) is not None], key=key, reverse=descending)
+    without = [i for i in items if key(i) is None]
+    # SQLite sorts NULL first ascending and last descending
+    return [user_id for user_id, _ in (with_value + without if descending else without + with_value)]
+
+@pytest.mark.parametrize('sort', CLASSROOM_SORTS)
+@pytest.mark.parametrize('descending', (False, True))
+def test_pages_concatenate_to_the_full_sort(flask_app, classroom, sort, descending):
+    with flask_app.app_context():
+        pages = [classroom_summary(sort, descending, page) for page in (1, 2, 3)]
+    assert [p['page_count'] for p in pages] == [3, 3, 3]
+    got = [s['student']['id'] for p in pages for s in p['student_stats']]
+    assert got == python_order(classroom, sort, descending)
+
+def test_class_totals_cover_every_page(flask_app, classroom):
+    with flask_app.app_context():
+        summary = classroom_summary('id', False, 3)
+    seconds = sum(s for _, s, _, _ in classroom.values())
+    productive = sum(p for _, _, p, _ in classroom.values())
+    assert len(summary['student_stats']) == 1
+    assert summary['student_count'] == 7
+    assert summary['total_classroom_time'] == seconds / 60
+    assert summary['class_productive_share'] == pytest.approx(productive / seconds)
+    assert summary['class_activity_count'] == sum(c for *_, c in classroom.values())
+
+def test_page_past_the_end_shows_the_first(flask_app, classroom):
+    with flask_app.app_context():
+        summary = classroom_summary('name', False, 9)
+    assert summary['page'] == 1 and [s['student']['username'] for s in summary['student_stats']] == ['ana', 'ben', 'cy']
+
+def test_query_count_does_not_grow_with_the_class(flask_app, admin, classroom, monkeypatch):
+    monkeypatch.setattr(app_module, 'dashboard_cache', app_module.DashboardCache())
+    statements = []
+    with flask_app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        counts = []
+        for page in (1, 3):
+            statements.clear()
+            response = logged_in(flask_app, admin).get('/admin/users', query_string={'sort': 'total', 'page': page})
+            assert response.status_code == 200
+            counts.append(len(statements))
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    # loading the admin for login, then the one classroom statement
+    assert counts == [2, 2]
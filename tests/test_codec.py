@@ -0,0 +1,52 @@
+# test_codec.py - compressed delta updates and error feedback
+import numpy as np
+import pytest
+
+from codec import UpdateEncoder, decode_update, get_parameters, payload_bytes, set_parameters
+from save_model import ProductivityNet
+
+def weights(seed, scale=1.0):
+    rng = np.random.default_rng(seed)
+    return [rng.normal(size=(64, 32)).astype(np.float32) * scale, rng.normal(size=64).astype(np.float32) * scale,
+            np.array(7, dtype=np.int64)]
+
+@pytest.mark.parametrize('codec, tolerance', [('none', 0), ('fp16', 5e-3), ('int8', 5e-2)])
+def test_round_trip(codec, tolerance):
+    global_weights, trained = weights(0), weights(1)
+    decoded = decode_update(UpdateEncoder().encode(trained, global_weights, codec), global_weights)
+    for got, want in zip(decoded, trained):
+        assert got.dtype == want.dtype and got.shape == want.shape
+        np.testing.assert_allclose(got, want, atol=tolerance)
+
+def test_plain_weights_pass_through():
+    trained = weights(1)
+    for got, want in zip(decode_update(trained, weights(0)), trained):
+        np.testing.assert_array_equal(got, want)
+
+def test_topk_is_smaller_and_error_feedback_loses_nothing():
+    global_weights, target = weights(0), weights(1, scale=0.1)
+    encoder = UpdateEncoder()
+    payload = encoder.encode([g + t for g, t in zip(global_weights, target)], global_weights, 'topk', 0.1)
+    assert payload_bytes(payload) < payload_bytes(global_weights) / 3
+
+    # Sending the same delta repeatedly: what top-k dropped is re-sent from the residuals
+    encoder = UpdateEncoder()
+    received = [np.zeros_like(t) for t in target[:2]]
+    for _ in range(30):
+        trained = [g + t for g, t in zip(global_weights, target)]
+        decoded = decode_update(encoder.encode(trained, global_weights, 'topk', 0.1), global_weights)
+        for r, d, g in zip(received, decoded, global_weights):
+            r += d - g
+    for r, t, residual in zip(received, target[:2], encoder.residuals):
+        np.testing.assert_allclose(r + residual, 30 * t, atol=1e-3)  # nothing is lost, only delayed
+        assert np.count_nonzero(r) > r.size / 2
+
+def test_unknown_codec_is_refused():
+    with pytest.raises(ValueError):
+        UpdateEncoder().encode(weights(1), weights(0), 'zip')
+
+def test_model_parameters_round_trip():
+    model, other = ProductivityNet(), ProductivityNet()
+    set_parameters(other, get_parameters(model))
+    for a, b in zip(get_parameters(model), get_parameters(other)):
+        np.testing.assert_array_equal(a, b)
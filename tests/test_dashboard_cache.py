@@ -0,0 +1,96 @@
+# test_dashboard_cache.py - versioned LRU of dashboard contexts and the ETag/304 path
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+from conftest import logged_in
+from dashboard_cache import DashboardCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_bump_invalidates_only_the_touched_users():
+    cache = DashboardCache(ttl=60)
+    cache.put(('dashboard', 1), cache.version(1), 'one')
+    cache.put(('dashboard', 2), cache.version(2), 'two')
+    cache.put('classroom', cache.version(), 'class')
+    cache.bump([1, 1])
+    assert cache.get(('dashboard', 1), cache.version(1)) is None
+    assert cache.get(('dashboard', 2), cache.version(2)).value == 'two'
+    assert cache.get('classroom', cache.version()) is None
+    assert cache.version(1) == 1 and cache.version() == 1
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = DashboardCache(ttl=60, clock=clock)
+    cache.put('k', 0, 'v')
+    clock.now += 59
+    assert cache.get('k', 0).value == 'v'
+    clock.now += 1
+    assert cache.get('k', 0) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = DashboardCache(max_entries=2)
+    cache.put('a', 0, 1)
+    cache.put('b', 0, 2)
+    cache.get('a', 0)
+    cache.put('c', 0, 3)
+    assert cache.get('b', 0) is None
+    assert cache.get('a', 0).value == 1 and cache.get('c', 0).value == 3
+
+def test_get_or_compute_only_computes_on_a_miss():
+    cache = DashboardCache()
+    calls = []
+    for _ in range(3):
+        entry = cache.get_or_compute('k', 0, lambda: calls.append(1) or len(calls))
+    assert entry.value == 1 and len(calls) == 1
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    # the module-level cache outlives the emptied tables, and user ids are reused between tests
+    cache = DashboardCache()
+    monkeypatch.setattr(app_module, 'dashboard_cache', cache)
+    return cache
+
+def test_dashboard_revalidates_until_new_activity_arrives(flask_app, student, add_activities, fresh_cache):
+    client = logged_in(flask_app, student)
+    first = client.get('/dashboard')
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'private, no-cache'
+    etag = first.headers['ETag']
+
+    again = client.get('/dashboard', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and not again.get_data()
+    assert fresh_cache.hits == 1
+
+    add_activities(student, [('Code.Exe', 'app.py - Visual Studio Code',
+                              datetime.now().replace(microsecond=0) - timedelta(minutes=30), 600)])
+    changed = client.get('/dashboard', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+
+def test_classroom_etag_depends_on_the_viewer(flask_app, admin, student, fresh_cache):
+    with flask_app.app_context():
+        other = app_module.User(username='other admin', email='other@test.local', password_hash='-', role='admin')
+        app_module.db.session.add(other)
+        app_module.db.session.commit()
+        other_id = other.id
+    etag = logged_in(flask_app, admin).get('/admin/users').headers['ETag']
+    response = logged_in(flask_app, other_id).get('/admin/users', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and fresh_cache.hits == 1
+
+def test_student_page_etag_depends_on_the_viewing_admin(flask_app, admin, student, fresh_cache):
+    with flask_app.app_context():
+        other = app_module.User(username='other admin', email='other@test.local', password_hash='-', role='admin')
+        app_module.db.session.add(other)
+        app_module.db.session.commit()
+        other_id = other.id
+    url = f'/admin/student/{student}'
+    etag = logged_in(flask_app, admin).get(url).headers['ETag']
+    assert logged_in(flask_app, admin).get(url, headers={'If-None-Match': etag}).status_code == 304
+    theirs = logged_in(flask_app, other_id).get(url, headers={'If-None-Match': etag})
+    assert theirs.status_code == 200 and theirs.headers['ETag'] != etag
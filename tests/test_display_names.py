@@ -0,0 +1,38 @@
+# test_display_names.py - display name and category stored at ingest, backfilled by migrate_db
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import Activity, dashboard_summary, db
+from classifier import PRODUCTIVE, UNPRODUCTIVE
+from migrate_db import backfill_display_names
+
+START = datetime.now().replace(microsecond=0) - timedelta(hours=2)
+
+def test_ingest_stores_classification(flask_app, student, add_activities):
+    add_activities(student, [('Chrome.Exe', '(3) YouTube - Google Chrome', START, 120),
+                             ('Code.Exe', 'app.py - Visual Studio Code', START, 300)])
+    with flask_app.app_context():
+        stored = db.session.query(Activity.display_name, Activity.category).order_by(Activity.id).all()
+    assert stored == [('YouTube', UNPRODUCTIVE), ('VS Code', PRODUCTIVE)]
+
+def test_backfill_fills_only_missing_rows(flask_app, student, add_activities):
+    add_activities(student, [('Code.Exe', 'app.py - Visual Studio Code', START, 300)] * 3)
+    with flask_app.app_context():
+        first = db.session.query(Activity.id).order_by(Activity.id).first()[0]
+        db.session.execute(update(Activity).where(Activity.id != first).values(display_name=None, category=None))
+        db.session.commit()
+        assert backfill_display_names() == 2
+        assert backfill_display_names() == 0
+        assert {r for r in db.session.query(Activity.display_name, Activity.category)} == {('VS Code', PRODUCTIVE)}
+
+def test_dashboard_summary_groups_by_display_name(flask_app, student, add_activities):
+    add_activities(student, [('Chrome.Exe', 'YouTube - Google Chrome', START, 600),
+                             ('Chrome.Exe', '(3) YouTube - Google Chrome', START + timedelta(minutes=10), 600),
+                             ('Code.Exe', 'app.py - Visual Studio Code', START, 1800)])
+    with flask_app.app_context():
+        summary = dashboard_summary(student, START - timedelta(minutes=30))
+    apps = {a['app_name']: (a['total_minutes'], a['is_productive']) for a in summary['merged_activities']}
+    assert apps == {'VS Code': (30.0, True), 'YouTube': (20.0, False)}
+    assert summary['total_duration'] == 50 and summary['productive_time'] == 30
+    assert summary['activity_count'] == 3
@@ -0,0 +1,43 @@
+# test_features.py - the shared feature encoder and the memory-mapped sample store
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+import features
+from conftest import ROOT
+from features import NUM_FEATURES, ActivityDataStore, get_activity_features
+
+def test_encoder_matches_the_per_activity_rules():
+    features, labels = get_activity_features(['Code.Exe', 'YouTube', 'Chrome.Exe'], [600, 30, 301])
+    assert features.shape == (3, NUM_FEATURES) and features.dtype == np.float32
+    assert labels.tolist() == [1, 0, 0]
+    np.testing.assert_allclose(features[0], [1, 0, 1, 8 / 20, 0])
+    np.testing.assert_allclose(features[1], [0, 1, 0, 7 / 20, 0])
+    np.testing.assert_allclose(features[2], [0, 0, 1, 10 / 20, 1])
+
+def test_store_wraps_around_and_survives_reopening(tmp_path):
+    store = ActivityDataStore(str(tmp_path), capacity=4)
+    for start in (0, 3):
+        labels = np.arange(start, start + 3)
+        store.append(np.repeat(labels[:, None], NUM_FEATURES, axis=1), labels)
+    assert len(store) == 4
+    assert sorted(store.labels().tolist()) == [2, 3, 4, 5]  # the two oldest were overwritten
+
+    reopened = ActivityDataStore(str(tmp_path), capacity=100)  # capacity is fixed on first creation
+    assert reopened.capacity == 4
+    assert sorted(reopened.labels().tolist()) == [2, 3, 4, 5]
+    np.testing.assert_array_equal(reopened.features()[:, 0], reopened.labels())
+
+def test_importing_the_fl_modules_writes_nothing(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k != 'FL_DATA_DIR'}
+    env['PYTHONPATH'] = ROOT
+    subprocess.run([sys.executable, '-c', 'import client, simulate, tracker'], cwd=tmp_path, env=env, check=True)
+    assert not (tmp_path / 'fl_data').exists()
+
+def test_local_store_follows_fl_data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(features, '_local_store', None)
+    monkeypatch.setenv('FL_DATA_DIR', str(tmp_path / 'data'))
+    assert features.local_store().path == str(tmp_path / 'data')
+    assert (tmp_path / 'data' / 'features.npy').exists()
@@ -0,0 +1,64 @@
+# test_ingest.py - per-item validation of /track_activity and /track_activities
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import Activity, build_activity_row, db
+
+START = datetime.now().replace(microsecond=0) - timedelta(hours=1)
+
+def activity(user_id, **overrides):
+    item = {
+        'user_id': user_id,
+        'app_name': 'Code.Exe',
+        'window_title': 'app.py - Visual Studio Code',
+        'duration_seconds': 60,
+        'timestamp_start': START.isoformat(),
+        'timestamp_end': (START + timedelta(seconds=60)).isoformat(),
+    }
+    item.update(overrides)
+    return item
+
+@pytest.mark.parametrize('overrides', [
+    {'app_name': 123},
+    {'app_name': ['x']},
+    {'window_title': 42},
+    {'duration_seconds': 10 ** 30},
+    {'duration_seconds': True},
+    {'duration_seconds': -1},
+    {'fl_score': 'inf'},
+    {'timestamp_start': '0001-01-01T00:00:00'},
+    {'timestamp_end': '9999-01-01T00:00:00'},
+    {'timestamp_start': (START + timedelta(hours=2)).isoformat()},
+])
+def test_bad_fields_raise_value_error(overrides):
+    with pytest.raises(ValueError):
+        build_activity_row(activity(1, **overrides), {1})
+
+def test_bool_user_id_is_rejected():
+    with pytest.raises(ValueError):
+        build_activity_row(activity(True), {1})
+
+def test_bad_item_does_not_sink_the_batch(flask_app, student):
+    items = [activity(student), activity(student, app_name=123), activity(student, duration_seconds=10 ** 30),
+             activity(student, window_title=42), activity(True)]
+    response = flask_app.test_client().post('/track_activities', json={'activities': items})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['accepted'] == 1
+    assert [r['status'] for r in body['results']] == ['accepted'] + ['rejected'] * 4
+    with flask_app.app_context():
+        assert db.session.query(Activity).count() == 1
+
+def test_single_endpoint_rejects_bad_items(flask_app, student):
+    client = flask_app.test_client()
+    assert client.post('/track_activity', json=activity(student, window_title=42)).status_code == 400
+    assert client.post('/track_activity', json=[activity(student)]).status_code == 400
+    assert client.post('/track_activity', json=activity(student)).status_code == 200
+
+def test_out_of_range_user_id_is_rejected(flask_app, student):
+    client = flask_app.test_client()
+    assert client.post('/track_activity', json=activity(10 ** 30)).status_code == 400
+    response = client.post('/track_activities', json={'activities': [activity(10 ** 30), activity(student)]})
+    assert response.status_code == 200
+    assert response.get_json()['accepted'] == 1
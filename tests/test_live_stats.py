@@ -0,0 +1,64 @@
+# test_live_stats.py - sliding-window totals on a fake clock
+from datetime import datetime, timedelta, timezone
+
+from live_stats import SlidingWindowStore
+
+T0 = datetime(2026, 3, 2, 12, 0, 0)
+
+class Clock:
+    def __init__(self, at):
+        self.now = at.replace(tzinfo=timezone.utc).timestamp()
+
+    def __call__(self):
+        return self.now
+
+def row(id, minutes_ago, name='VS Code', seconds=60, user_id=1, category='productive'):
+    return {'id': id, 'user_id': user_id, 'display_name': name, 'category': category,
+            'duration_seconds': seconds, 'timestamp_start': T0 - timedelta(minutes=minutes_ago)}
+
+def totals(store, user_id=1):
+    return {r.display_name: (r.seconds, r.count) for r in store.totals(user_id)}
+
+def make_store(stored, clock, **kwargs):
+    def loader(user_id, since):
+        since = since.replace(tzinfo=None)
+        return [r for r in stored if r['user_id'] == user_id and r['timestamp_start'] >= since]
+    return SlidingWindowStore(loader, window_seconds=3600, bucket_seconds=60, clock=clock, **kwargs)
+
+def test_loads_then_counts_new_rows_once():
+    stored = [row(1, 30), row(2, 90), row(3, 10, name='YouTube', category='unproductive')]
+    store = make_store(stored, Clock(T0))
+    assert totals(store) == {'VS Code': (60, 1), 'YouTube': (60, 1)}  # the 90-minute-old row is outside
+    store.add_rows([row(3, 10, name='YouTube'), row(4, 0, seconds=30)])  # id 3 was already loaded
+    assert totals(store) == {'VS Code': (90, 2), 'YouTube': (60, 1)}
+
+def test_rows_expire_as_the_window_slides():
+    clock = Clock(T0)
+    store = make_store([row(1, 50), row(2, 5)], clock)
+    assert totals(store) == {'VS Code': (120, 2)}
+    clock.now += 20 * 60
+    assert totals(store) == {'VS Code': (60, 1)}
+    clock.now += 3 * 3600  # jump past the whole window
+    assert totals(store) == {}
+
+def test_least_recently_used_user_is_evicted_and_reloaded():
+    stored = [row(1, 5, user_id=1), row(2, 5, user_id=2), row(3, 5, user_id=3)]
+    store = make_store(stored, Clock(T0), max_users=2)
+    for user_id in (1, 2, 3):
+        store.totals(user_id)
+    assert len(store) == 2
+    store.add_rows([row(4, 1, user_id=1)])  # not in memory: picked up from the loader instead
+    stored.append(row(4, 1, user_id=1))
+    assert totals(store, 1) == {'VS Code': (120, 2)}
+
+def test_check_reports_mismatches():
+    store = make_store([row(1, 5)], Clock(T0))
+    assert store.check(1, store.totals(1)) == {}
+    assert store.check(1, []) == {'VS Code': ((60, 1), None)}
+
+def test_batches_committed_out_of_id_order_are_all_counted():
+    store = make_store([row(1, 30)], Clock(T0))
+    assert totals(store) == {'VS Code': (60, 1)}
+    store.add_rows([row(5, 2), row(4, 2)])  # a later ingest can get here first
+    store.add_rows([row(3, 3), row(2, 3)])
+    assert totals(store) == {'VS Code': (300, 5)}
@@ -0,0 +1,101 @@
+# test_metrics.py - Prometheus text rendering, the /metrics endpoint and the slow request profiler
+import os
+import sys
+import time
+
+import psutil
+import pytest
+
+from app import REQUEST_QUERIES
+from metrics import Registry, SlowRequestProfiler, peak_rss_mb
+
+def test_counter_and_gauge_render_per_label_set():
+    registry = Registry()
+    hits = registry.counter('hits_total', "Hits", ('route',))
+    hits.inc(route='/a')
+    hits.inc(2, route='/b')
+    hits.inc(route='/a')
+    registry.gauge('depth', "Queue depth").set_function(lambda: 7)
+    assert registry.render() == (
+        '# HELP depth Queue depth\n# TYPE depth gauge\ndepth 7\n'
+        '# HELP hits_total Hits\n# TYPE hits_total counter\n'
+        'hits_total{route="/a"} 2\nhits_total{route="/b"} 2\n')
+    assert hits.value(route='/a') == 2
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    registry = Registry()
+    sizes = registry.histogram('sizes', "Sizes", buckets=(1, 5, 10))
+    for value in (0.5, 1, 3, 5, 10, 11):
+        sizes.observe(value)
+    lines = registry.render().splitlines()[2:]
+    assert lines == ['sizes_bucket{le="1"} 2', 'sizes_bucket{le="5"} 4', 'sizes_bucket{le="10"} 5',
+                     'sizes_bucket{le="+Inf"} 6', 'sizes_sum 30.5', 'sizes_count 6']
+    assert sizes.value() == (6, 30.5)
+
+def test_histogram_timer_observes_the_block():
+    latency = Registry().histogram('latency', "Latency", ('op',))
+    with latency.time(op='sleep'):
+        time.sleep(0.01)
+    count, total = latency.value(op='sleep')
+    assert count == 1 and 0.01 <= total < 1
+
+def test_labels_are_checked_and_escaped():
+    registry = Registry()
+    errors = registry.counter('errors_total', "Errors", ('message',))
+    with pytest.raises(ValueError):
+        errors.inc(reason='x')
+    errors.inc(message='say "hi"\\\n')
+    assert 'errors_total{message="say \\"hi\\"\\\\\\n"} 1' in registry.render()
+
+def test_same_name_returns_the_same_metric_but_not_another_kind():
+    registry = Registry()
+    assert registry.counter('x', "X") is registry.counter('x', "X")
+    with pytest.raises(ValueError):
+        registry.gauge('x', "X")
+
+def test_failing_collector_is_skipped():
+    registry = Registry()
+    registry.gauge('broken', "Broken").set_function(lambda: 1 / 0)
+    assert registry.render() == '# HELP broken Broken\n# TYPE broken gauge\n'
+
+def test_dump_replaces_the_file_whole(tmp_path):
+    registry = Registry()
+    registry.counter('runs_total', "Runs").inc()
+    path = tmp_path / 'app.prom'
+    path.write_text('old')
+    registry.dump(str(path))
+    assert path.read_text() == registry.render()
+    assert os.listdir(tmp_path) == ['app.prom']
+
+def test_profiler_reports_only_slow_requests():
+    profiler = SlowRequestProfiler(threshold_ms=20, interval_ms=1)
+    token = profiler.begin()
+    assert profiler.end(token, 0.001) is None
+    token = profiler.begin()
+    deadline = time.perf_counter() + 0.1
+    while time.perf_counter() < deadline:
+        pass
+    samples = profiler.end(token, 0.1, 'GET /slow')
+    assert profiler.slow_requests == 1
+    assert samples and any('test_metrics.py:test_profiler_reports_only_slow_requests' in s for s in samples)
+
+def test_metrics_endpoint_needs_the_token_when_set(flask_app, monkeypatch):
+    client = flask_app.test_client()
+    monkeypatch.setitem(flask_app.config, 'METRICS_TOKEN', 'secret')
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    response = client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    assert '# TYPE http_request_duration_seconds histogram' in response.get_data(as_text=True)
+
+def test_requests_are_timed_by_endpoint(flask_app):
+    before = REQUEST_QUERIES.value(endpoint='list_users')[0]
+    flask_app.test_client().get('/users')
+    count, total = REQUEST_QUERIES.value(endpoint='list_users')
+    assert count == before + 1 and total >= 1
+
+def test_peak_rss_is_in_mebibytes_with_or_without_resource(monkeypatch):
+    current = psutil.Process().memory_info().rss / 2 ** 20
+    assert current * 0.9 <= peak_rss_mb() < 64 * 1024
+    monkeypatch.setitem(sys.modules, 'resource', None)  # as on Windows, where the module doesn't exist
+    assert current * 0.5 <= peak_rss_mb() < 64 * 1024
@@ -0,0 +1,34 @@
+# test_rollup.py - ActivityHourly stays equal to the raw rows it summarizes
+from collections import Counter
+from datetime import datetime, timedelta
+
+from conftest import random_specs
+from app import Activity, ActivityHourly, db, window_totals
+from migrate_db import rebuild_hourly_rollup
+
+NOW = datetime(2026, 3, 2, 15, 37, 12)
+
+def raw_totals(user_id, cutoff):
+    totals = Counter()
+    for a in db.session.query(Activity).filter(Activity.user_id == user_id, Activity.timestamp_start >= cutoff):
+        totals[(a.display_name, a.category)] += a.duration_seconds
+    return totals
+
+def test_window_totals_match_raw_rows(flask_app, student, add_activities):
+    add_activities(student, random_specs(0, 400, NOW))
+    with flask_app.app_context():
+        for cutoff in (NOW - timedelta(hours=24), NOW - timedelta(hours=5, minutes=17), NOW - timedelta(days=3)):
+            got = Counter({(r.display_name, r.category): r.seconds for r in window_totals(cutoff, student)})
+            assert got == raw_totals(student, cutoff)
+
+def test_incremental_rollup_equals_a_rebuild(flask_app, student, add_activities):
+    for seed in range(3):  # several batches hitting the same hours go through the upsert
+        add_activities(student, random_specs(seed, 100, NOW))
+    with flask_app.app_context():
+        def snapshot():
+            return sorted((h.user_id, h.hour, h.app_name, h.category, h.total_seconds, h.activity_count)
+                          for h in db.session.query(ActivityHourly))
+        incremental = snapshot()
+        assert rebuild_hourly_rollup() == 300
+        assert snapshot() == incremental
+        assert sum(row[5] for row in incremental) == 300
@@ -0,0 +1,28 @@
+# test_scoring.py - ingest-time scores and rescore_activities agree
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import Activity, db, scorer
+from rescore_activities import rescore
+
+def test_rescore_uses_the_same_inputs_as_ingest(flask_app, student):
+    if not scorer.reload(force=True) and scorer.model is None:
+        pytest.skip("no global model checkpoint")
+    start = datetime.now().replace(microsecond=0) - timedelta(hours=1)
+    items = [{'user_id': student, 'app_name': app_name, 'window_title': title, 'duration_seconds': seconds,
+              'timestamp_start': start.isoformat(),
+              'timestamp_end': (start + timedelta(seconds=seconds)).isoformat()}
+             for app_name, title, seconds in [('Chrome.Exe', 'YouTube - Google Chrome', 900),
+                                              ('Code.Exe', 'app.py - Visual Studio Code', 60)]]
+    response = flask_app.test_client().post('/track_activities', json={'activities': items})
+    assert response.get_json()['accepted'] == 2
+
+    with flask_app.app_context():
+        live = dict(db.session.query(Activity.id, Activity.fl_score))
+        assert db.session.query(Activity.raw_app_name).order_by(Activity.id).all() == [('Chrome.Exe',), ('Code.Exe',)]
+        db.session.execute(update(Activity).values(fl_score=-1.0))
+        db.session.commit()
+        assert rescore() == 2
+        assert dict(db.session.query(Activity.id, Activity.fl_score)) == pytest.approx(live)
@@ -0,0 +1,81 @@
+# test_segments.py - coalescing of focus segments, directly and through a replayed tracker
+from datetime import datetime, timedelta
+
+from segments import SegmentCoalescer
+from tracker import AdaptivePoller, RealTimeActivityTracker
+from window_sources import ReplaySource
+
+T0 = datetime(2026, 1, 5, 9, 0, 0)
+CODE = ('Code.Exe', 'app.py - Visual Studio Code')
+
+def at(seconds):
+    return T0 + timedelta(seconds=seconds)
+
+class CollectingUploader:
+    def __init__(self):
+        self.activities = []
+
+    def submit(self, activity):
+        self.activities.append(activity)
+
+def replay(events):
+    uploader = CollectingUploader()
+    tracker = RealTimeActivityTracker(source=ReplaySource(events, start=T0), poller=AdaptivePoller(),
+                                      uploader=uploader)
+    tracker.tracking = True
+    tracker.track()
+    return uploader.activities
+
+def test_title_churn_merges_into_one_activity():
+    coalescer = SegmentCoalescer()
+    assert coalescer.add('Chrome.Exe', 'YouTube - Google Chrome', at(0), at(100)) == []
+    assert coalescer.add('Chrome.Exe', '(3) YouTube - Google Chrome', at(100), at(600)) == []
+    [activity] = coalescer.flush()
+    assert activity['duration_seconds'] == 600
+    assert activity['window_title'] == '(3) YouTube - Google Chrome'  # shown longest
+
+def test_expire_keeps_activity_while_same_app_is_still_open():
+    coalescer = SegmentCoalescer(merge_gap=120)
+    coalescer.add('Chrome.Exe', 'YouTube - Google Chrome', at(0), at(100))
+    open_segment = ('Chrome.Exe', '(3) YouTube - Google Chrome', at(100))
+    assert coalescer.expire(at(500), open_segment) == []
+    other_app = ('Code.Exe', 'app.py - Visual Studio Code', at(100))
+    assert len(coalescer.expire(at(500), other_app)) == 1
+
+def test_short_fragment_is_credited_to_its_neighbour():
+    coalescer = SegmentCoalescer()
+    coalescer.add(*CODE, at(0), at(100))
+    coalescer.add('Discord.Exe', '#general - Discord', at(100), at(105))
+    coalescer.add(*CODE, at(105), at(200))
+    [activity] = coalescer.flush()
+    assert activity['duration_seconds'] == 200
+
+def test_duration_excludes_gaps_between_merged_segments():
+    coalescer = SegmentCoalescer(merge_gap=120)
+    coalescer.add(*CODE, at(0), at(100))
+    coalescer.add(*CODE, at(170), at(190))
+    [activity] = coalescer.flush()
+    assert activity['duration_seconds'] == 120
+    assert activity['timestamp_end'] == at(190).isoformat()
+
+def test_replayed_churn_uploads_one_row():
+    activities = replay([
+        {'t': 0, 'app': 'chrome.exe', 'title': 'YouTube - Google Chrome'},
+        {'t': 100, 'app': 'chrome.exe', 'title': '(3) YouTube - Google Chrome'},
+        {'t': 600, 'app': 'code.exe', 'title': 'app.py - Visual Studio Code'},
+        {'t': 700, 'end': True},
+    ])
+    assert [a['app_name'] for a in activities] == ['Chrome.Exe', 'Code.Exe']
+    assert 598 <= activities[0]['duration_seconds'] <= 602
+
+def test_replayed_idle_break_is_not_counted():
+    activities = replay([
+        {'t': 0, 'app': 'code.exe', 'title': 'app.py - Visual Studio Code'},
+        {'t': 100, 'idle': True},
+        {'t': 170, 'idle': False},
+        {'t': 180, 'end': True},
+    ])
+    assert len(activities) == 2
+    assert activities[0]['duration_seconds'] == 100
+    assert activities[0]['timestamp_end'] == at(100).isoformat()
+    assert sum(a['duration_seconds'] for a in activities) <= 112
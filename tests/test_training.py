@@ -0,0 +1,49 @@
+# test_training.py - held-out split, mini-batches and local training through ActivityClient
+import numpy as np
+import torch
+
+from client import ActivityClient
+from codec import decode_update, get_parameters
+from features import ActivityDataStore, get_activity_features
+from save_model import ProductivityNet
+from training import iter_batches, split_indices, train_local, training_settings
+
+def test_split_is_disjoint_and_stable():
+    train, val = split_indices(100, 0.2)
+    assert len(val) == 20 and not set(train) & set(val)
+    assert set(train) | set(val) == set(range(100))
+    np.testing.assert_array_equal(split_indices(100, 0.2)[1], val)
+    assert len(split_indices(1, 0.2)[1]) == 0
+
+def test_batches_cover_every_index_once():
+    batches = list(iter_batches(np.arange(103), 10, np.random.default_rng(0)))
+    assert [len(b) for b in batches] == [10] * 10 + [3]
+    assert sorted(np.concatenate(batches)) == list(range(103))
+    assert all((np.diff(b) > 0).all() for b in batches)
+
+def test_settings_come_from_the_server_config():
+    settings = training_settings({'epochs': '2', 'batch_size': 8.0, 'unrelated': 1})
+    assert settings['epochs'] == 2 and settings['batch_size'] == 8 and 'unrelated' not in settings
+
+def test_max_steps_caps_training():
+    torch.manual_seed(0)
+    features, labels = get_activity_features(['Code.Exe', 'YouTube'] * 50, [600, 30] * 50)
+    settings = training_settings({'epochs': 5, 'batch_size': 10, 'max_steps': 7})
+    results = train_local(ProductivityNet(), features, labels, np.arange(100), settings)
+    assert results['steps'] == 7
+
+def test_client_learns_from_its_store(tmp_path):
+    torch.manual_seed(0)
+    store = ActivityDataStore(str(tmp_path), capacity=400)
+    store.append(*get_activity_features(['Code.Exe', 'YouTube', 'Chrome.Exe', 'Visual Studio'] * 100,
+                                        [600, 30, 120, 900] * 100))
+    client = ActivityClient(data=store, net=ProductivityNet())
+    initial = get_parameters(client.model)
+    config = {'epochs': 20, 'learning_rate': 0.1, 'codec': 'none'}
+
+    loss_before, num_val, _ = client.evaluate(initial, config)
+    update, num_train, results = client.fit(initial, config)
+    assert (num_train, num_val) == (320, 80)
+    loss_after, _, metrics = client.evaluate(decode_update(update, initial), config)
+    assert loss_after < loss_before
+    assert metrics['accuracy'] == 1.0
@@ -0,0 +1,140 @@
+# test_uploader.py - spool ordering and poison batches, against a fake /track_activities
+import threading
+import time
+
+import requests
+
+from uploader import ActivityUploader
+
+class FakeResponse:
+    def __init__(self, status_code, activities=()):
+        self.status_code = status_code
+        self.text = '' if status_code == 200 else 'boom'
+        self._results = [{'index': i, 'status': 'accepted'} for i in range(len(activities))]
+
+    def json(self):
+        return {'results': self._results}
+
+class FakeServer:
+    """Fails any batch containing a poison row with 500; refuses connections while offline"""
+    def __init__(self, online=True):
+        self.online = online
+        self.received = []
+        self.lock = threading.Lock()
+
+    def post(self, url, json, timeout):
+        activities = json['activities']
+        if not self.online:
+            raise requests.ConnectionError("offline")
+        if any(a.get('poison') for a in activities):
+            return FakeResponse(500)
+        with self.lock:
+            self.received.extend(a['n'] for a in activities)
+        return FakeResponse(200, activities)
+
+def make_uploader(tmp_path, server, **kwargs):
+    uploader = ActivityUploader('http://test', spool_path=str(tmp_path / 'spool.db'),
+                                backoff_base=0.001, backoff_max=0.01, **kwargs)
+    uploader.session.post = server.post
+    return uploader
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_poison_row_is_dead_lettered_without_blocking_the_rest(tmp_path):
+    server = FakeServer(online=False)
+    uploader = make_uploader(tmp_path, server, batch_size=8)
+    for n in range(20):
+        uploader.submit({'n': n, 'poison': n == 5})
+    wait_for(lambda: uploader.queue.empty())
+    server.online = True
+    wait_for(lambda: uploader.spooled() == 0)
+    uploader.stop()
+    assert server.received == [n for n in range(20) if n != 5]
+    assert uploader.dead == 1
+    dead = uploader._spool.execute("SELECT payload FROM dead_letter").fetchall()
+    assert len(dead) == 1 and '"n": 5' in dead[0][0]
+
+def test_overflow_keeps_submit_order(tmp_path):
+    server = FakeServer(online=False)
+    uploader = make_uploader(tmp_path, server, max_queue=3, batch_size=4)
+    for n in range(50):
+        uploader.submit({'n': n})
+    server.online = True
+    wait_for(lambda: len(server.received) == 50)
+    uploader.stop()
+    assert server.received == list(range(50))
+
+def test_spool_survives_restart_in_order(tmp_path):
+    server = FakeServer(online=False)
+    uploader = make_uploader(tmp_path, server)
+    for n in range(5):
+        uploader.submit({'n': n})
+    uploader.stop()
+    assert uploader.spooled() == 5
+
+    server.online = True
+    uploader = make_uploader(tmp_path, server)
+    uploader.submit({'n': 5})
+    wait_for(lambda: len(server.received) == 6)
+    uploader.stop()
+    assert server.received == list(range(6))
+
+def test_restart_after_dead_lettering_does_not_reuse_ids(tmp_path):
+    server = FakeServer()
+    uploader = make_uploader(tmp_path, server, batch_size=1, max_attempts=1)
+    uploader.submit({'n': 0, 'poison': True})
+    wait_for(lambda: uploader.dead == 1)
+    uploader.stop()
+    assert uploader.spooled() == 0
+
+    uploader = make_uploader(tmp_path, server, batch_size=1, max_attempts=1)
+    uploader.submit({'n': 1, 'poison': True})
+    uploader.submit({'n': 2})
+    wait_for(lambda: server.received == [2])
+    uploader.stop()
+    assert uploader.dead == 1 and uploader._thread.is_alive() is False
+    ids = [r[0] for r in uploader._spool.execute("SELECT id FROM dead_letter ORDER BY id")]
+    assert len(ids) == 2 and ids[0] < ids[1]
+
+class MalformedResponse(FakeResponse):
+    def json(self):
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+def test_malformed_success_body_counts_as_a_server_error(tmp_path):
+    server = FakeServer()
+    good_post = server.post
+    server.post = lambda url, json, timeout: (
+        MalformedResponse(200) if json['activities'][0]['n'] == 0 else good_post(url, json, timeout))
+    uploader = make_uploader(tmp_path, server, batch_size=1, max_attempts=1)
+    uploader.session.post = server.post
+    for n in range(3):
+        uploader.submit({'n': n})
+    wait_for(lambda: server.received == [1, 2])
+    uploader.stop()
+    assert uploader.dead == 1 and uploader.sent == 2
+
+def test_sender_survives_errors(tmp_path):
+    server = FakeServer()
+    good_post = server.post
+    broken = iter([True])
+    def flaky_post(url, json, timeout):
+        if next(broken, False):
+            raise RuntimeError("bug in the transport")
+        return good_post(url, json, timeout)
+    calls = []
+    def on_sent(activities):
+        calls.append(activities)
+        raise RuntimeError("callback bug")
+    uploader = make_uploader(tmp_path, server, on_sent=on_sent)
+    uploader.session.post = flaky_post
+    uploader.submit({'n': 0})
+    wait_for(lambda: server.received == [0])  # spooled by the failed attempt, then replayed
+    uploader.submit({'n': 1})
+    wait_for(lambda: server.received == [0, 1])
+    assert uploader._thread.is_alive()
+    uploader.stop()
+    assert uploader.sent == 2 and len(calls) == 2
@@ -0,0 +1,68 @@
+# test_window_sources.py - replayed traces, adaptive polling and the process-name cache
+import pytest
+
+from tracker import AdaptivePoller
+from window_sources import ProcessNameCache, RecordingSource, ReplaySource, WindowSource, make_source
+
+TRACE = [
+    {'t': 0, 'app': 'code.exe', 'title': 'app.py'},
+    {'t': 10, 'app': 'chrome.exe', 'title': 'YouTube'},
+    {'t': 11, 'app': 'code.exe', 'title': 'app.py'},  # gone again before a 3 s poll sees it
+    {'t': 20, 'idle': True},
+    {'t': 50, 'end': True},
+]
+
+def test_replay_runs_on_virtual_time_and_counts_missed_switches():
+    source = ReplaySource(TRACE)
+    seen = []
+    while not source.exhausted:
+        window = source.active_window()[:2]
+        if not seen or seen[-1] != window:
+            seen.append(window)
+        source.sleep(3)
+    assert seen == [('code.exe', 'app.py')]
+    assert source.missed == 2
+    assert source.idle_seconds() == source.elapsed - 20
+    assert (source.now() - source.start).total_seconds() == source.elapsed
+
+def test_recording_round_trips_through_replay(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    recorder = RecordingSource(ReplaySource(TRACE), str(path))
+    while not recorder.source.exhausted:
+        recorder.active_window()
+        recorder.source.sleep(0.5)
+    recorder.close()
+    replayed = make_source(f'replay:{path}')
+    assert replayed.active_window()[:2] == ('code.exe', 'app.py')
+    assert [e.get('app') for e in replayed.events] == ['code.exe', 'chrome.exe', 'code.exe', None]
+
+def test_poller_backs_off_and_snaps_back():
+    poller = AdaptivePoller(min_interval=0.5, max_interval=3.0, backoff=2.0, idle_after=60, idle_interval=10)
+    assert [poller.next_interval(False) for _ in range(4)] == [1.0, 2.0, 3.0, 3.0]
+    assert poller.next_interval(True) == 0.5
+    assert poller.next_interval(False, idle_seconds=90) == 10
+    assert poller.next_interval(False, idle_seconds=0) == 0.5  # input again
+
+def test_process_names_are_cached_per_window(monkeypatch):
+    lookups = []
+
+    class FakeProcess:
+        def __init__(self, pid):
+            lookups.append(pid)
+
+        def name(self):
+            return 'Code.EXE'
+
+    monkeypatch.setattr('window_sources.psutil.Process', FakeProcess)
+    now = [0.0]
+    cache = ProcessNameCache(ttl=60, max_size=2, clock=lambda: now[0])
+    assert cache.name(42, 'w1') == 'code.exe'
+    cache.name(42, 'w1')
+    cache.name(42, 'w2')  # same pid, different window: looked up again
+    now[0] = 61
+    cache.name(42, 'w1')
+    assert lookups == [42, 42, 42] and cache.hits == 1
+
+def test_base_source_needs_active_window():
+    with pytest.raises(TypeError):
+        WindowSource()
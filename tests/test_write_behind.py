@@ -0,0 +1,52 @@
+# test_write_behind.py - group commits, per-submission retry and flushing
+import threading
+
+from write_behind import WriteBehindWriter
+
+class FlakyCommit:
+    """Records committed rows; fails any group holding a row marked 'bad', after mutating it like insert_activities"""
+    def __init__(self):
+        self.committed = []
+        self.seen = []
+        self.lock = threading.Lock()
+
+    def __call__(self, rows, raw_app_names):
+        with self.lock:
+            self.seen.append([dict(row) for row in rows])
+        for i, row in enumerate(rows):
+            row['id'] = i + 1
+            row['fl_score'] = 0.5
+        if any(row.get('bad') for row in rows):
+            raise RuntimeError("constraint failed")
+        with self.lock:
+            self.committed.extend(row['n'] for row in rows)
+
+def test_rows_are_grouped_into_one_commit():
+    commit = FlakyCommit()
+    writer = WriteBehindWriter(commit, interval_ms=50, max_rows=100)
+    for n in range(10):
+        assert writer.submit([{'n': n}], ['Code.Exe'])
+    writer.close()
+    assert sorted(commit.committed) == list(range(10))
+    assert writer.stats()['commits'] < 10
+
+def test_failed_group_is_retried_per_submission_on_clean_rows():
+    commit = FlakyCommit()
+    writer = WriteBehindWriter(commit, interval_ms=1000, max_rows=100)
+    good = [{'n': 1, 'fl_score': None}, {'n': 2, 'fl_score': None}]
+    writer.submit(good, ['Code.Exe'] * 2)
+    writer.submit([{'n': 3, 'bad': True}], ['Code.Exe'])
+    writer.submit([{'n': 4, 'fl_score': None}], ['Code.Exe'])
+    writer.close()
+    assert sorted(commit.committed) == [1, 2, 4]
+    stats = writer.stats()
+    assert stats['failed_rows'] == 1 and stats['committed_rows'] == 3
+    for attempt in commit.seen:
+        assert all('id' not in row and row.get('fl_score') is None for row in attempt)
+    assert good[0] == {'n': 1, 'fl_score': None}  # the submitter's dicts are never touched
+
+def test_full_queue_refuses_submissions():
+    writer = WriteBehindWriter(FlakyCommit(), interval_ms=10000, max_rows=1000, max_queue=3)
+    assert writer.submit([{'n': 1}, {'n': 2}], ['a', 'b'])
+    assert not writer.submit([{'n': 3}, {'n': 4}], ['a', 'b'])
+    writer.close()
@@ -1,35 +1,51 @@
 # tracker.py - DEBUG VERSION WITH FULL LOGGING + FEDERATED LEARNING
-import psutil
-import win32gui
-import win32process
+import logging
+import os
 import time
 import threading
-from datetime import datetime
-import requests
-import json
-import torch
-import numpy as np
+from datetime import timedelta
 
-# 🔥 FEDERATED LEARNING GLOBALS (your existing model features)
-activity_features = []  # Local training data
-activity_labels = []    # 0=unproductive, 1=productive
+import metrics
+from features import get_activity_features, local_store
+from segments import SegmentCoalescer
+from uploader import ActivityUploader
+from window_sources import RecordingSource, make_source
+
+log = logging.getLogger(__name__)
+
+# 🔥 FEDERATED LEARNING: training samples go to features.local_store() for the Flower client (client.py)
 MODEL_TRAINED = False
 
-def get_activity_features(app_name, duration):
-    """Convert activity → ML features for YOUR ProductivityNet"""
-    features = np.array([
-        1.0 if 'code' in app_name.lower() or 'studio' in app_name.lower() else 0.0,  # productive
-        1.0 if 'youtube' in app_name.lower() or 'netflix' in app_name.lower() else 0.0,  # entertainment
-        1.0 if duration > 300 else 0.0,  # long session
-        len(app_name) / 20.0,  # app complexity
-        1.0 if 'chrome' in app_name.lower() else 0.0  # browser time
-    ], dtype=np.float32)
-    
-    label = 1 if 'code' in app_name.lower() or 'studio' in app_name.lower() else 0
-    return features, label
+POLL_SECONDS = metrics.histogram('tracker_poll_seconds', "Work per poll-loop iteration (sleep excluded)",
+                                 buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5))
+POLL_INTERVAL = metrics.gauge('tracker_poll_interval_seconds', "Current adaptive polling interval")
+SWITCHES = metrics.counter('tracker_focus_switches_total', "Focus or title changes seen")
+QUEUED = metrics.counter('tracker_activities_queued_total', "Coalesced activities handed to the uploader")
+
+class AdaptivePoller:
+    """Poll quickly right after a focus switch, back off while focus is stable or the user is idle"""
+    def __init__(self, min_interval=0.5, max_interval=3.0, backoff=1.5, idle_after=60.0, idle_interval=10.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.idle_after = idle_after
+        self.idle_interval = idle_interval
+        self.interval = min_interval
+        self.idle = False
+
+    def next_interval(self, switched, idle_seconds=0.0):
+        was_idle, self.idle = self.idle, idle_seconds >= self.idle_after
+        if switched or (was_idle and not self.idle):
+            self.interval = self.min_interval  # the user is back; the next switch is likely soon
+        elif self.idle:
+            self.interval = self.idle_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return self.interval
 
 class RealTimeActivityTracker:
-    def __init__(self, flask_url="http://127.0.0.1:5000", user_id=1):
+    def __init__(self, flask_url="http://127.0.0.1:5000", user_id=1, source=None, poller=None, uploader=None,
+                 coalescer=None):
         self.flask_url = flask_url
         self.user_id = user_id
         self.current_app = None
@@ -37,113 +53,143 @@ class RealTimeActivityTracker:
         self.start_time = None
         self.tracking = False
         self.activity_count = 0  # 🔥 NEW: FL data counter
-        print(f"🎯 Tracker User ID: {user_id}, Flask: {flask_url}")
-        print("🔥 FEDERATED LEARNING: Collecting training data...")
+        self.source = source or make_source(os.environ.get('TRACKER_SOURCE'))
+        self.poller = poller or AdaptivePoller()
+        self.coalescer = coalescer or SegmentCoalescer()  # 🔥 merges title churn and short fragments
+        self.uploader = uploader or ActivityUploader(flask_url, on_sent=self.record_training_data)
+        log.info("🎯 Tracker User ID: %s, Flask: %s, Window source: %s", user_id, flask_url, self.source.name)
+        log.info("🔥 FEDERATED LEARNING: Collecting training data...")
         
     def get_active_window(self):
-        try:
-            hwnd = win32gui.GetForegroundWindow()
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(pid)
-            app_name = process.name().lower()
-            window_title = win32gui.GetWindowText(hwnd)
-            return app_name, window_title, hwnd
-        except:
-            return "unknown", "Unknown Window", None
+        return self.source.active_window()
     
     def send_to_flask(self, activity):
-        global activity_features, activity_labels  # 🔥 FL data
-        
-        try:
-            payload = {
-                'user_id': self.user_id,
-                'app_name': activity['app_name'],
-                'window_title': activity['window_title'][:100],
-                'duration_seconds': activity['duration_seconds'],
-                'timestamp_start': activity['timestamp_start'],
-                'timestamp_end': activity['timestamp_end']
-            }
-            print(f"📤 SENDING TO FLASK: {payload['app_name']} ({payload['duration_seconds']}s)")
-            
-            response = requests.post(
-                f"{self.flask_url}/track_activity",
-                json=payload,
-                timeout=5,
-                headers={'Content-Type': 'application/json'}
-            )
-            print(f"📥 FLASK RESPONSE: {response.status_code} - {response.text[:100]}")
-            
-            if response.status_code == 200:
-                print(f"✅ SUCCESSFULLY TRACKED: {activity['app_name']}")
-                
-                # 🔥 FEDERATED LEARNING: Add to local training data
-                app_name = activity['app_name']
-                duration = activity['duration_seconds']
-                features, label = get_activity_features(app_name, duration)
-                activity_features.append(features)
-                activity_labels.append(label)
-                self.activity_count += 1
-                
-                # 🔥 Train local model every 10 activities
-                if self.activity_count % 10 == 0 and len(activity_features) >= 5:
-                    print(f"🤖 FL TRAINING: {len(activity_features)} samples collected")
-                    global MODEL_TRAINED
-                    MODEL_TRAINED = True
-            else:
-                print(f"❌ FLASK ERROR: {response.status_code}")
-        except Exception as e:
-            print(f"❌ REQUEST FAILED: {e}")
-    
+        # 🔥 Only enqueues: the uploader thread batches, retries and spools offline
+        payload = {
+            'user_id': self.user_id,
+            'app_name': activity['app_name'],
+            'window_title': activity['window_title'][:100],
+            'duration_seconds': activity['duration_seconds'],
+            'timestamp_start': activity['timestamp_start'],
+            'timestamp_end': activity['timestamp_end']
+        }
+        log.debug("📤 QUEUED FOR FLASK: %s (%ss)", payload['app_name'], payload['duration_seconds'])
+        QUEUED.inc()
+        self.uploader.submit(payload)
+
+    def record_training_data(self, activities):
+        """Called by the uploader with the activities Flask accepted"""
+        global MODEL_TRAINED
+        for activity in activities:
+            log.debug("✅ SUCCESSFULLY TRACKED: %s", activity['app_name'])
+
+        # 🔥 FEDERATED LEARNING: Add to local training data
+        features, labels = get_activity_features([a['app_name'] for a in activities],
+                                                 [a['duration_seconds'] for a in activities])
+        local_store().append(features, labels)
+        before = self.activity_count
+        self.activity_count += len(activities)
+
+        # 🔥 Train local model every 10 activities
+        if self.activity_count // 10 > before // 10 and len(local_store()) >= 5:
+            log.info("🤖 FL TRAINING: %d samples collected", len(local_store()))
+            MODEL_TRAINED = True
+
+    def end_segment(self, end):
+        """Close the current focus segment and upload whatever the coalescer finished"""
+        if end > self.start_time:
+            log.debug("⏱️  Ending: %s (%ds)", self.current_app, (end - self.start_time).total_seconds())
+            for activity in self.coalescer.add(self.current_app.title(), self.current_window, self.start_time, end):
+                self.send_to_flask(activity)
+        self.current_app = None
+        self.current_window = ""
+        self.start_time = None
+
     def track(self):
         self.tracking = True
-        print("🔍 REAL-TIME TRACKING STARTED... (Switch apps to test!)")
-        print("📊 FL Data → activity_features list (ready for Flower client)")
+        log.info("🔍 REAL-TIME TRACKING STARTED... (Switch apps to test!)")
+        log.info("📊 FL Data → %s/ (ready for Flower client)", local_store().path)
         
-        while self.tracking:
-            app_name, window_title, hwnd = self.get_active_window()
+        while self.tracking and not self.source.exhausted:
+            started = time.perf_counter()
+            idle = self.source.idle_seconds()
+            now = self.source.now()
+            switched = False
             
-            if app_name != self.current_app or window_title != self.current_window:
-                # End previous activity
-                if self.current_app and self.start_time:
-                    duration = int((datetime.now() - self.start_time).total_seconds())
-                    if duration > 15:  # Min 15 seconds
-                        activity = {
-                            'app_name': self.current_app.title(),
-                            'window_title': self.current_window,
-                            'duration_seconds': duration,
-                            'timestamp_start': self.start_time.isoformat(),
-                            'timestamp_end': datetime.now().isoformat()
-                        }
-                        print(f"⏱️  Ending: {self.current_app} ({duration}s)")
+            if idle >= self.poller.idle_after:
+                # 🔥 Idle: the activity ended when input stopped; start fresh when the user is back
+                if self.current_app:
+                    log.info("💤 Idle for %ds", idle)
+                    self.end_segment(now - timedelta(seconds=idle))
+                    for activity in self.coalescer.flush():  # what comes after the break is a new activity
                         self.send_to_flask(activity)
+            else:
+                app_name, window_title, hwnd = self.get_active_window()
+                switched = app_name != self.current_app or window_title != self.current_window
                 
-                # Start new activity
-                self.current_app = app_name
-                self.current_window = window_title
-                self.start_time = datetime.now()
-                print(f"👀 Now tracking: {app_name.title()} - {window_title[:50]}")
+                if switched:
+                    SWITCHES.inc()
+                    # End previous activity
+                    if self.current_app and self.start_time:
+                        self.end_segment(now)
+                    
+                    # Start new activity
+                    self.current_app = app_name
+                    self.current_window = window_title
+                    self.start_time = now
+                    log.info("👀 Now tracking: %s - %s", app_name.title(), window_title[:50])
+            
+            open_segment = None
+            if self.current_app:
+                open_segment = (self.current_app.title(), self.current_window, self.start_time)
+            for activity in self.coalescer.expire(now, open_segment):
+                self.send_to_flask(activity)
             
-            time.sleep(3)
+            # 🔥 Adaptive polling: fast right after a switch, slower while stable or idle
+            interval = self.poller.next_interval(switched, idle)
+            POLL_SECONDS.observe(time.perf_counter() - started)
+            POLL_INTERVAL.set(interval)
+            self.source.sleep(interval)
+        
+        # Stopped or the replay ran out: nothing may stay buffered
+        if self.current_app and self.start_time:
+            self.end_segment(self.source.now())
+        for activity in self.coalescer.flush():
+            self.send_to_flask(activity)
+        log.info("🧩 %d focus segments → %d activities", self.coalescer.raw_segments, self.coalescer.emitted)
     
     def start(self):
         self.tracker_thread = threading.Thread(target=self.track, daemon=True)
         self.tracker_thread.start()
 
+    def stop(self):
+        """Stop polling, flush the open activity and hand the rest to the offline spool"""
+        self.tracking = False
+        self.source.wake()
+        self.tracker_thread.join()
+        self.uploader.stop()
+        self.source.close()
+
 # 🔥 FL STATUS CHECKER (runs in background)
 def fl_status_thread():
     global MODEL_TRAINED
     while True:
-        if MODEL_TRAINED and len(activity_features) > 0:
-            print(f"🌟 FL STATUS: {len(activity_features)} samples | Ready for Flower client!")
-            print(f"   → Run: python fl_flower_client.py (User ID: {user_id})")
+        if MODEL_TRAINED and len(local_store()) > 0:
+            log.info("🌟 FL STATUS: %d samples | Ready for Flower client! → Run: python client.py (User ID: %s)",
+                     len(local_store()), user_id)
         time.sleep(30)
 
 if __name__ == "__main__":
-    print("🎮 On-Screen Activity Tracker DEBUG + FEDERATED LEARNING")
-    print("=" * 60)
+    metrics.configure_logging()
+    metrics.start_dump_from_env()
+    log.info("🎮 On-Screen Activity Tracker DEBUG + FEDERATED LEARNING")
     
     user_id = input("Enter User ID : ") or "1"
-    tracker = RealTimeActivityTracker(user_id=int(user_id))
+    source = make_source(os.environ.get('TRACKER_SOURCE'))
+    if os.environ.get('TRACKER_RECORD'):
+        source = RecordingSource(source, os.environ['TRACKER_RECORD'])  # trace for replay/benchmarks
+    coalescer = SegmentCoalescer(merge_gap=float(os.environ.get('TRACKER_MERGE_GAP', 120)))
+    tracker = RealTimeActivityTracker(user_id=int(user_id), source=source, coalescer=coalescer)
     
     # 🔥 Start FL status monitor
     fl_status = threading.Thread(target=fl_status_thread, daemon=True)
@@ -155,5 +201,7 @@ if __name__ == "__main__":
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
-        print("\n⏹️ Tracker stopped!")
-        print(f"📊 FINAL FL DATA: {len(activity_features)} samples ready for training!")
+        tracker.stop()
+        log.info("⏹️ Tracker stopped!")
+        log.info("📦 %d activities spooled for the next run", tracker.uploader.spooled())
+        log.info("📊 FINAL FL DATA: %d samples ready for training!", len(local_store()))
@@ -0,0 +1,111 @@
+# training.py - local mini-batch training/evaluation for ActivityClient
+import time
+import numpy as np
+import torch
+
+# Defaults for the settings the server can push through the Flower config dict
+DEFAULT_SETTINGS = {
+    'epochs': 3,
+    'batch_size': 32,
+    'learning_rate': 0.01,
+    'max_steps': 0,         # cap on optimizer steps per round, 0 = no cap
+    'val_fraction': 0.2,    # share of local samples held out for evaluate()
+}
+
+def training_settings(config):
+    """Merge a Flower config dict over DEFAULT_SETTINGS, coercing types"""
+    settings = dict(DEFAULT_SETTINGS)
+    for key, default in DEFAULT_SETTINGS.items():
+        if key in config:
+            settings[key] = type(default)(config[key])
+    return settings
+
+def split_indices(num_samples, val_fraction):
+    """Deterministic (train, validation) split of sample positions.
+
+    Positions are stable slots of the ring buffer, so the same samples stay
+    held out across rounds instead of leaking into training.
+    """
+    indices = np.arange(num_samples)
+    if val_fraction <= 0 or num_samples < 2:
+        return indices, indices[:0]
+    every = max(2, int(round(1 / val_fraction)))
+    held_out = indices % every == every - 1
+    return indices[~held_out], indices[held_out]
+
+def iter_batches(indices, batch_size, rng=None):
+    """Yield index arrays of size batch_size, shuffled when rng is given.
+
+    Each batch is sorted so reads from a memory-mapped store stay local.
+    """
+    if rng is not None:
+        indices = rng.permutation(indices)
+    for start in range(0, len(indices), batch_size):
+        yield np.sort(indices[start:start + batch_size])
+
+def train_local(model, features, labels, indices, settings, rng=None):
+    """Mini-batch SGD over features[indices]; only one batch is materialized at a time.
+
+    Returns fit metrics: loss/accuracy over the samples seen, steps, wall time
+    and samples/sec.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    optimizer = torch.optim.SGD(model.parameters(), lr=settings['learning_rate'])
+    criterion = torch.nn.CrossEntropyLoss()
+    max_steps = settings['max_steps']
+
+    model.train()
+    started = time.perf_counter()
+    steps = seen = correct = 0
+    loss_sum = 0.0
+    for _ in range(settings['epochs']):
+        for batch in iter_batches(indices, settings['batch_size'], rng):
+            X = torch.from_numpy(np.ascontiguousarray(features[batch]))
+            y = torch.from_numpy(np.ascontiguousarray(labels[batch]))
+            optimizer.zero_grad()
+            outputs = model(X)
+            loss = criterion(outputs, y)
+            loss.backward()
+            optimizer.step()
+
+            steps += 1
+            seen += len(batch)
+            loss_sum += loss.item() * len(batch)
+            correct += (outputs.argmax(dim=1) == y).sum().item()
+            if max_steps and steps >= max_steps:
+                break
+        if max_steps and steps >= max_steps:
+            break
+
+    wall_time = time.perf_counter() - started
+    return {
+        'train_loss': loss_sum / seen if seen else 0.0,
+        'train_accuracy': correct / seen if seen else 0.0,
+        'steps': steps,
+        'wall_time': wall_time,
+        'samples_per_sec': seen / wall_time if wall_time > 0 else 0.0,
+    }
+
+def evaluate_local(model, features, labels, indices, batch_size):
+    """Loss and accuracy of model on features[indices], computed under inference_mode"""
+    criterion = torch.nn.CrossEntropyLoss(reduction='sum')
+    model.eval()
+    started = time.perf_counter()
+    loss_sum = 0.0
+    correct = 0
+    with torch.inference_mode():
+        for batch in iter_batches(indices, batch_size):
+            X = torch.from_numpy(np.ascontiguousarray(features[batch]))
+            y = torch.from_numpy(np.ascontiguousarray(labels[batch]))
+            outputs = model(X)
+            loss_sum += criterion(outputs, y).item()
+            correct += (outputs.argmax(dim=1) == y).sum().item()
+
+    wall_time = time.perf_counter() - started
+    count = len(indices)
+    return {
+        'loss': loss_sum / count if count else 0.0,
+        'accuracy': correct / count if count else 0.0,
+        'wall_time': wall_time,
+        'samples_per_sec': count / wall_time if wall_time > 0 else 0.0,
+    }
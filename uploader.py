@@ -0,0 +1,238 @@
+# uploader.py - background, batched, retrying upload of tracker activities
+import itertools
+import json
+import logging
+import queue
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+UPLOADED = metrics.counter('uploader_activities_total', "Activities by upload outcome", ('result',))
+POST_SECONDS = metrics.histogram('uploader_post_seconds', "Batch POST round trip")
+
+class ActivityUploader:
+    """Ships finished activity segments to Flask without ever blocking the tracker.
+
+    submit() only enqueues. A sender thread batches whatever has accumulated
+    and POSTs it to /track_activities over one keep-alive Session. When the
+    server is unreachable (or answers 5xx) the batch goes to an append-only
+    SQLite spool, retried with exponential backoff. Every activity is numbered
+    at submit() and the spool is keyed by that number, so it is always
+    replayed in submit order, before newer activities are sent.
+    Rows the server rejects as invalid are logged and dropped, not retried.
+
+    A batch the server keeps failing (500, or a 2xx body that isn't the
+    expected results list) is retried in halves until the offending row is
+    alone; after `max_attempts` failures on its own it is moved to the
+    dead_letter table so it can't hold up the rows behind it.
+    Unavailable (502-504) counts as offline and is retried indefinitely.
+    """
+    def __init__(self, flask_url, spool_path='tracker_spool.db', max_queue=1000, batch_size=100,
+                 timeout=5, backoff_base=1.0, backoff_max=60.0, max_attempts=3, on_sent=None):
+        self.url = f"{flask_url}/track_activities"
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_attempts = max_attempts
+        self.on_sent = on_sent  # called with the activities the server accepted
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.sent = self.rejected = self.dead = 0
+
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        self._spool_lock = threading.Lock()
+        self._spool = sqlite3.connect(spool_path, check_same_thread=False)
+        self._spool.execute("CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)")
+        if 'attempts' not in {row[1] for row in self._spool.execute("PRAGMA table_info(spool)")}:
+            self._spool.execute("ALTER TABLE spool ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self._spool.execute("CREATE TABLE IF NOT EXISTS dead_letter (id INTEGER PRIMARY KEY, payload TEXT NOT NULL, "
+                            "error TEXT, failed_at REAL NOT NULL)")
+        self._spool.commit()
+        # halving batch_size this many times leaves one row; max_attempts more failures and it is dead
+        self._dead_after = batch_size.bit_length() + max_attempts
+        # spool ids are submit sequence numbers and dead_letter keeps them, so carry on after both
+        last = self._spool.execute(
+            "SELECT MAX(id) FROM (SELECT id FROM spool UNION ALL SELECT id FROM dead_letter)").fetchone()[0] or 0
+        self._seq = itertools.count(last + 1)
+
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='activity-uploader', daemon=True)
+        self._thread.start()
+        metrics.gauge('uploader_queue_depth', "Activities waiting in memory to be sent").set_function(self.queue.qsize)
+        metrics.gauge('uploader_spooled', "Activities waiting in the offline spool").set_function(self.spooled)
+
+    # ---------------- SPOOL ----------------
+    def _spool_append(self, entries, attempts=0):
+        """entries are (seq, activity) pairs; seq decides the replay order"""
+        with self._spool_lock:
+            self._spool.executemany("INSERT INTO spool (id, payload, attempts) VALUES (?, ?, ?)",
+                                    [(seq, json.dumps(a), attempts) for seq, a in entries])
+            self._spool.commit()
+
+    def _spool_peek(self):
+        """The oldest batch, halved once per failure of the row at its head"""
+        with self._spool_lock:
+            head = self._spool.execute("SELECT attempts FROM spool ORDER BY id LIMIT 1").fetchone()
+            if head is None:
+                return [], []
+            limit = max(1, self.batch_size >> head[0])
+            rows = self._spool.execute("SELECT id, payload FROM spool ORDER BY id LIMIT ?", (limit,)).fetchall()
+        return [r[0] for r in rows], [json.loads(r[1]) for r in rows]
+
+    def _spool_delete(self, ids):
+        with self._spool_lock:
+            self._spool.executemany("DELETE FROM spool WHERE id = ?", [(i,) for i in ids])
+            self._spool.commit()
+
+    def _spool_failed(self, ids, error):
+        """Count a server error against the rows; a lone row out of attempts is dead-lettered"""
+        with self._spool_lock:
+            self._spool.executemany("UPDATE spool SET attempts = attempts + 1 WHERE id = ?", [(i,) for i in ids])
+            if len(ids) == 1:
+                moved = self._spool.execute(
+                    "INSERT INTO dead_letter (id, payload, error, failed_at) "
+                    "SELECT id, payload, ?, ? FROM spool WHERE id = ? AND attempts >= ?",
+                    (error, time.time(), ids[0], self._dead_after)).rowcount
+                if moved:
+                    self._spool.execute("DELETE FROM spool WHERE id = ?", (ids[0],))
+                    self.dead += 1
+                    UPLOADED.inc(result='dead_letter')
+                    log.error("☠️ ACTIVITY DEAD-LETTERED after %d server errors: %s", self._dead_after, error)
+            self._spool.commit()
+
+    def spooled(self):
+        with self._spool_lock:
+            return self._spool.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    # ---------------- SENDING ----------------
+    def submit(self, activity):
+        """Hand over one finished activity; never waits on the network"""
+        entry = (next(self._seq), activity)
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            # local disk only; what is still queued goes first so the spool keeps submit order
+            self._spool_append(self._drain_queue(wait=0, limit=None) + [entry])
+            UPLOADED.inc(result='overflow')
+
+    def _post(self, activities):
+        """'delivered' (some rows may still be rejected as invalid), 'offline' or a server error string"""
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.url, json={'activities': activities}, timeout=self.timeout)
+        except requests.RequestException as e:
+            log.warning("❌ UPLOAD FAILED: %s", e)
+            return 'offline'
+        POST_SECONDS.observe(time.perf_counter() - started)
+        if response.status_code in (502, 503, 504):  # overloaded or behind a proxy that lost it: not the rows' fault
+            log.warning("❌ FLASK UNAVAILABLE: %s", response.status_code)
+            return 'offline'
+        if response.status_code >= 500:
+            log.warning("❌ FLASK ERROR: %s", response.status_code)
+            return f"HTTP {response.status_code}: {response.text[:100]}"
+        if response.status_code not in (200, 202):  # 202: queued by the server's write-behind writer
+            # The whole payload was refused; retrying the same bytes can't help
+            log.error("❌ BATCH REFUSED (%s): %s", response.status_code, response.text[:100])
+            self.rejected += len(activities)
+            UPLOADED.inc(len(activities), result='rejected')
+            return 'delivered'
+
+        accepted, errors = [], []
+        try:
+            for result in response.json().get('results', []):
+                if result.get('status') == 'accepted':
+                    accepted.append(activities[result['index']])
+                else:
+                    errors.append(result.get('error'))
+        except (ValueError, AttributeError, KeyError, IndexError, TypeError) as e:
+            log.warning("❌ MALFORMED RESPONSE (%s): %r", response.status_code, e)
+            return f"HTTP {response.status_code}: malformed body ({e!r})"
+        for error in errors:
+            log.warning("❌ ACTIVITY REJECTED: %s", error)
+        self.rejected += len(errors)
+        UPLOADED.inc(len(errors), result='rejected')
+        self.sent += len(accepted)
+        UPLOADED.inc(len(accepted), result='sent')
+        log.info("📤 UPLOADED: %d/%d activities", len(accepted), len(activities))
+        if accepted and self.on_sent:
+            try:
+                self.on_sent(accepted)
+            except Exception:
+                log.exception("❌ on_sent callback failed")  # already delivered; don't resend
+        return 'delivered'
+
+    def _drain_queue(self, wait, limit=-1):
+        """Up to `limit` (default batch_size, None for all) queued (seq, activity) entries"""
+        limit = self.batch_size if limit == -1 else limit
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=wait) if wait else self.queue.get_nowait())
+            while limit is None or len(batch) < limit:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                ids, batch = self._spool_peek()
+                if batch:
+                    # Replay the spool first so the server sees activities in order
+                    outcome = self._post(batch)
+                    if outcome == 'delivered':
+                        self._spool_delete(ids)
+                        failures = 0
+                    else:
+                        if outcome != 'offline':
+                            self._spool_failed(ids, outcome)
+                        failures += 1
+                    # Anything new waits in the spool behind the older rows
+                    fresh = self._drain_queue(wait=0, limit=None)
+                    if fresh:
+                        self._spool_append(fresh)
+                else:
+                    entries = self._drain_queue(wait=0.5)
+                    if not entries:
+                        continue
+                    if self.spooled():  # submit() overflowed older rows to the spool while we waited
+                        self._spool_append(entries)
+                        continue
+                    try:
+                        outcome = self._post([activity for _, activity in entries])
+                    except Exception:
+                        self._spool_append(entries, attempts=1)  # already off the queue; don't lose them
+                        raise
+                    if outcome == 'delivered':
+                        failures = 0
+                    else:
+                        self._spool_append(entries, attempts=0 if outcome == 'offline' else 1)
+                        failures += 1
+            except Exception:
+                # a bug or a broken spool must not kill the sender: submit() would spool forever
+                log.exception("❌ UPLOADER ERROR")
+                failures += 1
+            if failures:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (failures - 1))
+                delay *= random.uniform(0.5, 1.0)  # jitter so a classroom doesn't retry in lockstep
+                log.warning("⏳ Upload failed %d time(s) in a row, retrying in %.1fs", failures, delay)
+                self._stopping.wait(delay)
+
+    def stop(self):
+        """Stop the sender and spool anything still queued so nothing is lost"""
+        self._stopping.set()
+        self._thread.join()
+        self._spool_append(self._drain_queue(wait=0, limit=None))
+        self.session.close()
@@ -0,0 +1,272 @@
+# window_sources.py - where the tracker learns which window has focus
+#
+# Every source returns (app_name, window_title, window_id) from active_window()
+# and seconds since the last keyboard/mouse input from idle_seconds(). The
+# tracker also takes its clock from the source, so a ReplaySource can run a
+# recorded trace on virtual time.
+import json
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import psutil
+
+UNKNOWN_WINDOW = ("unknown", "Unknown Window", None)
+
+class ProcessNameCache:
+    """pid -> lower-cased process name, cached per (pid, window) for `ttl` seconds.
+
+    Keying on the window as well as the pid means a recycled pid showing a
+    different window is looked up again instead of reusing a stale name.
+    """
+    def __init__(self, ttl=60.0, max_size=256, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self.hits = self.misses = 0
+        self._cache = OrderedDict()
+
+    def name(self, pid, window=None):
+        key = (pid, window)
+        now = self.clock()
+        entry = self._cache.get(key)
+        if entry and entry[1] > now:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return entry[0]
+        self.misses += 1
+        name = psutil.Process(pid).name().lower()  # failures propagate and are not cached
+        self._cache[key] = (name, now + self.ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return name
+
+class WindowSource(ABC):
+    """Base class: the live sources use the real clock"""
+    name = 'base'
+    exhausted = False  # a replay runs out; live sources never do
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+
+    @abstractmethod
+    def active_window(self):
+        """(app_name, window_title, window_id) of the focused window"""
+
+    def idle_seconds(self):
+        return 0.0
+
+    def now(self):
+        return datetime.now()
+
+    def sleep(self, seconds):
+        self._wakeup.wait(seconds)
+
+    def wake(self):
+        """Cut the current sleep short (used on shutdown)"""
+        self._wakeup.set()
+
+    def close(self):
+        pass
+
+# ---------------- WINDOWS ----------------
+class Win32Source(WindowSource):
+    name = 'win32'
+
+    def __init__(self):
+        super().__init__()
+        import win32api
+        import win32gui
+        import win32process
+        self._api, self._gui, self._process = win32api, win32gui, win32process
+        self.processes = ProcessNameCache()
+
+    def active_window(self):
+        try:
+            hwnd = self._gui.GetForegroundWindow()
+            _, pid = self._process.GetWindowThreadProcessId(hwnd)
+            return self.processes.name(pid, hwnd), self._gui.GetWindowText(hwnd), hwnd
+        except Exception:
+            return UNKNOWN_WINDOW
+
+    def idle_seconds(self):
+        try:
+            return (self._api.GetTickCount() - self._api.GetLastInputInfo()) / 1000.0
+        except Exception:
+            return 0.0
+
+# ---------------- LINUX / X11 ----------------
+class X11Source(WindowSource):
+    """Reads EWMH properties (_NET_ACTIVE_WINDOW, _NET_WM_PID, _NET_WM_NAME) via python-xlib"""
+    name = 'x11'
+
+    def __init__(self, display=None):
+        super().__init__()
+        try:
+            from Xlib import X
+            from Xlib import display as xdisplay
+        except ImportError as e:
+            raise RuntimeError("The X11 window source needs python-xlib (pip install python-xlib)") from e
+        self._any = X.AnyPropertyType
+        self._display = xdisplay.Display(display)
+        self._root = self._display.screen().root
+        self._atoms = {name: self._display.intern_atom(name)
+                       for name in ('_NET_ACTIVE_WINDOW', '_NET_WM_PID', '_NET_WM_NAME', 'UTF8_STRING')}
+        self._screensaver = self._display.has_extension('MIT-SCREEN-SAVER')
+        self.processes = ProcessNameCache()
+
+    def _property(self, window, atom, prop_type=None):
+        prop = window.get_full_property(self._atoms[atom], prop_type or self._any)
+        return prop.value if prop else None
+
+    def active_window(self):
+        try:
+            active = self._property(self._root, '_NET_ACTIVE_WINDOW')
+            if active is None or not active[0]:
+                return UNKNOWN_WINDOW
+            wid = int(active[0])
+            window = self._display.create_resource_object('window', wid)
+            title = self._property(window, '_NET_WM_NAME', self._atoms['UTF8_STRING']) or window.get_wm_name() or ""
+            if isinstance(title, bytes):
+                title = title.decode('utf-8', 'replace')
+            pid = self._property(window, '_NET_WM_PID')
+            if pid is not None:
+                app_name = self.processes.name(int(pid[0]), wid)
+            else:
+                app_name = ((window.get_wm_class() or ('unknown',))[-1]).lower()
+            return app_name, title, wid
+        except Exception:
+            return UNKNOWN_WINDOW
+
+    def idle_seconds(self):
+        if not self._screensaver:
+            return 0.0
+        try:
+            return self._root.screensaver_query_info().idle / 1000.0
+        except Exception:
+            return 0.0
+
+    def close(self):
+        self._display.close()
+
+# ---------------- REPLAY ----------------
+class ReplaySource(WindowSource):
+    """Plays a recorded focus trace on a virtual clock, so runs are deterministic and instant.
+
+    A trace is JSON lines sorted by "t" (seconds from the start):
+        {"t": 0, "app": "code.exe", "title": "app.py - Visual Studio Code"}
+        {"t": 95.5, "idle": true}
+        {"t": 400, "idle": false}
+        {"t": 900, "end": true}
+    Focus changes also end idleness. The replay is exhausted at the last "t".
+    For benchmarking it records how late each switch was noticed (`latencies`)
+    and how many switches were never seen because focus moved on again
+    before the next poll (`missed`).
+    """
+    name = 'replay'
+
+    def __init__(self, events, start=None):
+        super().__init__()
+        self.events = sorted(events, key=lambda e: e['t'])
+        self.start = start or datetime(2026, 1, 5, 9, 0, 0)
+        self.end = self.events[-1]['t'] if self.events else 0.0
+        self.elapsed = 0.0
+        self.polls = 0
+        self.latencies = []
+        self.missed = 0
+        self._next = 0
+        self._window = UNKNOWN_WINDOW
+        self._idle_since = None
+        self._changes = []  # switch times since the last poll
+        self._reported = None
+
+    @classmethod
+    def from_file(cls, path, start=None):
+        with open(path) as f:
+            return cls([json.loads(line) for line in f if line.strip()], start)
+
+    @property
+    def exhausted(self):
+        return self.elapsed >= self.end
+
+    def _advance(self):
+        while self._next < len(self.events) and self.events[self._next]['t'] <= self.elapsed:
+            event = self.events[self._next]
+            self._next += 1
+            if 'app' in event:
+                self._window = (event['app'], event.get('title', ''), self._next)
+                self._changes.append(event['t'])
+                self._idle_since = None
+            elif 'idle' in event:
+                self._idle_since = event['t'] if event['idle'] else None
+
+    def active_window(self):
+        self._advance()
+        self.polls += 1
+        if self._changes:
+            seen = self._window[:2] != (self._reported or UNKNOWN_WINDOW)[:2]
+            if seen:
+                self.latencies.append(self.elapsed - self._changes[-1])
+            self.missed += len(self._changes) - (1 if seen else 0)
+            self._changes = []
+            self._reported = self._window
+        return self._window
+
+    def idle_seconds(self):
+        self._advance()
+        return 0.0 if self._idle_since is None else self.elapsed - self._idle_since
+
+    def now(self):
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def sleep(self, seconds):
+        self.elapsed += seconds
+
+class RecordingSource(WindowSource):
+    """Wraps a live source and appends every focus change to a trace file ReplaySource can play"""
+    def __init__(self, source, path):
+        super().__init__()
+        self.source = source
+        self.name = f"{source.name}+record"
+        self._file = open(path, 'a')
+        self._started = time.monotonic()
+        self._last = None
+
+    def active_window(self):
+        window = self.source.active_window()
+        if window[:2] != self._last:
+            self._last = window[:2]
+            event = {'t': round(time.monotonic() - self._started, 3), 'app': window[0], 'title': window[1]}
+            self._file.write(json.dumps(event) + '\n')
+            self._file.flush()
+        return window
+
+    def idle_seconds(self):
+        return self.source.idle_seconds()
+
+    def close(self):
+        self._file.write(json.dumps({'t': round(time.monotonic() - self._started, 3), 'end': True}) + '\n')
+        self._file.close()
+        self.source.close()
+
+def make_source(spec=None):
+    """'win32', 'x11' or 'replay:<trace.jsonl>'; None picks the live source for this platform"""
+    if spec is None:
+        if sys.platform == 'win32':
+            spec = 'win32'
+        elif os.environ.get('DISPLAY'):
+            spec = 'x11'
+        else:
+            raise RuntimeError("No window source for this platform; set TRACKER_SOURCE=replay:<trace.jsonl>")
+    if spec == 'win32':
+        return Win32Source()
+    if spec == 'x11':
+        return X11Source()
+    if spec.startswith('replay:'):
+        return ReplaySource.from_file(spec[len('replay:'):])
+    raise ValueError(f"Unknown window source: {spec}")
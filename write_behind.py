@@ -0,0 +1,136 @@
+# write_behind.py - group-commit ingestion: request handlers enqueue, one thread commits
+import logging
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+class WriteBehindWriter:
+    """Commits queued activity rows on a single background thread.
+
+    Request handlers only validate and submit(); the writer commits whatever
+    has accumulated once `max_rows` rows are waiting or the oldest has waited
+    `interval_ms`, so concurrent trackers share one transaction (and one
+    fsync) instead of serializing on the SQLite write lock. When a grouped
+    commit fails, each submission is retried on its own so one bad batch
+    doesn't take the others down with it.
+
+    Rows are only durable once committed: anything still queued when the
+    process dies is lost, which is why close() flushes on shutdown.
+    """
+    def __init__(self, commit, interval_ms=50, max_rows=500, max_queue=50000):
+        self.commit = commit  # commit(rows, raw_app_names); raises on failure
+        self.interval = interval_ms / 1000.0
+        self.max_rows = max_rows
+        self.max_queue = max_queue
+        self._pending = deque()  # (rows, raw_app_names, enqueued at)
+        self._pending_rows = 0
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self.counters = {
+            'enqueued_rows': 0, 'committed_rows': 0, 'failed_rows': 0, 'commits': 0,
+            'max_queue_depth': 0, 'commit_ms_total': 0.0, 'commit_ms_max': 0.0, 'commit_ms_last': 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def submit(self, rows, raw_app_names):
+        """Queue validated rows; False when the queue is full (caller should answer 503)"""
+        if not rows:
+            return True
+        with self._cond:
+            if self._closed or self._pending_rows + len(rows) > self.max_queue:
+                return False
+            self._pending.append((rows, raw_app_names, time.monotonic()))
+            self._pending_rows += len(rows)
+            self.counters['enqueued_rows'] += len(rows)
+            self.counters['max_queue_depth'] = max(self.counters['max_queue_depth'], self._pending_rows)
+            if self._pending_rows >= self.max_rows or len(self._pending) == 1:
+                self._cond.notify()  # commit now, or start the interval timer
+        return True
+
+    def _take(self):
+        """Wait for a group to commit; None once closed and drained"""
+        with self._cond:
+            while True:
+                if self._pending:
+                    due = self._pending[0][2] + self.interval
+                    if self._pending_rows >= self.max_rows or self._closed or time.monotonic() >= due:
+                        break
+                    self._cond.wait(due - time.monotonic())
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait()
+            group, taken = [], 0
+            while self._pending and (not group or taken + len(self._pending[0][0]) <= self.max_rows):
+                rows, raw_app_names, _ = self._pending.popleft()
+                group.append((rows, raw_app_names))
+                taken += len(rows)
+            self._pending_rows -= taken
+            self._busy = True
+            return group
+
+    def _commit(self, group):
+        # commit() fills in ids and scores; copies keep a failed attempt from leaking into the retry
+        rows = [dict(row) for g in group for row in g[0]]
+        raw_app_names = [name for g in group for name in g[1]]
+        started = time.perf_counter()
+        self.commit(rows, raw_app_names)
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._cond:
+            c = self.counters
+            c['commits'] += 1
+            c['committed_rows'] += len(rows)
+            c['commit_ms_total'] += elapsed
+            c['commit_ms_last'] = elapsed
+            c['commit_ms_max'] = max(c['commit_ms_max'], elapsed)
+
+    def _failed(self, group, error):
+        log.error("❌ WRITE-BEHIND COMMIT FAILED: %s", error)
+        with self._cond:
+            self.counters['failed_rows'] += sum(len(rows) for rows, _ in group)
+
+    def _run(self):
+        while True:
+            group = self._take()
+            if group is None:
+                return
+            try:
+                self._commit(group)
+            except Exception as e:
+                if len(group) == 1:
+                    self._failed(group, e)
+                else:
+                    log.warning("⚠ GROUP COMMIT FAILED (%s), retrying %d submissions one by one", e, len(group))
+                    for submission in group:
+                        try:
+                            self._commit([submission])
+                        except Exception as e:
+                            self._failed([submission], e)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self.counters, queue_depth=self._pending_rows)
+        stats['commit_ms_avg'] = stats['commit_ms_total'] / stats['commits'] if stats['commits'] else 0.0
+        return stats
+
+    def flush(self):
+        """Block until everything submitted so far is committed"""
+        with self._cond:
+            while self._pending or self._busy:
+                self._cond.notify()
+                self._cond.wait(self.interval)
+
+    def close(self):
+        """Commit what is queued, then stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()